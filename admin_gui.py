@@ -88,7 +88,7 @@ class AdminLogin(tk.Tk):
             print("Admin login successful, opening dashboard...")
             self.destroy()
             from admin_gui_dashboard import AdminDashboard
-            AdminDashboard(pin).mainloop()
+            AdminDashboard(res.json()["token"]).mainloop()
     
         except Exception:
             messagebox.showerror(
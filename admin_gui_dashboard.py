@@ -1,13 +1,24 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import messagebox
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from virtual_table import VirtualTable
 
 API_BASE = "http://127.0.0.1:5000"
+PAGE_SIZE = 200
+REFRESH_MS = 5000       # how often the summary cards are re-polled
+POLL_MS = 50
 
 class AdminDashboard(tk.Tk):
-    def __init__(self, pin):
+    def __init__(self, token):
         super().__init__()
-        self.pin = pin
+        # One keep-alive session for every API call from this window,
+        # authenticated with the token from /api/admin/login
+        self.http = requests.Session()
+        self.http.headers["Authorization"] = f"Bearer {token}"
+        self._snapshot_etag = None
+        self._poller = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+        self.bind("<Destroy>", self._on_destroy, add="+")
 
         self.title("🏦 Bank Admin Dashboard")
         self.geometry("720x420")
@@ -91,43 +102,22 @@ class AdminDashboard(tk.Tk):
             "Amount", "Balance After", "Note", "Date"
         )
 
-        tree = ttk.Treeview(win, columns=cols, show="headings", height=14)
-
-        for c in cols:
-            tree.heading(c, text=c)
-            tree.column(c, anchor="center", width=120)
-
-        tree.pack(fill="both", expand=True, padx=20, pady=10)
-
-        res = requests.post(
-            f"{API_BASE}/api/admin/transactions",
-            json={"pin": self.pin},
-            timeout=5
-        )
-
-        if res.status_code != 200:
-            messagebox.showerror(
-                "Error",
-                f"Failed to load transactions.\nServer returned {res.status_code}"
+        def fetch_page(before_id, limit):
+            res = self.http.post(
+                f"{API_BASE}/api/admin/transactions",
+                json={"before_id": before_id, "limit": limit},
+                timeout=10
             )
-            return
+            if res.status_code != 200:
+                raise RuntimeError(f"Server returned {res.status_code}")
+            rows = res.json()
+            return rows, (rows[-1]["id"] if len(rows) == limit else None)
 
-        try:
-            data = res.json()
-        except Exception:
-            messagebox.showerror(
-                "Error",
-                "Server returned invalid response.\nCheck Flask console."
-            )
-            print("Raw response:", res.text)
-            return
-
-        if not data:
-            messagebox.showinfo("Info", "No transactions found.")
-            return
-
-        for t in data:
-            tree.insert("", "end", (
+        table = VirtualTable(
+            win,
+            cols,
+            fetch_page,
+            lambda t: (
                 t["id"],
                 t["account_id"],
                 t["name"],
@@ -136,7 +126,14 @@ class AdminDashboard(tk.Tk):
                 f"₹ {t['balance_after']}",
                 t["note"],
                 t["created_at"]
-            ))
+            ),
+            page_size=PAGE_SIZE,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to load transactions.\n{e}", parent=win
+            ),
+            on_empty=lambda: messagebox.showinfo("Info", "No transactions found.", parent=win)
+        )
+        table.pack(fill="both", expand=True, padx=20, pady=10)
 
     def make_card(self, parent, title, value):
         card = tk.Frame(parent, bg="white", bd=1, relief="solid", width=150, height=120)
@@ -176,7 +173,7 @@ class AdminDashboard(tk.Tk):
         new_pin.pack()
 
         def submit():
-            res = requests.post(
+            res = self.http.post(
                 f"{API_BASE}/api/admin/change-pin",
                 json={
                     "old_pin": old_pin.get(),
@@ -186,7 +183,8 @@ class AdminDashboard(tk.Tk):
 
             if res.status_code == 200:
                 messagebox.showinfo("Success", "Admin PIN changed successfully")
-                self.pin = new_pin.get()   # update session PIN
+                # The PIN change revoked the old token
+                self.http.headers["Authorization"] = f"Bearer {res.json()['token']}"
                 win.destroy()
             else:
                 messagebox.showerror("Error", res.json().get("error", "Failed"))
@@ -201,42 +199,53 @@ class AdminDashboard(tk.Tk):
 
 
     def refresh_data(self):
-        try:
-            # --- Bank Balance ---
-            res_bal = requests.post(
-                f"{API_BASE}/api/admin/bank-balance",
-                json={"pin": self.pin},
-                timeout=5
-            )
-            data_bal = res_bal.json()
-
-            if "bank_balance" not in data_bal:
-                raise ValueError(data_bal.get("error", "Auth failed"))
-
-            # --- Stats ---
-            res_stats = requests.post(
-                f"{API_BASE}/api/admin/stats",
-                json={"pin": self.pin},
-                timeout=5
-            )
-            data_stats = res_stats.json()
-
-            if "total_users" not in data_stats:
-                raise ValueError(data_stats.get("error", "Auth failed"))
+        """Fetch the snapshot off the Tk thread, then schedule the next poll."""
+        future = self._poller.submit(self.fetch_snapshot)
+        self.after(POLL_MS, self._apply_snapshot, future)
+
+    def fetch_snapshot(self):
+        """Returns the snapshot dict, or None if it has not changed (304)."""
+        headers = {}
+        if self._snapshot_etag:
+            headers["If-None-Match"] = self._snapshot_etag
+        res = self.http.get(f"{API_BASE}/api/admin/snapshot", headers=headers, timeout=5)
+        if res.status_code == 304:
+            return None
+        data = res.json()
+        if res.status_code != 200:
+            raise ValueError(data.get("error", "Auth failed"))
+        self._snapshot_etag = res.headers.get("ETag")
+        return data
 
-            # --- Update UI ---
-            self.bank_lbl.config(text=f"₹ {data_bal['bank_balance']}")
-            self.users_lbl.config(text=str(data_stats["total_users"]))
-            self.dep_lbl.config(text=f"₹ {data_stats['total_deposits']}")
-            self.wd_lbl.config(text=f"₹ {data_stats['total_withdrawals']}")
+    def _apply_snapshot(self, future):
+        if not self.winfo_exists():
+            return
+        if not future.done():
+            self.after(POLL_MS, self._apply_snapshot, future)
+            return
+        try:
+            data = future.result()
+            if data is not None:
+                self.bank_lbl.config(text=f"₹ {data['bank_balance']}")
+                self.users_lbl.config(text=str(data["total_users"]))
+                self.dep_lbl.config(text=f"₹ {data['total_deposits']}")
+                self.wd_lbl.config(text=f"₹ {data['total_withdrawals']}")
 
         except Exception as e:
             print("Admin dashboard error:", e)
+            self._snapshot_etag = None
             self.bank_lbl.config(text="Error")
             self.users_lbl.config(text="--")
             self.dep_lbl.config(text="₹ --")
             self.wd_lbl.config(text="₹ --")
 
+        self.after(REFRESH_MS, self.refresh_data)
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._poller.shutdown(wait=False)
+            self.http.close()
+
     def open_users_window(self):
         win = tk.Toplevel(self)
         win.title("👥 All Bank Users")
@@ -252,52 +261,61 @@ class AdminDashboard(tk.Tk):
         ).pack(anchor="w", padx=20, pady=10)
 
         cols = ("ID", "Name", "Email", "Phone", "Balance", "Status", "Action")
-        tree = ttk.Treeview(win, columns=cols, show="headings", height=12)
-
-        for c in cols:
-            tree.heading(c, text=c)
-            tree.column(c, anchor="center", width=120)
-
-        tree.pack(fill="both", expand=True, padx=20, pady=10)
 
-        def load_users():
-            tree.delete(*tree.get_children())
-            res = requests.post(
+        def fetch_page(after_id, limit):
+            res = self.http.post(
                 f"{API_BASE}/api/admin/users",
-                json={"pin": self.pin}
+                json={"after_id": after_id, "limit": limit},
+                timeout=10
             )
+            if res.status_code != 200:
+                raise RuntimeError(f"Server returned {res.status_code}")
             users = res.json()
+            return users, (users[-1]["account_id"] if len(users) == limit else None)
+
+        def user_values(u):
+            action = "Unlock" if u["status"] == "Locked" else "Lock"
+            return (
+                u["account_id"],
+                u["name"],
+                u["email"],
+                u["phone"],
+                f"₹ {u['balance']}",
+                u["status"],
+                action
+            )
 
-            for u in users:
-                action = "Unlock" if u["status"] == "Locked" else "Lock"
-                tree.insert("", "end", values=(
-                    u["account_id"],
-                    u["name"],
-                    u["email"],
-                    u["phone"],
-                    f"₹ {u['balance']}",
-                    u["status"],
-                    action
-                ))
+        table = VirtualTable(
+            win,
+            cols,
+            fetch_page,
+            user_values,
+            page_size=PAGE_SIZE,
+            height=12,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to load users.\n{e}", parent=win
+            )
+        )
+        table.pack(fill="both", expand=True, padx=20, pady=10)
 
         def toggle_lock():
-            sel = tree.focus()
+            sel = table.focus()
             if not sel:
                 return
 
-            vals = tree.item(sel, "values")
+            vals = table.item_values(sel)
             acc_id = vals[0]
 
-            res = requests.post(
+            res = self.http.post(
                 f"{API_BASE}/api/admin/toggle-lock",
-                json={
-                    "pin": self.pin,
-                    "account_id": acc_id
-                }
+                json={"account_id": acc_id}
             )
 
             if res.status_code == 200:
-                load_users()
+                # Update the row in place instead of reloading every page
+                status = res.json()["status"]
+                action = "Unlock" if status == "Locked" else "Lock"
+                table.tree.item(sel, values=vals[:5] + (status, action))
 
         btn = tk.Button(
             win,
@@ -310,7 +328,3 @@ class AdminDashboard(tk.Tk):
             command=toggle_lock
         )
         btn.pack(pady=10)
-
-        load_users()
-
-
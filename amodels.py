@@ -0,0 +1,95 @@
+# amodels.py - asyncio front end for models.py
+"""
+Awaitable versions of the models functions used by the API, for asyncio
+servers (see async_app.py).
+
+sqlite3 is blocking, so nothing here touches the database on the event
+loop. Writes are queued to ONE dedicated writer thread (money movements to
+the group-commit writer, anything else to a single-thread executor):
+SQLite allows a single writer anyway, so writers never wait on each other's
+busy_timeout, and a burst of deposits cannot tie up every thread. Reads go to a small
+pool of reader threads, each holding its own pooled connection (db.py),
+which WAL mode lets run alongside the writer. Thousands of in-flight
+requests therefore cost a coroutine each, not a thread each.
+
+    balance = await amodels.deposit(7, 500)
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import group_commit
+import models
+from utils import needs_rehash, verify_pin_async
+
+READER_THREADS = int(os.environ.get("BANK_ASYNC_READERS", "4"))
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="amodels-writer")
+_readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="amodels-reader")
+
+
+def _run(executor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+def write(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the writer thread."""
+    return _run(_writer, fn, *args, **kwargs)
+
+
+def read(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on a reader thread."""
+    return _run(_readers, fn, *args, **kwargs)
+
+
+# ---------- Reads ----------
+async def get_account(account_id):
+    return await read(models.get_account, account_id)
+
+async def get_account_by_email(email):
+    return await read(models.get_account_by_email, email)
+
+async def get_transactions(account_id, limit=100, before_tx_id=None, after_tx_id=None):
+    return await read(
+        models.get_transactions, account_id,
+        limit=limit, before_tx_id=before_tx_id, after_tx_id=after_tx_id
+    )
+
+async def get_usage_summary(account_id):
+    return await read(models.get_usage_summary, account_id)
+
+async def get_admin_snapshot():
+    return await read(models.get_admin_snapshot)
+
+# ---------- Writes ----------
+# Money movements go through the group-commit writer, which batches them
+# from every caller into shared transactions (see group_commit.py).
+async def deposit(account_id, amount, note=None, notify=False, idempotency=None):
+    return await asyncio.wrap_future(group_commit.deposit(account_id, amount, note, notify, idempotency))
+
+async def withdraw(account_id, amount, note=None, notify=False, idempotency=None):
+    return await asyncio.wrap_future(group_commit.withdraw(account_id, amount, note, notify, idempotency))
+
+async def transfer(from_acct, to_acct, amount, notify=False, idempotency=None):
+    return await asyncio.wrap_future(group_commit.transfer(from_acct, to_acct, amount, notify, idempotency))
+
+async def get_idempotent_result(account_id, key, request_hash):
+    return await read(models.get_idempotent_result, account_id, key, request_hash)
+
+# ---------- PINs ----------
+async def check_pin(acc, pin):
+    """models.check_pin without blocking the loop: scrypt runs in the verifier pool."""
+    if not acc:
+        return False
+    if not await asyncio.wrap_future(verify_pin_async(pin, acc["pin_hash"])):
+        return False
+    if needs_rehash(acc["pin_hash"]):
+        await write(models.check_pin, acc, pin)     # re-check is a cache hit
+    return True
+
+
+def shutdown():
+    _writer.shutdown(wait=True)
+    _readers.shutdown(wait=False)
@@ -1,30 +1,72 @@
 # File: app.py
 """
-Debug-friendly Flask backend for Banking Management System.
+Flask backend for Banking Management System.
 
-Replace your existing app.py with this file while debugging frontend 404 issues.
-It prints directory info and the frontend folder contents at startup,
-logs every request path, and checks file existence before serving.
+`python app.py` starts the single-process development server. For
+production run `python serve.py`, which uses all cores (see serve.py).
+Set BANK_DEBUG=1 for startup diagnostics, per-request debug logging and
+tracebacks of failed API calls.
 """
-import traceback
-import sys
+import json
+import logging
+import os
+import threading
+import time
 from pathlib import Path
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound
+
+log = logging.getLogger("bank.app")
+DEBUG = os.environ.get("BANK_DEBUG", "").lower() in ("1", "true", "yes")
+
+ADMIN_TOKEN_TTL = int(os.environ.get("BANK_ADMIN_TOKEN_TTL") or 8 * 3600)
+FINGERPRINT_TTL = 5     # seconds a worker trusts its cached admin PIN fingerprint
 
 def require_admin(pin):
     acc = models.get_account_by_email("admin@bank.local")
     if not acc or acc.get("role") != "ADMIN":
         return False
-    return verify_pin(pin, acc["pin_hash"])
+    return models.check_pin(acc, pin)
+
+# Tokens carry a fingerprint of the admin PIN hash, so changing the PIN
+# revokes every outstanding token: at once in the worker that changed it,
+# within FINGERPRINT_TTL seconds in the others.
+_admin_fp = {"value": None, "checked": 0.0}
+
+def admin_fingerprint(refresh=False):
+    now = time.monotonic()
+    if refresh or now - _admin_fp["checked"] > FINGERPRINT_TTL:
+        acc = models.get_account_by_email("admin@bank.local")
+        ok = acc and acc.get("role") == "ADMIN"
+        _admin_fp["value"] = fingerprint(acc["pin_hash"]) if ok else None
+        _admin_fp["checked"] = now
+    return _admin_fp["value"]
+
+def issue_admin_token():
+    return sign_token({"sub": "admin", "fp": admin_fingerprint(refresh=True)}, ADMIN_TOKEN_TTL)
+
+def admin_authorized(pin=""):
+    """
+    Accepts "Authorization: Bearer <token>" from /api/admin/login (checked in
+    memory), falling back to the raw admin PIN for older clients.
+    """
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        claims = read_token(auth[len("Bearer "):].strip())
+        return bool(claims) and claims.get("sub") == "admin" \
+            and claims.get("fp") is not None and claims.get("fp") == admin_fingerprint()
+    return bool(pin) and require_admin(pin)
 
 try:
     import models
-    from db import initialize_db
-    from utils import verify_pin, hash_pin
+    import notifications
+    import group_commit
+    from db import initialize_db, run_migrations
+    from utils import sign_token, read_token, fingerprint, configure_logging
+    from assets import load_manifest
 except Exception as e:
-    print("Error importing project modules (models/db/utils). Make sure these files are in the same folder as app.py.", file=sys.stderr)
-    traceback.print_exc()
+    log.exception("Error importing project modules (models/db/utils). Make sure these files are in the same folder as app.py.")
     # We continue because for debugging static files we don't need models to be present necessarily.
 
 
@@ -33,51 +75,156 @@ FRONTEND_DIR = PROJECT_ROOT / "frontend"
 DB_FILE = PROJECT_ROOT / "banking.db"
 INIT_SQL = PROJECT_ROOT / "init_db.sql"
 
-app = Flask(__name__, static_folder=str(FRONTEND_DIR), static_url_path="/")
+# No Flask static route: it would shadow static_files() (and the built assets)
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
+# Built assets (python assets.py build), held in memory; {} until a build exists
+ASSETS = load_manifest()
+IMMUTABLE = "public, max-age=31536000, immutable"
+
 def ensure_db_initialized():
     """Initialize DB if missing (safe no-op if db exists)."""
     try:
         if not DB_FILE.exists():
-            print("banking.db not found → initializing DB")
-            if INIT_SQL.exists():
-                initialize_db(str(INIT_SQL))
-            else:
-                initialize_db()
-            print("Database initialized.")
+            log.info("banking.db not found, initializing DB")
+            initialize_db(str(INIT_SQL))
+            log.info("Database initialized")
     except Exception:
-        print("DB initialization failed (continuing):")
-        traceback.print_exc()
-
-# Startup diagnostics
+        log.exception("DB initialization failed (continuing)")
+
+def start_fund_compactor(interval: float):
+    """Periodically fold the bank float shards back into a single row."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                models.compact_bank_funds()
+            except Exception:
+                log.exception("Bank fund compaction failed")
+
+    threading.Thread(target=loop, name="fund-compactor", daemon=True).start()
+
+def start_snapshot_job(interval: float):
+    """Record month-end balance snapshots once a month has closed (checked every interval)."""
+    def loop():
+        while True:
+            try:
+                for period, accounts in models.snapshot_closed_periods().items():
+                    log.info("Balance snapshot %s: %d accounts", period, accounts)
+            except Exception:
+                log.exception("Balance snapshot failed")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="balance-snapshots", daemon=True).start()
+
+def start_monthly_charges_job(interval: float):
+    """Apply this month's maintenance + SMS charges (checked every interval; charged once per account)."""
+    def loop():
+        while True:
+            try:
+                run = models.apply_monthly_charges()
+                if run["charged"] or run["failed"]:
+                    log.info("Monthly charges %s: %d charged, %d failed (%s/s)",
+                             run["period"], run["charged"], run["failed"], run["per_second"])
+            except Exception:
+                log.exception("Monthly charges failed")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="monthly-charges", daemon=True).start()
+
+def start_idempotency_eviction(interval: float):
+    """Periodically delete expired Idempotency-Key results."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                models.evict_idempotency_keys()
+            except Exception:
+                log.exception("Idempotency key eviction failed")
+
+    threading.Thread(target=loop, name="idempotency-eviction", daemon=True).start()
+
+# Startup diagnostics (BANK_DEBUG only)
 def print_startup_info():
-    print("=== Startup diagnostics ===")
-    print("Current working directory:", Path.cwd())
-    print("Project root:", PROJECT_ROOT)
-    print("Frontend folder expected at:", FRONTEND_DIR)
+    log.info("Current working directory: %s", Path.cwd())
+    log.info("Project root: %s", PROJECT_ROOT)
+    log.info("Frontend folder expected at: %s", FRONTEND_DIR)
     if FRONTEND_DIR.exists() and FRONTEND_DIR.is_dir():
-        print("Frontend folder exists. Listing contents:")
         for p in sorted(FRONTEND_DIR.iterdir()):
-            print("  -", p.name, "(dir)" if p.is_dir() else "(file)")
+            log.info("Frontend file: %s%s", p.name, "/" if p.is_dir() else "")
     else:
-        print("Frontend folder DOES NOT exist! (This is the likely cause of 404)")
-    print("banking.db exists?:", DB_FILE.exists())
-    print("===========================")
+        log.warning("Frontend folder DOES NOT exist! (This is the likely cause of 404)")
+    log.info("banking.db exists: %s", DB_FILE.exists())
+    log.info("URL map:\n%s", app.url_map)
 
-# Simple request logging (for debug)
+# Request logging: one structured INFO line per request (sampled by BANK_LOG_SAMPLE)
 @app.before_request
-def log_request():
-    print(f"[REQ] {request.method} {request.path}")
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    if log.isEnabledFor(logging.INFO):
+        log.info("request", extra={"fields": {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "ms": round((time.perf_counter() - g.get("started", time.perf_counter())) * 1000, 2),
+        }})
+    return response
+
+def log_failure(e):
+    """API handlers answer 400 with the error text; the traceback is logged only with BANK_DEBUG."""
+    log.warning("%s %s failed: %s", request.method, request.path, e, exc_info=DEBUG)
+
+def int_param(value, name, default=None, minimum=None):
+    """
+    A whole-number request field ("" or missing -> default). Raises
+    ValueError with a message fit for the client otherwise.
+    """
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number") from None
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return number
+
+def serve_asset(name):
+    """
+    Response for a built asset, or None if the build does not have it.
+    Fingerprinted files are cached forever; HTML and plain names are
+    revalidated with their ETag, which costs a body-less 304.
+    """
+    asset = ASSETS.get(name)
+    if asset is None:
+        return None
+    headers = {
+        "Cache-Control": IMMUTABLE if asset.immutable else "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    sent = {t.strip().removeprefix("W/") for t in request.headers.get("If-None-Match", "").split(",")}
+    encoding = asset.pick(request.headers.get("Accept-Encoding"))
+    headers["ETag"] = asset.etag(encoding)
+    if "*" in sent or sent & asset.etags():
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(asset.bodies[encoding], content_type=asset.type, headers=headers)
 
 # Index route - serve index.html (only if file exists)
 @app.route("/", methods=["GET"])
 def index():
+    built = serve_asset("index.html")
+    if built is not None:
+        return built
     index_path = FRONTEND_DIR / "index.html"
-    print("Serving root / -> checking for:", index_path)
-    if index_path.exists():
+    try:
         return send_from_directory(str(FRONTEND_DIR), "index.html")
-    else:
+    except NotFound:
         # Helpful error message for debugging in browser
         return (
             "<h2>Index not found</h2>"
@@ -89,16 +236,18 @@ def index():
 # Generic static file handler (serves css/js/pages if present)
 @app.route("/<path:filename>", methods=["GET"])
 def static_files(filename):
-    file_path = FRONTEND_DIR / filename
-    print("Static request for:", filename, "-> exists?", file_path.exists())
-    if file_path.exists():
+    built = serve_asset(filename)
+    if built is not None:
+        return built
+    try:
         return send_from_directory(str(FRONTEND_DIR), filename)
-    # If file not found in frontend, return helpful 404
-    return (
-        "<h2>Static file not found</h2>"
-        f"<p>Requested: {filename}</p>"
-        f"<p>Looked in: {file_path}</p>"
-    ), 404
+    except NotFound:
+        # If file not found in frontend, return helpful 404
+        return (
+            "<h2>Static file not found</h2>"
+            f"<p>Requested: {filename}</p>"
+            f"<p>Looked in: {FRONTEND_DIR / filename}</p>"
+        ), 404
 
 # ------------------- API endpoints (same as before) -------------------
 # Note: these use the models functions. If models import failed, these endpoints may error.
@@ -116,9 +265,57 @@ def api_create_account():
         account_id = models.create_account(name, email, phone, pin, initial_deposit)
         return jsonify({"account_id": account_id}), 201
     except Exception as e:
-        traceback.print_exc()
+        log_failure(e)
         return jsonify({"error": str(e)}), 400
 
+# Money movements accept an Idempotency-Key header: a retry with the same
+# key (and parameters) gets the first response back and moves no money.
+# Keys are per account, and withdrawals/transfers check the PIN before a
+# stored response is replayed.
+def idempotency_key():
+    return request.headers.get("Idempotency-Key", "").strip()
+
+def idempotent_response(body, replayed):
+    resp = jsonify(body)
+    if replayed:
+        resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+def idempotent_replay(kind, render, *args):
+    """
+    Response for a request whose Idempotency-Key already has a result (or an
+    error response for a bad key), without queueing it; None otherwise.
+    Call after the request is authorized.
+    """
+    key = idempotency_key()
+    if not key:
+        return None
+    if len(key) > models.IDEMPOTENCY_KEY_MAX:
+        return jsonify({"error": f"Idempotency-Key longer than {models.IDEMPOTENCY_KEY_MAX} characters"}), 400
+    try:
+        stored = models.get_idempotent_result(args[0], key, models.request_fingerprint(kind, *args))
+    except models.IdempotencyConflict as e:
+        return jsonify({"error": str(e)}), 422
+    return None if stored is None else idempotent_response(render(stored), True)
+
+def money_movement(kind, render, *args):
+    """Run group_commit.<kind>(*args) (once per Idempotency-Key, if sent) and answer render(result)."""
+    submit = getattr(group_commit, kind)
+    key = idempotency_key()
+    if not key:
+        return jsonify(render(submit(*args).result()))
+    try:
+        result, replayed = submit(*args, idempotency=(key, models.request_fingerprint(kind, *args))).result()
+    except models.IdempotencyConflict as e:
+        return jsonify({"error": str(e)}), 422
+    return idempotent_response(render(result), replayed)
+
+def balance_body(balance):
+    return {"balance": balance}
+
+def transfer_body(balances):
+    return {"from_balance": balances[0], "to_balance": balances[1]}
+
 @app.route("/api/deposit", methods=["POST"])
 def api_deposit():
     try:
@@ -127,10 +324,12 @@ def api_deposit():
         amount = float(data.get("amount") or 0)
         if account_id <= 0 or amount <= 0:
             return jsonify({"error": "account_id and positive amount required"}), 400
-        new_bal = models.deposit(account_id, amount)
-        return jsonify({"balance": new_bal})
+        replay = idempotent_replay("deposit", balance_body, account_id, amount)
+        if replay is not None:
+            return replay
+        return money_movement("deposit", balance_body, account_id, amount)
     except Exception as e:
-        traceback.print_exc()
+        log_failure(e)
         return jsonify({"error": str(e)}), 400
 
 @app.route("/api/withdraw", methods=["POST"])
@@ -145,12 +344,14 @@ def api_withdraw():
         acc = models.get_account(account_id)
         if not acc:
             return jsonify({"error": "account not found"}), 404
-        if not verify_pin(pin, acc["pin_hash"]):
+        if not models.check_pin(acc, pin):
             return jsonify({"error": "invalid pin"}), 403
-        new_bal = models.withdraw(account_id, amount)
-        return jsonify({"balance": new_bal})
+        replay = idempotent_replay("withdraw", balance_body, account_id, amount)
+        if replay is not None:
+            return replay
+        return money_movement("withdraw", balance_body, account_id, amount)
     except Exception as e:
-        traceback.print_exc()
+        log_failure(e)
         return jsonify({"error": str(e)}), 400
 
 @app.route("/api/transfer", methods=["POST"])
@@ -166,22 +367,76 @@ def api_transfer():
         acc = models.get_account(from_id)
         if not acc:
             return jsonify({"error": "source account not found"}), 404
-        if not verify_pin(pin, acc["pin_hash"]):
+        if not models.check_pin(acc, pin):
             return jsonify({"error": "invalid pin"}), 403
-        new_from, new_to = models.transfer(from_id, to_id, amount)
-        return jsonify({"from_balance": new_from, "to_balance": new_to})
+        replay = idempotent_replay("transfer", transfer_body, from_id, to_id, amount)
+        if replay is not None:
+            return replay
+        return money_movement("transfer", transfer_body, from_id, to_id, amount)
+    except Exception as e:
+        log_failure(e)
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/api/batch", methods=["POST"])
+def api_batch():
+    """
+    Bulk posting (payroll files, settlements). Admin only: send the admin
+    token (Authorization: Bearer) or the admin PIN in the X-Admin-Pin header. The body is NDJSON, one operation per line:
+        {"type": "deposit", "account_id": 7, "amount": 500, "note": "Salary"}
+        {"type": "transfer", "from_id": 7, "to_id": 9, "amount": 120}
+    Responds with NDJSON, one result per input line.
+    """
+    if not admin_authorized(request.headers.get("X-Admin-Pin", "")):
+        return jsonify({"error": "Unauthorized"}), 403
+    try:
+        chunk_size = int_param(request.args.get("chunk_size"), "chunk_size", models.BATCH_CHUNK_SIZE, minimum=1)
+        ops, bad_lines = [], {}
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                bad_lines[len(ops)] = "Invalid JSON"
+                ops.append(None)
+        results = models.post_batch(ops, chunk_size=chunk_size)
+        if any(isinstance(op, dict) and op.get("notify") for op in ops):
+            notifications.wake()
     except Exception as e:
-        traceback.print_exc()
+        log_failure(e)
         return jsonify({"error": str(e)}), 400
 
+    for res in results:
+        if res["index"] in bad_lines:
+            res["error"] = bad_lines[res["index"]]
+    failed = sum(1 for r in results if not r["ok"])
+    body = "".join(json.dumps(r) + "\n" for r in results)
+    return Response(body, mimetype="application/x-ndjson", headers={
+        "X-Batch-Applied": str(len(results) - failed),
+        "X-Batch-Failed": str(failed),
+    })
+
 @app.route("/api/transactions/<int:account_id>", methods=["GET"])
 def api_transactions(account_id: int):
     try:
-        limit = int(request.args.get("limit") or 200)
-        txs = models.get_transactions(account_id, limit=limit)
+        limit = int_param(request.args.get("limit"), "limit", 200, minimum=1)
+        before = int_param(request.args.get("before_tx_id"), "before_tx_id")
+        after = int_param(request.args.get("after_tx_id"), "after_tx_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        txs = models.get_transactions(account_id, limit=limit, before_tx_id=before, after_tx_id=after)
         return jsonify(txs)
     except Exception as e:
-        traceback.print_exc()
+        log_failure(e)
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/api/usage/<int:account_id>", methods=["GET"])
+def api_usage(account_id: int):
+    try:
+        return jsonify(models.get_usage_summary(account_id))
+    except Exception as e:
+        log_failure(e)
         return jsonify({"error": str(e)}), 400
 
 @app.route("/api/account/<int:account_id>", methods=["GET"])
@@ -193,7 +448,7 @@ def api_get_account(account_id: int):
         acc_safe = {k: v for k, v in acc.items() if k != "pin_hash"}
         return jsonify(acc_safe)
     except Exception as e:
-        traceback.print_exc()
+        log_failure(e)
         return jsonify({"error": str(e)}), 400
     
 @app.route("/api/admin/login", methods=["POST"])
@@ -204,7 +459,11 @@ def admin_login():
     if not require_admin(pin):
         return jsonify({"error": "Invalid admin PIN"}), 403
 
-    return jsonify({"status": "success"})
+    return jsonify({
+        "status": "success",
+        "token": issue_admin_token(),
+        "expires_in": ADMIN_TOKEN_TTL
+    })
 
 @app.route("/api/admin/change-pin", methods=["POST"])
 def admin_change_pin():
@@ -214,70 +473,72 @@ def admin_change_pin():
 
     acc = models.get_account_by_email("admin@bank.local")
 
-    if not acc or not verify_pin(old_pin, acc["pin_hash"]):
+    if not acc or not models.check_pin(acc, old_pin or ""):
         return jsonify({"error": "Invalid old PIN"}), 403
 
-    if not new_pin.isdigit() or not (4 <= len(new_pin) <= 6):
-        return jsonify({"error": "PIN must be 4–6 digits"}), 400
-
-    with models.get_conn(True) as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE accounts SET pin_hash=? WHERE account_id=?",
-            (hash_pin(new_pin), acc["account_id"])
-        )
-        conn.commit()
+    try:
+        models.update_pin(acc["account_id"], str(new_pin or ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({"status": "PIN updated successfully"})
+    # Old tokens no longer match the PIN fingerprint; hand the caller a new one
+    return jsonify({
+        "status": "PIN updated successfully",
+        "token": issue_admin_token(),
+        "expires_in": ADMIN_TOKEN_TTL
+    })
 
 
 @app.route("/api/admin/bank-balance", methods=["POST"])
 def admin_bank_balance():
-    data = request.get_json(force=True)
+    data = request.get_json(force=True, silent=True) or {}
     pin = data.get("pin", "")
 
-    if not require_admin(pin):
+    if not admin_authorized(pin):
         return jsonify({"error": "Unauthorized"}), 403
 
-    with models.get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT balance FROM system_funds WHERE id=1")
-        bal = cur.fetchone()["balance"]
-
-    return jsonify({"bank_balance": bal})
+    return jsonify({"bank_balance": models.get_bank_balance()})
 
 @app.route("/api/admin/stats", methods=["POST"])
 def admin_stats():
-    data = request.get_json(force=True)
+    data = request.get_json(force=True, silent=True) or {}
     pin = data.get("pin", "")
 
-    if not require_admin(pin):
+    if not admin_authorized(pin):
         return jsonify({"error": "Unauthorized"}), 403
 
-    with models.get_conn() as conn:
-        cur = conn.cursor()
-
-        cur.execute("SELECT COUNT(*) AS total_users FROM accounts WHERE role='USER'")
-        users = cur.fetchone()["total_users"]
+    return jsonify(models.get_bank_stats())
 
-        cur.execute("SELECT SUM(amount) AS total_deposits FROM transactions WHERE type='Deposit'")
-        deposits = cur.fetchone()["total_deposits"] or 0
+@app.route("/api/admin/snapshot", methods=["GET"])
+def admin_snapshot():
+    """
+    All dashboard figures in one response. The ETag is a hash of the body,
+    so a poll with a matching If-None-Match gets an empty 304.
+    Send the admin token (Authorization: Bearer) or the PIN in X-Admin-Pin.
+    """
+    if not admin_authorized(request.headers.get("X-Admin-Pin", "")):
+        return jsonify({"error": "Unauthorized"}), 403
 
-        cur.execute("SELECT SUM(amount) AS total_withdrawals FROM transactions WHERE type='Withdraw'")
-        withdrawals = cur.fetchone()["total_withdrawals"] or 0
-
-    return jsonify({
-        "total_users": users,
-        "total_deposits": deposits,
-        "total_withdrawals": withdrawals
-    })
+    resp = jsonify(models.get_admin_snapshot())
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.add_etag()
+    return resp.make_conditional(request)
 
 @app.route("/api/admin/users", methods=["POST"])
 def admin_users():
+    """
+    Customer list ordered by account_id. Optional JSON fields for paging:
+    after_id (last account_id of the previous page) and limit.
+    """
     data = request.get_json(force=True)
     pin = data.get("pin", "")
-    if not require_admin(pin):
+    if not admin_authorized(pin):
         return jsonify({"error": "Unauthorized"}), 403
+    try:
+        after_id = int_param(data.get("after_id"), "after_id", 0)
+        limit = int_param(data.get("limit"), "limit", -1, minimum=1)  # SQLite: -1 = no limit
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     with models.get_conn() as conn:
         cur = conn.cursor()
         cur.execute("""
@@ -289,9 +550,10 @@ def admin_users():
                 balance,
                 is_locked
             FROM accounts
-            WHERE role='USER'
+            WHERE role='USER' AND account_id > ?
             ORDER BY account_id
-        """)
+            LIMIT ?
+        """, (after_id, limit))
         rows = cur.fetchall()
     users = []
     for r in rows:
@@ -300,47 +562,73 @@ def admin_users():
             "name": r["name"],
             "email": r["email"],
             "phone": r["phone"],
-            "balance": r["balance"],
+            "balance": models.Money(r["balance"]).rupees,
             "status": "Locked" if r["is_locked"] else "Active"
         })
     return jsonify(users)
 
 @app.route("/api/admin/transactions", methods=["POST"])
 def admin_all_transactions():
+    """
+    Bank-wide ledger, newest first, streamed as it is read from the DB.
+    Optional JSON fields: account_id, type, date_from, date_to (YYYY-MM-DD),
+    min_amount, max_amount, before_id (cursor: last id of the previous page),
+    limit (page size) and format ("json" array, default, or "ndjson").
+    """
     data = request.get_json(force=True)
     pin = data.get("pin", "")
-    if not require_admin(pin):
+    if not admin_authorized(pin):
         return jsonify({"error": "Unauthorized"}), 403
-    with models.get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT
-                t.id,
-                t.account_id,
-                a.name,
-                t.type,
-                t.amount,
-                t.balance_after,
-                t.note,
-                t.created_at
-            FROM transactions t
-            JOIN accounts a ON t.account_id = a.account_id
-            WHERE a.role='USER'
-            ORDER BY t.created_at DESC
-        """)
-        rows = cur.fetchall()
-    return jsonify([dict(r) for r in rows])
+    try:
+        account_id = int_param(data.get("account_id"), "account_id") or None
+        before_id = int_param(data.get("before_id"), "before_id")
+        limit = int_param(data.get("limit"), "limit", minimum=1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        rows = models.iter_ledger(
+            account_id=account_id,
+            type_=data.get("type") or None,
+            date_from=data.get("date_from") or None,
+            date_to=data.get("date_to") or None,
+            min_amount=data.get("min_amount"),
+            max_amount=data.get("max_amount"),
+            before_id=before_id,
+            limit=limit
+        )
+        first = next(rows, None)    # surface query errors before streaming starts
+    except Exception as e:
+        log_failure(e)
+        return jsonify({"error": str(e)}), 400
+
+    def ndjson():
+        if first is not None:
+            yield json.dumps(first) + "\n"
+            for row in rows:
+                yield json.dumps(row) + "\n"
+
+    def json_array():
+        yield "["
+        if first is not None:
+            yield json.dumps(first)
+            for row in rows:
+                yield "," + json.dumps(row)
+        yield "]"
+
+    if data.get("format") == "ndjson":
+        return Response(ndjson(), mimetype="application/x-ndjson")
+    return Response(json_array(), mimetype="application/json")
 
 @app.route("/api/admin/toggle-lock", methods=["POST"])
 def admin_toggle_lock():
     data = request.get_json(force=True)
     pin = data.get("pin", "")
     account_id = data.get("account_id")
-    if not require_admin(pin):
+    if not admin_authorized(pin):
         return jsonify({"error": "Unauthorized"}), 403
     if not account_id:
         return jsonify({"error": "Account ID required"}), 400
-    with models.get_conn(True) as conn:
+    with models.get_conn(True, write=True) as conn:
         cur = conn.cursor()
         cur.execute(
             "SELECT is_locked FROM accounts WHERE account_id=? AND role='USER'",
@@ -361,12 +649,35 @@ def admin_toggle_lock():
     })
 
 # --------------------------------------------------------------------
-if __name__ == "__main__":
+def prepare():
+    """One-time startup work, done before any request is served."""
     ensure_db_initialized()
+    run_migrations()
     models.ensure_admin_account()
-    print_startup_info()
-    print("URL map (routes):")
-    print(app.url_map)
-    # Start server
-    app.run(host="127.0.0.1", port=5000, debug=True)
+
+def start_background_jobs():
+    compact_every = float(os.environ.get("BANK_FUND_COMPACT_SECONDS") or 0)
+    if compact_every > 0:
+        start_fund_compactor(compact_every)
+    snapshot_every = float(os.environ.get("BANK_SNAPSHOT_SECONDS") or 0)
+    if snapshot_every > 0:
+        start_snapshot_job(snapshot_every)
+    evict_every = float(os.environ.get("BANK_IDEMPOTENCY_EVICT_SECONDS") or 600)
+    if evict_every > 0:
+        start_idempotency_eviction(evict_every)
+    charges_every = float(os.environ.get("BANK_MONTHLY_CHARGES_SECONDS") or 3600)
+    if charges_every > 0:
+        start_monthly_charges_job(charges_every)
+    else:
+        log.warning("Monthly charges are off (BANK_MONTHLY_CHARGES_SECONDS=0); "
+                    "run `python models.py charges` from cron instead")
+
+if __name__ == "__main__":
+    configure_logging(level="DEBUG" if DEBUG else None)
+    prepare()
+    start_background_jobs()
+    if DEBUG:
+        print_startup_info()
+    # Development server; use serve.py in production
+    app.run(host="127.0.0.1", port=5000, debug=DEBUG)
 
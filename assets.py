@@ -0,0 +1,187 @@
+# assets.py - static asset build (fingerprint + precompress) and manifest loader
+"""
+Build step for the web frontend:
+
+    python assets.py build [source_dir]
+
+Every asset is content-hashed. CSS, JS, images and fonts are written to
+dist/ under a fingerprinted name (styles.3f9c2a1b7e40.css) so they can be
+cached forever; HTML pages keep their names (they are the URLs people
+visit) but have their href/src references rewritten to the fingerprinted
+files. Each output also gets a .gz copy and, when the optional `brotli`
+package is installed, a .br copy. dist/manifest.json maps every URL name
+to its file, ETag and available encodings.
+
+load_manifest() reads the manifest and all files into memory once, so
+app.py can answer asset requests without touching the disk.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+DIST_DIR = PROJECT_ROOT / "dist"
+MANIFEST = "manifest.json"
+HASH_CHARS = 12
+
+ASSET_SUFFIXES = {".html", ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".woff", ".woff2"}
+COMPRESSIBLE = {".html", ".css", ".js", ".svg"}
+REF_RE = re.compile(r'''((?:href|src)\s*=\s*["'])([^"'#?]+)(["'#?])''')
+
+
+def default_source():
+    """frontend/ when present, else the project root (where the pages live in this tree)."""
+    frontend = PROJECT_ROOT / "frontend"
+    return frontend if frontend.is_dir() else PROJECT_ROOT
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_CHARS]
+
+
+def _write(out_dir, name, data, suffix):
+    """Write one output plus its precompressed variants. Returns the encodings written."""
+    (out_dir / name).write_bytes(data)
+    encodings = []
+    if suffix in COMPRESSIBLE:
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(packed) < len(data):
+            (out_dir / (name + ".gz")).write_bytes(packed)
+            encodings.append("gzip")
+        if brotli is not None:
+            packed = brotli.compress(data, quality=11)
+            if len(packed) < len(data):
+                (out_dir / (name + ".br")).write_bytes(packed)
+                encodings.append("br")
+    return encodings
+
+
+def build(source=None, out_dir=DIST_DIR):
+    """Build dist/ from the source directory. Returns the manifest dict."""
+    source = Path(source) if source else default_source()
+    out_dir = Path(out_dir)
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+
+    # Only the top level of the project root (never venvs, dist/, ...)
+    candidates = source.glob("*") if source == PROJECT_ROOT else source.rglob("*")
+    files = sorted(
+        p for p in candidates
+        if p.is_file() and p.suffix.lower() in ASSET_SUFFIXES and out_dir not in p.parents
+    )
+    manifest = {}
+    renamed = {}
+
+    # Pass 1: everything except HTML gets a content-hashed name
+    for path in files:
+        if path.suffix.lower() == ".html":
+            continue
+        rel = path.relative_to(source).as_posix()
+        data = path.read_bytes()
+        digest = _digest(data)
+        stem, suffix = rel.rsplit(".", 1)
+        hashed = f"{stem}.{digest}.{suffix}"
+        (out_dir / hashed).parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "file": hashed,
+            "hash": digest,
+            "type": mimetypes.guess_type(rel)[0] or "application/octet-stream",
+            "immutable": True,
+            "encodings": _write(out_dir, hashed, data, path.suffix.lower()),
+        }
+        manifest[hashed] = entry
+        # The plain name still works (for old links), but must be revalidated
+        manifest[rel] = dict(entry, immutable=False)
+        renamed[rel] = hashed
+
+    # Pass 2: HTML keeps its name, with references pointing at hashed files
+    for path in files:
+        if path.suffix.lower() != ".html":
+            continue
+        rel = path.relative_to(source).as_posix()
+        base = rel.rsplit("/", 1)[0] + "/" if "/" in rel else ""
+        text = path.read_text(encoding="utf-8")
+
+        def swap(m):
+            target = m.group(2)
+            absolute = target.startswith("/")
+            hashed = renamed.get(target.lstrip("/") if absolute else base + target)
+            if hashed is None:
+                return m.group(0)
+            url = "/" + hashed if absolute else hashed[len(base):]
+            return m.group(1) + url + m.group(3)
+
+        data = REF_RE.sub(swap, text).encode("utf-8")
+        (out_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+        manifest[rel] = {
+            "file": rel,
+            "hash": _digest(data),
+            "type": "text/html; charset=utf-8",
+            "immutable": False,
+            "encodings": _write(out_dir, rel, data, ".html"),
+        }
+
+    (out_dir / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+class Asset:
+    """One built file held in memory, with its precompressed variants."""
+    __slots__ = ("name", "type", "hash", "immutable", "bodies")
+
+    def __init__(self, name, entry, out_dir):
+        self.name = name
+        self.type = entry["type"]
+        self.hash = entry["hash"]
+        self.immutable = entry["immutable"]
+        path = out_dir / entry["file"]
+        self.bodies = {None: path.read_bytes()}
+        for encoding in entry["encodings"]:
+            ext = ".br" if encoding == "br" else ".gz"
+            self.bodies[encoding] = path.with_name(path.name + ext).read_bytes()
+
+    def etag(self, encoding=None):
+        return f'"{self.hash}-{encoding}"' if encoding else f'"{self.hash}"'
+
+    def etags(self):
+        return {self.etag(e) for e in self.bodies}
+
+    def pick(self, accept_encoding):
+        """Best encoding the client accepts: br, then gzip, then identity."""
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and encoding in accepted:
+                return encoding
+        return None
+
+
+def load_manifest(out_dir=DIST_DIR):
+    """{url name: Asset} for a built dist/, or {} if the build has not been run."""
+    out_dir = Path(out_dir)
+    manifest_path = out_dir / MANIFEST
+    if not manifest_path.exists():
+        return {}
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    return {name: Asset(name, entry, out_dir) for name, entry in manifest.items()}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "build":
+        built = build(sys.argv[2] if len(sys.argv) == 3 else None)
+        print(f"Built {len(built)} asset names into {DIST_DIR}"
+              + ("" if brotli else " (brotli not installed: gzip only)"))
+    else:
+        print("usage: python assets.py build [source_dir]")
+        sys.exit(2)
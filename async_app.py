@@ -0,0 +1,222 @@
+# async_app.py - asyncio API server (optional: needs aiohttp)
+"""
+Serves the customer API routes of app.py on an asyncio event loop, backed
+by amodels.py, so one process multiplexes thousands of concurrent requests
+over a writer thread and a few reader threads:
+
+    pip install aiohttp
+    python async_app.py
+
+Same URLs, parameters and JSON responses as the Flask routes for
+/api/deposit, /api/withdraw, /api/transfer, /api/account/<id>,
+/api/transactions/<id> and /api/usage/<id>. Admin routes, the frontend and
+background jobs stay on app.py / serve.py. Listens on BANK_HOST:BANK_PORT
+(default 127.0.0.1:5001 so it can run next to app.py). Money movements
+honour the Idempotency-Key header the same way app.py does.
+"""
+import logging
+import os
+import sys
+
+try:
+    from aiohttp import web
+except ImportError:  # optional dependency
+    web = None
+
+import amodels
+import db
+import models
+from utils import configure_logging
+
+log = logging.getLogger("bank.async")
+
+HOST = os.environ.get("BANK_HOST", "127.0.0.1")
+PORT = int(os.environ.get("BANK_PORT", "5001"))
+DEBUG = os.environ.get("BANK_DEBUG", "").lower() in ("1", "true", "yes")
+INIT_SQL = db.DB_FILE.parent / "init_db.sql"
+
+
+def error(message, status=400):
+    return web.json_response({"error": message}, status=status)
+
+
+async def form_or_json(request):
+    if request.content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+        return dict(await request.post())
+    if request.can_read_body:
+        try:
+            return await request.json() or {}
+        except ValueError:
+            return {}
+    return {}
+
+
+def failed(request, e):
+    log.warning("%s %s failed: %s", request.method, request.path, e, exc_info=DEBUG)
+    return error(str(e))
+
+
+def idempotent_response(body, replayed):
+    resp = web.json_response(body)
+    if replayed:
+        resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+
+async def idempotent_replay(request, kind, render, *args):
+    """Response for an Idempotency-Key that already has a result (or a bad key), else None. Call after auth."""
+    key = request.headers.get("Idempotency-Key", "").strip()
+    if not key:
+        return None
+    if len(key) > models.IDEMPOTENCY_KEY_MAX:
+        return error(f"Idempotency-Key longer than {models.IDEMPOTENCY_KEY_MAX} characters")
+    try:
+        stored = await amodels.get_idempotent_result(args[0], key, models.request_fingerprint(kind, *args))
+    except models.IdempotencyConflict as e:
+        return error(str(e), 422)
+    return None if stored is None else idempotent_response(render(stored), True)
+
+
+async def money_movement(request, kind, render, *args):
+    """Await amodels.<kind>(*args) (once per Idempotency-Key, if sent) and answer render(result)."""
+    submit = getattr(amodels, kind)
+    key = request.headers.get("Idempotency-Key", "").strip()
+    if not key:
+        return web.json_response(render(await submit(*args)))
+    try:
+        request_hash = models.request_fingerprint(kind, *args)
+        result, replayed = await submit(*args, idempotency=(key, request_hash))
+    except models.IdempotencyConflict as e:
+        return error(str(e), 422)
+    return idempotent_response(render(result), replayed)
+
+
+def balance_body(balance):
+    return {"balance": balance}
+
+
+def transfer_body(balances):
+    return {"from_balance": balances[0], "to_balance": balances[1]}
+
+
+async def api_deposit(request):
+    try:
+        data = await form_or_json(request)
+        account_id = int(data.get("account_id") or 0)
+        amount = float(data.get("amount") or 0)
+        if account_id <= 0 or amount <= 0:
+            return error("account_id and positive amount required")
+        replay = await idempotent_replay(request, "deposit", balance_body, account_id, amount)
+        if replay is not None:
+            return replay
+        return await money_movement(request, "deposit", balance_body, account_id, amount)
+    except Exception as e:
+        return failed(request, e)
+
+
+async def api_withdraw(request):
+    try:
+        data = await form_or_json(request)
+        account_id = int(data.get("account_id") or 0)
+        amount = float(data.get("amount") or 0)
+        pin = data.get("pin") or ""
+        if account_id <= 0 or amount <= 0 or not pin:
+            return error("account_id, amount and pin required")
+        acc = await amodels.get_account(account_id)
+        if not acc:
+            return error("account not found", 404)
+        if not await amodels.check_pin(acc, pin):
+            return error("invalid pin", 403)
+        replay = await idempotent_replay(request, "withdraw", balance_body, account_id, amount)
+        if replay is not None:
+            return replay
+        return await money_movement(request, "withdraw", balance_body, account_id, amount)
+    except Exception as e:
+        return failed(request, e)
+
+
+async def api_transfer(request):
+    try:
+        data = await form_or_json(request)
+        from_id = int(data.get("from_id") or 0)
+        to_id = int(data.get("to_id") or 0)
+        amount = float(data.get("amount") or 0)
+        pin = data.get("pin") or ""
+        if from_id <= 0 or to_id <= 0 or amount <= 0 or not pin:
+            return error("from_id, to_id, amount and pin required")
+        acc = await amodels.get_account(from_id)
+        if not acc:
+            return error("source account not found", 404)
+        if not await amodels.check_pin(acc, pin):
+            return error("invalid pin", 403)
+        replay = await idempotent_replay(request, "transfer", transfer_body, from_id, to_id, amount)
+        if replay is not None:
+            return replay
+        return await money_movement(request, "transfer", transfer_body, from_id, to_id, amount)
+    except Exception as e:
+        return failed(request, e)
+
+
+async def api_transactions(request):
+    try:
+        q = request.query
+        txs = await amodels.get_transactions(
+            int(request.match_info["account_id"]),
+            limit=int(q.get("limit") or 200),
+            before_tx_id=int(q["before_tx_id"]) if q.get("before_tx_id") else None,
+            after_tx_id=int(q["after_tx_id"]) if q.get("after_tx_id") else None
+        )
+        return web.json_response(txs)
+    except Exception as e:
+        return failed(request, e)
+
+
+async def api_usage(request):
+    try:
+        account_id = int(request.match_info["account_id"])
+        return web.json_response(await amodels.get_usage_summary(account_id))
+    except Exception as e:
+        return failed(request, e)
+
+
+async def api_get_account(request):
+    try:
+        acc = await amodels.get_account(int(request.match_info["account_id"]))
+        if not acc:
+            return error("account not found", 404)
+        return web.json_response({k: v for k, v in acc.items() if k != "pin_hash"})
+    except Exception as e:
+        return failed(request, e)
+
+
+async def on_cleanup(application):
+    amodels.shutdown()
+
+
+def make_app():
+    application = web.Application()
+    application.add_routes([
+        web.post("/api/deposit", api_deposit),
+        web.post("/api/withdraw", api_withdraw),
+        web.post("/api/transfer", api_transfer),
+        web.get(r"/api/transactions/{account_id:\d+}", api_transactions),
+        web.get(r"/api/usage/{account_id:\d+}", api_usage),
+        web.get(r"/api/account/{account_id:\d+}", api_get_account),
+    ])
+    application.on_cleanup.append(on_cleanup)
+    return application
+
+
+def main():
+    if web is None:
+        sys.exit("async_app.py needs aiohttp: pip install aiohttp")
+    configure_logging()
+    if not db.DB_FILE.exists():
+        db.initialize_db(str(INIT_SQL))
+    db.run_migrations()
+    models.ensure_admin_account()
+    web.run_app(make_app(), host=HOST, port=PORT, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,599 @@
 # db.py - Database utilities
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 
 DB_FILE = Path(__file__).parent / 'banking.db'  # file in project folder
+INIT_SQL = Path(__file__).parent / 'init_db.sql'   # base schema, before MIGRATIONS
+
+# PRAGMAs applied once, when a pooled connection is first opened.
+# Foreign keys stay unenforced, as they always were outside initialize_db:
+# the schema's ON DELETE CASCADE would otherwise erase an account's ledger
+# history when the account is deleted (see models.delete_account).
+CONNECTION_PRAGMAS = (
+    'PRAGMA foreign_keys = OFF',
+)
+
+# ---------- Cold tier ----------
+# Closed months of history are moved out of banking.db into an archive
+# database (see models.archive_period) that every pooled connection attaches
+# as "archive". Readers use the all_transactions TEMP VIEW, which unions
+# both tiers; SQLite merges the two index-ordered halves, so paging it costs
+# the same as paging one table.
+ARCHIVE_DB = os.environ.get('BANK_ARCHIVE_DB')    # default: <db>_archive.db
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive.transactions (
+    tx_id INTEGER PRIMARY KEY,              -- same id as it had in the hot tier
+    account_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    amount INTEGER NOT NULL,                -- paise
+    balance_after INTEGER NOT NULL,         -- paise
+    note TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS archive.idx_archive_tx_account_created
+    ON transactions(account_id, created_at, tx_id);
+CREATE TABLE IF NOT EXISTS archive.archived_periods (
+    period TEXT PRIMARY KEY,                -- 'YYYY-MM'
+    row_count INTEGER NOT NULL,
+    archived_at TEXT DEFAULT (datetime('now'))
+);
+"""
+ALL_TRANSACTIONS_VIEW = """
+CREATE TEMP VIEW IF NOT EXISTS all_transactions AS
+    SELECT tx_id, account_id, type, amount, balance_after, note, created_at FROM main.transactions
+    UNION ALL
+    SELECT tx_id, account_id, type, amount, balance_after, note, created_at FROM archive.transactions a
+    -- a move interrupted between its copy and delete leaves a row in both tiers
+    WHERE NOT EXISTS (SELECT 1 FROM main.transactions m WHERE m.tx_id = a.tx_id)
+"""
+
+def archive_path(db_file):
+    return Path(ARCHIVE_DB) if ARCHIVE_DB else Path(db_file).with_name(Path(db_file).stem + '_archive.db')
+
+# ---------- PRAGMA profiles ----------
+# WAL lets readers keep working while a writer commits; busy_timeout makes
+# writers queue for the lock instead of failing with "database is locked".
+PRAGMA_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 10000,
+        'cache_size': -8000,          # KiB when negative (~8 MB)
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -32000,
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'busy_timeout': 30000,
+        'cache_size': -256000,
+        'mmap_size': 512 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+DB_PROFILE = os.environ.get('BANK_DB_PROFILE', DEFAULT_PROFILE)
+POOL_SIZE = int(os.environ.get('BANK_DB_POOL_SIZE') or 8)   # idle connections kept
+
+
+def set_profile(name: str):
+    """
+    Select the PRAGMA profile used for new connections.
+    Existing pooled connections are closed so the change applies everywhere.
+    """
+    global DB_PROFILE
+    if name not in PRAGMA_PROFILES:
+        raise ValueError(f'Unknown DB profile: {name}')
+    DB_PROFILE = name
+    close_pool()
+
+
+def profile_pragmas(name: str = None):
+    """Return the PRAGMA statements for a profile (current one by default)."""
+    name = name or DB_PROFILE
+    if name not in PRAGMA_PROFILES:
+        raise ValueError(f'Unknown DB profile: {name}')
+    return [f'PRAGMA {key} = {value}' for key, value in PRAGMA_PROFILES[name].items()]
+
+
+class ConnectionPool:
+    """
+    Checkout/return pool of configured sqlite3.Connections.
+    The outermost get_conn() block of a thread checks a connection out and
+    hands it back on exit (nested blocks share it), so servers that start a
+    thread per request still reuse a few warm connections. Up to `size` idle
+    connections are kept; a burst beyond that opens extra ones, which are
+    closed when they come back. The archive schema is created once per pool.
+    A forked child starts with an empty pool (see _after_fork_in_child).
+    """
+
+    def __init__(self, db_file, profile=DEFAULT_PROFILE, size=POOL_SIZE):
+        self.db_file = db_file
+        self.profile = profile
+        self.size = max(1, size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []           # most recently returned last
+        self._in_use = 0
+        self._closed = False
+        self._schema_ready = False
+        self.created = 0
+        self.checkouts = 0
+        self.reused = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in profile_pragmas(self.profile):
+            conn.execute(pragma)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute('ATTACH DATABASE ? AS archive', (str(archive_path(self.db_file)),))
+        conn.execute(f"PRAGMA archive.synchronous = {PRAGMA_PROFILES[self.profile]['synchronous']}")
+        if not self._schema_ready:
+            with self._lock:
+                if not self._schema_ready:
+                    conn.execute('PRAGMA archive.journal_mode = WAL')   # persistent
+                    conn.executescript(ARCHIVE_SCHEMA)
+                    self._schema_ready = True
+        conn.execute(ALL_TRANSACTIONS_VIEW)     # TEMP objects live per connection
+        return conn
+
+    def reset_after_fork(self):
+        """
+        Forget every connection and lock inherited from the parent process
+        (called in a forked child, see _after_fork_in_child). The inherited
+        connections are dropped, not closed: closing them could disturb the
+        parent's use of the same SQLite handles.
+        """
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._in_use = 0
+
+    def acquire(self):
+        """Check out a connection for the calling thread (nested calls share it)."""
+        local = self._local
+        if getattr(local, 'conn', None) is not None:
+            local.depth += 1
+            return local.conn
+        with self._lock:
+            self.checkouts += 1
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self.reused += 1
+            self._in_use += 1
+        if conn is None:
+            try:
+                conn = self._connect()
+            except BaseException:
+                with self._lock:
+                    self._in_use -= 1
+                raise
+            with self._lock:
+                self.created += 1
+        local.conn = conn
+        local.depth = 1
+        return conn
+
+    def release(self):
+        """
+        End one checkout of the calling thread. The outermost one rolls back
+        anything left uncommitted and returns the connection to the pool.
+        """
+        local = self._local
+        local.depth -= 1
+        if local.depth:
+            return
+        conn, local.conn = local.conn, None
+        keep = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            keep = False
+        with self._lock:
+            self._in_use -= 1
+            keep = keep and not self._closed and len(self._idle) < self.size
+            if keep:
+                self._idle.append(conn)
+        if not keep:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection; ones still checked out close on return."""
+        with self._lock:
+            self._closed = True
+            conns, self._idle = self._idle, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'db_file': str(self.db_file),
+                'profile': self.profile,
+                'size': self.size,
+                'open_connections': len(self._idle) + self._in_use,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'connections_created': self.created,
+                'checkouts': self.checkouts,
+                'reused': self.reused,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, recreating it if DB_FILE or DB_PROFILE changed."""
+    global _pool
+    if _pool is None or _pool.db_file != DB_FILE or _pool.profile != DB_PROFILE:
+        with _pool_lock:
+            if _pool is None or _pool.db_file != DB_FILE or _pool.profile != DB_PROFILE:
+                if _pool is not None:
+                    _pool.close_all()
+                _pool = ConnectionPool(DB_FILE, DB_PROFILE, POOL_SIZE)
+    return _pool
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+def _after_fork_in_child():
+    global _pool_lock
+    _pool_lock = threading.Lock()
+    if _pool is not None:
+        _pool.reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
 
 @contextmanager
-def get_conn(autocommit: bool = False):
+def get_conn(autocommit: bool = False, write: bool = False):
     """
-    Yields a sqlite3.Connection.
+    Yields a pooled sqlite3.Connection, checked out for the calling thread
+    until its outermost get_conn() block exits.
     If autocommit=True, commit after leaving context.
+    If write=True, start with BEGIN IMMEDIATE so a read-modify-write takes the
+    writer lock up front (waiting up to busy_timeout) instead of failing or
+    losing an update when it upgrades from a read.
     Caller may still call conn.commit() or conn.rollback() as needed.
+    Anything left uncommitted when the outermost block exits is rolled back,
+    so the connection always goes back to the pool clean.
     """
-    conn = sqlite3.connect(str(DB_FILE))
-    conn.row_factory = sqlite3.Row
+    pool = get_pool()
+    conn = pool.acquire()
     try:
+        if write and not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
         yield conn
         if autocommit:
             conn.commit()
     finally:
-        conn.close()
+        pool.release()
+
+# ---------- Schema migrations ----------
+# Each entry upgrades the schema by one version; the applied version is kept
+# in PRAGMA user_version. Append new steps, never edit applied ones.
+MIGRATIONS = [
+    # 1: per-account history is read newest-first, so index the sort key
+    #    (the old single-column index is a prefix of this one)
+    """
+    CREATE INDEX IF NOT EXISTS idx_tx_account_created
+        ON transactions(account_id, created_at, tx_id);
+    DROP INDEX IF EXISTS idx_tx_account;
+    """,
+    # 2: per-account daily/monthly usage counters for limit checks,
+    #    backfilled from the existing ledger
+    """
+    CREATE TABLE IF NOT EXISTS usage_counters (
+        account_id INTEGER NOT NULL,
+        period TEXT NOT NULL,          -- 'YYYY-MM-DD' (day) or 'YYYY-MM' (month), local time
+        kind TEXT NOT NULL,            -- transaction type: Deposit, Withdraw, Transfer-Out, Transfer-In
+        count INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (account_id, period, kind),
+        FOREIGN KEY(account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    INSERT OR REPLACE INTO usage_counters (account_id, period, kind, count, amount)
+        SELECT account_id, date(created_at, 'localtime'), type, COUNT(*), SUM(amount)
+        FROM transactions GROUP BY 1, 2, 3;
+    INSERT OR REPLACE INTO usage_counters (account_id, period, kind, count, amount)
+        SELECT account_id, strftime('%Y-%m', created_at, 'localtime'), type, COUNT(*), SUM(amount)
+        FROM transactions GROUP BY 1, 2, 3;
+    """,
+    # 3: split the single system_funds row into shard rows (created lazily by
+    #    models.adjust_bank_funds); the current balance is carried in shard 0
+    """
+    CREATE TABLE IF NOT EXISTS system_funds_shards (
+        shard INTEGER PRIMARY KEY,
+        balance REAL NOT NULL DEFAULT 0.0
+    );
+    INSERT OR REPLACE INTO system_funds_shards (shard, balance)
+        SELECT 0, COALESCE(SUM(balance), 0.0) FROM system_funds;
+    DROP TABLE IF EXISTS system_funds;
+    """,
+    # 4: money is stored as integer paise (1 rupee = 100 paise). SQLite cannot
+    #    change a column type in place, so the money tables are rebuilt.
+    """
+    CREATE TABLE accounts_new (
+        account_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE,
+        phone TEXT,
+        dob TEXT,
+        gender TEXT,
+        id_type TEXT,
+        id_document_path TEXT,
+        photo_path TEXT,
+        addr_line1 TEXT,
+        village TEXT,
+        tehsil TEXT,
+        district TEXT,
+        state TEXT,
+        postal_code TEXT,
+        account_type TEXT,
+        initial_deposit INTEGER,                 -- paise
+        balance INTEGER NOT NULL DEFAULT 0,      -- paise
+        pin_hash TEXT NOT NULL,
+        role TEXT DEFAULT 'USER',
+        failed_attempts INTEGER DEFAULT 0,
+        is_locked INTEGER DEFAULT 0,
+        created_at TEXT DEFAULT (datetime('now'))
+    );
+    INSERT INTO accounts_new
+        SELECT account_id, name, email, phone, dob, gender, id_type, id_document_path,
+               photo_path, addr_line1, village, tehsil, district, state, postal_code,
+               account_type, CAST(ROUND(initial_deposit * 100) AS INTEGER),
+               CAST(ROUND(balance * 100) AS INTEGER), pin_hash, role,
+               failed_attempts, is_locked, created_at
+        FROM accounts;
+    DROP TABLE accounts;
+    ALTER TABLE accounts_new RENAME TO accounts;
+
+    CREATE TABLE transactions_new (
+        tx_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_id INTEGER NOT NULL,
+        type TEXT NOT NULL, -- Deposit, Withdraw, Transfer-Out, Transfer-In
+        amount INTEGER NOT NULL,                 -- paise
+        balance_after INTEGER NOT NULL,          -- paise
+        note TEXT,
+        created_at TEXT DEFAULT (datetime('now')),
+        FOREIGN KEY(account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+    );
+    INSERT INTO transactions_new
+        SELECT tx_id, account_id, type, CAST(ROUND(amount * 100) AS INTEGER),
+               CAST(ROUND(balance_after * 100) AS INTEGER), note, created_at
+        FROM transactions;
+    DROP TABLE transactions;
+    ALTER TABLE transactions_new RENAME TO transactions;
+    CREATE INDEX idx_tx_account_created ON transactions(account_id, created_at, tx_id);
+
+    CREATE TABLE usage_counters_new (
+        account_id INTEGER NOT NULL,
+        period TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        amount INTEGER NOT NULL DEFAULT 0,       -- paise
+        PRIMARY KEY (account_id, period, kind),
+        FOREIGN KEY(account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    INSERT INTO usage_counters_new
+        SELECT account_id, period, kind, count, CAST(ROUND(amount * 100) AS INTEGER)
+        FROM usage_counters;
+    DROP TABLE usage_counters;
+    ALTER TABLE usage_counters_new RENAME TO usage_counters;
+
+    CREATE TABLE system_funds_shards_new (
+        shard INTEGER PRIMARY KEY,
+        balance INTEGER NOT NULL DEFAULT 0       -- paise
+    );
+    INSERT INTO system_funds_shards_new
+        SELECT shard, CAST(ROUND(balance * 100) AS INTEGER) FROM system_funds_shards;
+    DROP TABLE system_funds_shards;
+    ALTER TABLE system_funds_shards_new RENAME TO system_funds_shards;
+    """,
+    # 5: persistent outbox for customer email/SMS alerts (see notifications.py)
+    """
+    CREATE TABLE IF NOT EXISTS notification_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel TEXT NOT NULL,                   -- email / sms
+        recipient TEXT NOT NULL,
+        subject TEXT,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',  -- pending / sending / sent / failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL DEFAULT 0, -- unix time
+        last_error TEXT,
+        created_at TEXT DEFAULT (datetime('now')),
+        sent_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_outbox_due
+        ON notification_outbox(status, next_attempt_at);
+    """,
+    # 6: running totals for the admin dashboard (see models.get_bank_stats),
+    #    sharded like system_funds_shards and seeded from the current data
+    """
+    CREATE TABLE IF NOT EXISTS bank_stats (
+        stat TEXT NOT NULL,
+        shard INTEGER NOT NULL,
+        value INTEGER NOT NULL DEFAULT 0,        -- counts, or paise for totals
+        PRIMARY KEY (stat, shard)
+    ) WITHOUT ROWID;
+    DELETE FROM bank_stats;
+    INSERT INTO bank_stats (stat, shard, value)
+        SELECT 'total_users', 0, COUNT(*) FROM accounts WHERE role='USER';
+    INSERT INTO bank_stats (stat, shard, value)
+        SELECT CASE type WHEN 'Deposit' THEN 'total_deposits'
+                         WHEN 'Withdraw' THEN 'total_withdrawals'
+                         ELSE 'total_transfers' END,
+               0, SUM(amount)
+        FROM transactions WHERE type IN ('Deposit', 'Withdraw', 'Transfer-Out')
+        GROUP BY type;
+    """,
+    # 7: month-end balance snapshots (filled by models.snapshot_period) so
+    #    statements start from a known balance instead of walking history
+    """
+    CREATE TABLE IF NOT EXISTS balance_snapshots (
+        account_id INTEGER NOT NULL,
+        period TEXT NOT NULL,                    -- 'YYYY-MM'
+        closing_balance INTEGER NOT NULL,        -- paise, at the end of the period
+        last_tx_id INTEGER,                      -- last ledger row included
+        credits INTEGER NOT NULL DEFAULT 0,      -- paise credited during the period
+        debits INTEGER NOT NULL DEFAULT 0,       -- paise debited during the period
+        tx_count INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT DEFAULT (datetime('now')),
+        PRIMARY KEY (account_id, period),
+        FOREIGN KEY(account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    """,
+    # 8: one row per account charged the monthly fees (models.apply_monthly_charges),
+    #    so the month-end job never charges twice; charges already taken at
+    #    login by earlier versions are recorded from the ledger
+    """
+    CREATE TABLE IF NOT EXISTS monthly_charges (
+        account_id INTEGER NOT NULL,
+        period TEXT NOT NULL,                    -- 'YYYY-MM'
+        amount INTEGER NOT NULL,                 -- paise
+        charged_at TEXT DEFAULT (datetime('now')),
+        PRIMARY KEY (account_id, period),
+        FOREIGN KEY(account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    INSERT OR IGNORE INTO monthly_charges (account_id, period, amount, charged_at)
+        SELECT account_id, strftime('%Y-%m', created_at, 'localtime'), amount, created_at
+        FROM transactions
+        WHERE type = 'Withdraw' AND note LIKE 'Monthly Maintenance%';
+    """,
+    # 9: results of money movements sent with an Idempotency-Key header, so
+    #    a retried request is answered from here instead of posting again
+    #    (models.run_once). Keys are scoped to the account the operation
+    #    starts from (deposit/withdraw account, transfer source), so clients
+    #    cannot collide with each other's keys; expired rows are evicted by
+    #    expires_at
+    """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        account_id INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        request_hash TEXT NOT NULL,              -- operation + parameters the key was used for
+        response TEXT NOT NULL,                  -- JSON result of the operation
+        expires_at INTEGER NOT NULL,             -- unix time
+        PRIMARY KEY (account_id, key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at);
+    """,
+    # 10: outbox claims are leases (notifications.Dispatcher): a row stuck in
+    #     'sending' is taken over only once its claim is older than the lease,
+    #     instead of every starting process resetting all of them
+    """
+    ALTER TABLE notification_outbox ADD COLUMN claimed_at REAL;   -- unix time of the current claim
+    """,
+]
+
+def schema_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def run_migrations():
+    """
+    Apply pending MIGRATIONS in order. Each step runs in its own transaction
+    together with the user_version bump, so a crash never leaves a half step.
+    Foreign keys are not enforced on pooled connections (CONNECTION_PRAGMAS),
+    so table rebuilds do not cascade; ledger rows of deleted accounts are
+    kept on purpose and are not treated as violations.
+    Returns the resulting schema version.
+    """
+    with get_conn() as conn:
+        version = schema_version(conn)
+        if version >= len(MIGRATIONS):
+            return version
+        # Table rebuilds must not trip over the view of the table being replaced
+        conn.execute('DROP VIEW IF EXISTS temp.all_transactions')
+        try:
+            for target in range(version + 1, len(MIGRATIONS) + 1):
+                step = MIGRATIONS[target - 1]
+                conn.executescript(
+                    f'BEGIN IMMEDIATE;\n{step}\nPRAGMA user_version = {target};\nCOMMIT;'
+                )
+                version = target
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute(ALL_TRANSACTIONS_VIEW)
+        return version
+
+def backup_db(dest):
+    """
+    Copy the live (hot) database to `dest` using SQLite's online backup API.
+    The archive only changes when a period is archived; copy it after that.
+    """
+    with get_conn() as conn:
+        target = sqlite3.connect(str(dest))
+        try:
+            conn.backup(target)
+        finally:
+            target.close()
 
 def initialize_db(sql_file: str = None):
     """
-    Create tables. If sql_file provided, execute that SQL file; otherwise create inline.
+    Create tables from sql_file (default: init_db.sql next to this module),
+    then apply MIGRATIONS.
     """
+    with open(sql_file or INIT_SQL, 'r', encoding='utf-8') as f:
+        sql = f.read()
     with get_conn(True) as conn:
         cur = conn.cursor()
-        cur.execute('PRAGMA foreign_keys = ON;')
-        if sql_file:
-            with open(sql_file, 'r', encoding='utf-8') as f:
-                sql = f.read()
-            cur.executescript(sql)
-        else:
-            cur.execute('''
-            CREATE TABLE IF NOT EXISTS accounts (
-                account_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE,
-                phone TEXT,
-                balance REAL NOT NULL DEFAULT 0.0,
-                pin_hash TEXT NOT NULL,
-                created_at TEXT DEFAULT (datetime('now'))
-            )
-            ''')
-            cur.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                tx_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                type TEXT NOT NULL,
-                amount REAL NOT NULL,
-                balance_after REAL NOT NULL,
-                note TEXT,
-                created_at TEXT DEFAULT (datetime('now')),
-                FOREIGN KEY(account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
-            )
-            ''')
-            cur.execute('CREATE INDEX IF NOT EXISTS idx_tx_account ON transactions(account_id)')
+        cur.executescript(sql)
+        # init_db.sql enables foreign keys; this is a pooled connection
+        cur.execute('PRAGMA foreign_keys = OFF')
         conn.commit()
+    run_migrations()
+
+
+if __name__ == '__main__':
+    # One-shot schema upgrade:  python db.py migrate [--no-backup]
+    import sys
+    from datetime import datetime
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print('usage: python db.py migrate [--no-backup]')
+        sys.exit(2)
+    with get_conn() as conn:
+        before = schema_version(conn)
+    if before >= len(MIGRATIONS):
+        print(f'{DB_FILE} is up to date (schema version {before}).')
+        sys.exit(0)
+    if '--no-backup' not in sys.argv:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        backup = DB_FILE.with_name(f'{DB_FILE.stem}.v{before}.{stamp}.bak')
+        backup_db(backup)
+        print(f'Backup written to {backup}')
+    after = run_migrations()
+    print(f'{DB_FILE}: schema version {before} -> {after}')
@@ -0,0 +1,173 @@
+# group_commit.py - single-writer group commit for money movements
+"""
+Every models.deposit/withdraw/transfer commits (and syncs) on its own. Under
+load most of that time is spent committing, not working. This module puts
+one writer thread in front of the database: request threads queue their
+operation and get a Future back; the writer collects a micro-batch (up to
+MAX_BATCH operations, waiting at most MAX_LATENCY_MS for more to arrive),
+runs each one inside its own SAVEPOINT in a single transaction, and commits
+once.
+
+Atomicity per operation is unchanged: an operation that raises is rolled
+back to its savepoint and its Future gets the exception, while the rest of
+the batch commits. Futures resolve only after the COMMIT, so a result is
+never reported for data that is not durable; if the commit itself fails
+every operation of the batch fails with that error.
+
+    balance = group_commit.deposit(7, 500).result()
+
+Pass idempotency=(key, models.request_fingerprint(...)) to apply an
+operation at most once per Idempotency-Key of its first account
+(models.run_once); the Future then resolves to (result, replayed).
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import models
+from db import get_conn
+
+log = logging.getLogger("bank.group_commit")
+
+MAX_BATCH = int(os.environ.get("BANK_GROUP_COMMIT_BATCH", "256"))
+MAX_LATENCY_MS = float(os.environ.get("BANK_GROUP_COMMIT_LATENCY_MS", "2"))
+
+
+class GroupCommitWriter:
+    def __init__(self, max_batch=MAX_BATCH, max_latency_ms=MAX_LATENCY_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max(0.0, max_latency_ms) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, core, *args):
+        """Queue core(cur, *args) (a models._deposit-style function). Returns a Future."""
+        future = Future()
+        self._queue.put((future, core, args))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch:
+            try:
+                # Take whatever is already queued, then wait out the latency budget
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _apply(self, batch):
+        outcomes = []
+        with get_conn(write=True) as conn:
+            cur = conn.cursor()
+            for future, core, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cur.execute("SAVEPOINT op")
+                try:
+                    result = core(cur, *args)
+                except Exception as e:
+                    cur.execute("ROLLBACK TO op")
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+                cur.execute("RELEASE op")
+            conn.commit()
+        return outcomes
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                outcomes = self._apply(batch)
+            except Exception as e:
+                log.exception("Group commit of %d operations failed", len(batch))
+                outcomes = [(f, None, e) for f, _, _ in batch if not f.cancelled()]
+            failed = 0
+            for future, result, error in outcomes:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    failed += 1
+                    future.set_exception(error)
+            with self._lock:
+                self.batches += 1
+                self.operations += len(outcomes)
+                self.failed += failed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "operations": self.operations,
+                "failed": self.failed,
+                "avg_batch": round(self.operations / self.batches, 2) if self.batches else 0,
+                "queued": self._queue.qsize(),
+            }
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """The process-wide writer, (re)started on first use and after a fork."""
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer = GroupCommitWriter()
+                _writer_pid = os.getpid()
+    return _writer
+
+def _failed(error):
+    future = Future()
+    future.set_exception(error)
+    return future
+
+def _submit(core, args, idempotency):
+    if idempotency is None:
+        return get_writer().submit(core, *args)
+    # Keys are scoped to the first account: the deposit/withdraw account or transfer source
+    return get_writer().submit(models.run_once, args[0], *idempotency, core, *args)
+
+def deposit(account_id, amount, note=None, notify=False, idempotency=None):
+    """Future resolving to models.deposit()'s result."""
+    try:
+        amount = models.positive_amount(amount)
+    except ValueError as e:
+        return _failed(e)
+    return _submit(models._deposit, (account_id, amount, note, notify), idempotency)
+
+def withdraw(account_id, amount, note=None, notify=False, idempotency=None):
+    """Future resolving to models.withdraw()'s result."""
+    try:
+        amount = models.positive_amount(amount)
+    except ValueError as e:
+        return _failed(e)
+    return _submit(models._withdraw, (account_id, amount, note, notify), idempotency)
+
+def transfer(from_acct, to_acct, amount, notify=False, idempotency=None):
+    """Future resolving to models.transfer()'s result."""
+    try:
+        amount = models.positive_amount(amount)
+    except ValueError as e:
+        return _failed(e)
+    return _submit(models._transfer, (from_acct, to_acct, amount, notify), idempotency)
@@ -7,12 +7,13 @@ from PIL import Image, ImageTk
 import webbrowser
 from pathlib import Path
 import models
+import notifications
+import statements
 import datetime
 from utils import verify_pin
-from live_pincode_lookup import lookup_pin
+from live_pincode_lookup import lookup_pin_async
 import re
 import winsound
-import requests
 
 UPI_REGEX = re.compile(r"^[a-zA-Z0-9.\-_]{2,256}@[a-zA-Z]{2,64}$")
 DAILY_ATM_LIMIT = 25000
@@ -21,8 +22,6 @@ RUPEE = "₹"
 FREE_ATM_WITHDRAWALS = 3
 ATM_CHARGE_AFTER_FREE = 20
 DAILY_TRANSFER_LIMIT = 50000
-MONTHLY_MAINTENANCE_CHARGE = 30
-MONTHLY_SMS_CHARGE = 25
 THEMES = {
     "light": {
         "bg": "#f8fafc",
@@ -60,134 +59,17 @@ SUPPORTED_IMAGE_EXTS = (
     ".tiff", ".webp", ".gif", ".ico"
 )
 
-# ---------- Notification System (Email + SMS Simulation) ----------
-def send_email(to_email, subject, body):
-    """
-    REAL INSTANT EMAIL using Gmail SMTP
-    """
-    if not to_email:
-        return
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-
-    SMTP_SERVER = "smtp.gmail.com"
-    SMTP_PORT = 587
-    EMAIL_ID = "yourbankemail@gmail.com"
-    EMAIL_PASSWORD = "ekmvwfljrajgycrx"
-
-    msg = MIMEMultipart()
-    msg["From"] = EMAIL_ID
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body, "plain"))
-
-    try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_ID, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-    except Exception as e:
-        print("❌ EMAIL FAILED:", e)
-
-def send_sms(to_phone, message):
+# ---------- Notification System (Email + SMS) ----------
+def notify_user(acc, event, **kwargs):
     """
-    REAL INSTANT SMS using Fast2SMS
-    Delivery time: ~1–3 seconds
+    Central notification dispatcher.
+    Alerts are queued in the notification outbox and sent by background
+    workers, so the UI never waits on SMTP or the SMS gateway.
     """
-
-    if not to_phone:
-        return
-
-    phone = str(to_phone).strip()
-    if phone.startswith("+91"):
-        phone = phone.replace("+91", "")
-    if not phone.isdigit() or len(phone) != 10:
-        return
-
-    url = "https://www.fast2sms.com/dev/bulkV2"
-
-    payload = {
-        "route": "q",
-        "message": message,
-        "language": "english",
-        "numbers": phone,
-    }
-
-    headers = {
-        "authorization": "RNcAqSnWLQbKJXdhePrtikYp5Da3G6Tgxv8MmOl9fV1jHsBw24TYROG84JCtoxvm2QDBflV0HU37jcNy",
-        "Content-Type": "application/json",
-    }
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=5)
-        response.raise_for_status()
+        notifications.notify(acc, event, **kwargs)
     except Exception as e:
-        print("❌ SMS FAILED:", e)
-
-def notify_user(acc, event, **kwargs):
-    """
-    Central notification dispatcher
-    """
-    email = acc.get("email")
-    phone = acc.get("phone")
-    messages = {
-        "ACCOUNT_CREATED": (
-            "Account Created",
-            f"Dear {acc['name']}, your Bank A/c {acc['account_id']} has been successfully opened. "
-            f"Available Balance: ₹{acc['balance']}. Thank you for banking with us."
-        ),
-
-        "DEPOSIT": (
-            "Deposit Alert",
-            f"₹{kwargs['amount']} credited to A/c {acc['account_id']}. "
-            f"Avl Bal: ₹{kwargs['balance']}. If not you, contact bank immediately."
-        ),
-
-        "WITHDRAW": (
-            "Withdrawal Alert",
-            f"₹{kwargs['amount']} debited from A/c {acc['account_id']}. "
-            f"Avl Bal: ₹{kwargs['balance']}. Txn Time: {datetime.datetime.now().strftime('%d-%m-%Y %I:%M %p')}"
-        ),
-
-        "TRANSFER": (
-            "Transfer Alert",
-            f"₹{kwargs['amount']} transferred from A/c {acc['account_id']}. "
-            f"Avl Bal: ₹{kwargs['balance']}."
-        ),
-
-        "PIN_CHANGED": (
-            "Security Alert",
-            f"Your ATM/Debit PIN for A/c {acc['account_id']} was changed successfully. "
-            f"If not you, contact bank immediately."
-        ),
-
-        "ACCOUNT_DELETED": (
-            "Account Closed",
-            f"Your Bank A/c {acc['account_id']} has been permanently closed. "
-            f"Thank you for banking with us."
-        ),
-        "ACCOUNT_LOCKED": (
-            "Security Alert",
-            f"Your Bank A/c {acc['account_id']} has been temporarily locked due to multiple wrong PIN attempts. "
-            f"Please contact bank support."
-        ),
-    }
-
-
-    if event not in messages:
-        return
-
-    subject, text = messages[event]
-
-    # Send Email (optional)
-    if email:
-        send_email(email, subject, text)
-    
-    # Send SMS ONLY if phone exists and role is USER
-    if phone and acc.get("account_id"):
-        send_sms(phone, text)
-    
+        print("❌ NOTIFICATION QUEUE FAILED:", e)
 
 def theme_color(self, key):
     return self.theme.get(key, "#ffffff")
@@ -205,40 +87,6 @@ def to_float(val, default=0.0):
     except:
         return default
 
-def apply_monthly_charges(acc_id):
-    """
-    Deduct monthly maintenance + SMS charges once per month
-    """
-    acc = models.get_account(acc_id)
-    if not acc:
-        return
-
-    month = datetime.date.today().strftime("%Y-%m")
-
-    txs = models.get_transactions(acc_id, limit=200)
-
-    already_deducted = any(
-        "Monthly Maintenance" in (t.get("note") or "")
-        and t["created_at"].startswith(month)
-        for t in txs
-    )
-
-    if already_deducted:
-        return  # ✅ Already charged this month
-
-    total = MONTHLY_MAINTENANCE_CHARGE + MONTHLY_SMS_CHARGE
-
-    if acc["balance"] < total:
-        return  # no negative balance auto-deduction
-
-    note = "Monthly Maintenance + SMS Charges"
-
-    models.withdraw(
-        acc_id,
-        total,
-        note=note,
-    )
-
 # ---------- Global Currency Formatter ----------
 def format_currency(value):
     """
@@ -315,7 +163,7 @@ class LoginGUI(tk.Tk):
                 return messagebox.showerror("Login Failed", "Admin ID and password required")
 
             if not models.verify_admin(user_id, password):
-                return messagebox.showerror("Login Failed", "Invalid admin credentials")
+                return messagebox.showerror("Login Failed", "Invalid admin credentials (use the web admin PIN)")
 
             # ✅ ADMIN LOGIN SUCCESS
             self.destroy()
@@ -346,7 +194,7 @@ class LoginGUI(tk.Tk):
             )
 
         # 🔑 VERIFY PIN
-        if not verify_pin(password, acc["pin_hash"]):
+        if not models.check_pin(acc, password):
             models.register_failed_attempt(aid)
             if acc.get("is_locked"):
                 notify_user(acc, "ACCOUNT_LOCKED")
@@ -355,9 +203,6 @@ class LoginGUI(tk.Tk):
         # ✅ SUCCESS
         models.reset_failed_attempts(aid)
 
-        # Apply monthly charges silently
-        apply_monthly_charges(aid)
-
         self.destroy()
 
         app = BankGUI()
@@ -825,7 +670,7 @@ class BankGUI(tk.Tk):
                 popup.destroy()
                 return messagebox.showerror("Error", "Account not found")
 
-            if not verify_pin(pin_var.get(), acc["pin_hash"]):
+            if not models.check_pin(acc, pin_var.get()):
                 models.register_failed_attempt(account_no)
 
                 if acc.get("is_locked"):
@@ -1088,12 +933,9 @@ class BankGUI(tk.Tk):
             justify="left"
         ).pack(anchor="w")
 
-    def save_account_pdf(self, acc_id):
-        try:
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib.utils import ImageReader
-        except ImportError:
+    def save_account_pdf(self, acc_id, kyc=False):
+        """Render the account's full statement off the Tk thread (see statements.py)."""
+        if statements.canvas is None:
             messagebox.showerror(
                 "PDF Error",
                 "ReportLab is not installed.\n\nInstall using:\n pip install reportlab"
@@ -1101,111 +943,20 @@ class BankGUI(tk.Tk):
             return
 
         file_path = f"account_{acc_id}.pdf"
+        future = statements.render_async(acc_id, path=file_path, kyc=kyc)
 
-        # PDF setup
-        c = canvas.Canvas(file_path, pagesize=A4)
-        width, height = A4
-        y = height - 50
-
-        # Title
-        # Header banner
-        c.setFillColorRGB(0.12, 0.23, 0.54)
-        c.rect(0, height-80, width, 80, fill=1)
-        c.setFillColorRGB(1, 1, 1)
-
-        c.setFont("Helvetica-Bold", 22)
-        c.drawString(50, height-50, "BANK ACCOUNT STATEMENT")
-
-        c.setFont("Helvetica", 10)
-        c.drawString(50, height-70, f"Generated on: {datetime.date.today()}")    
-        y -= 30
-
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, f"Account ID: {acc_id}")
-        y -= 40
-
-        c.setFont("Helvetica", 11)
-
-        # ------------------ BASIC DETAILS ------------------
-        data = {
-            "Full Name": self.full_name_var.get(),
-            "Email": self.email_var.get(),
-            "Phone Number": self.phone_var.get(),
-            "DOB": self.dob_var.get(),
-            "Gender": self.gender_var.get(),
-            "Address Line 1": self.addr_line1_var.get(),
-            "Village / Town": self.village_var.get(),
-            "Tehsil": self.tehsil_var.get(),
-            "District": self.district_var.get(),
-            "State": self.state_var.get(),
-            "Postal Code": self.postal_code_var.get(),
-            "Initial Deposit": self.initial_deposit_var.get(),
-            "Account Type": self.account_type_var.get(),
-        }
-
-        for field, value in data.items():
-            c.drawString(50, y, f"{field}: {value}")
-            y -= 22
-
-            # Page break
-            if y < 80:
-                c.showPage()
-                y = height - 50
-                c.setFont("Helvetica", 11)
-
-        # ------------------ ADD IMAGES SECTION ------------------
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y - 10, "Attached KYC Documents:")
-        y -= 40
-
-        # ID Document Photo
-        id_path = self.id_doc_path_var.get().strip()
-        photo_path = self.photo_path_var.get().strip()
-
-        if id_path:
-            try:
-                img = ImageReader(id_path)
-                c.drawImage(img, 50, y - 180, width=200, height=180, preserveAspectRatio=True)
-                c.setFont("Helvetica", 11)
-                c.drawString(50, y - 200, "ID Document")
-            except:
-                c.drawString(50, y, "ID Document: (Unable to load image file)")
-            y -= 230
-
-        if photo_path:
+        def on_done():
+            if not future.done():
+                self.after(100, on_done)
+                return
             try:
-                img = ImageReader(photo_path)
-                c.drawImage(img, 50, y - 180, width=200, height=180, preserveAspectRatio=True)
-                c.setFont("Helvetica", 11)
-                c.drawString(50, y - 200, "Passport Photo")
-            except:
-                c.drawString(50, y, "Passport Photo: (Unable to load image file)")
-            y -= 230
-
-        # ---- TRANSACTION SUMMARY ----
-        y -= 30
-        c.setFillColorRGB(0, 0, 0)
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, "Recent Transactions")
-
-        y -= 20
-        c.setFont("Helvetica", 10)
-
-        txs = models.get_transactions(acc_id, limit=10)
-        for t in txs:
-            c.drawString(
-                50, y,
-                f"{t['created_at']} | {t['type']} | ₹{t['amount']} | Bal ₹{t['balance_after']}"
-            )
-            y -= 15
-            if y < 80:
-                c.showPage()
-                y = height - 50
-
-        # SAVE PDF
-        c.save()
+                future.result()
+            except Exception as e:
+                messagebox.showerror("PDF Error", f"Could not create the statement:\n{e}")
+                return
+            messagebox.showinfo("PDF Generated", f"PDF saved successfully as:\n{file_path}")
 
-        messagebox.showinfo("PDF Generated", f"PDF saved successfully as:\n{file_path}")
+        on_done()
 
     
     def validate_pin_live(self, P):
@@ -1694,9 +1445,16 @@ class BankGUI(tk.Tk):
             self.district_var.set("Searching...")
             self.state_var.set("Searching...")
 
-            def do_lookup():
-                from live_pincode_lookup import lookup_pin
-                data = lookup_pin(pin)
+            # Resolve off the Tk thread; poll the future from the event loop
+            future = lookup_pin_async(pin)
+
+            def apply_result():
+                if not future.done():
+                    self.after(50, apply_result)
+                    return
+                if self.postal_code_var.get().strip() != pin:
+                    return  # user typed a different PIN meanwhile
+                data = future.result()
 
                 if data:
                     self.tehsil_var.set(data["tehsil"])       # Block → Tehsil
@@ -1707,7 +1465,7 @@ class BankGUI(tk.Tk):
                     self.district_var.set("")
                     self.state_var.set("")
 
-            self.after(100, do_lookup)
+            apply_result()
 
         self.postal_entry.bind("<FocusOut>", autofill_from_pin)
         self.postal_entry.bind("<Return>", autofill_from_pin)
@@ -2175,7 +1933,7 @@ class BankGUI(tk.Tk):
             self.show_success_animation()
             acc = models.get_account(acc_id)
             notify_user(acc, "ACCOUNT_CREATED")
-            self.save_account_pdf(acc_id)
+            self.save_account_pdf(acc_id, kyc=True)
             # AUTO-LOGIN USER
             self.session["account_id"] = acc_id
             self.session["role"] = "USER"
@@ -3029,9 +2787,8 @@ class BankGUI(tk.Tk):
                     if method.get() == "QR":
                         note = f"QR Deposit Ref: {getattr(self, 'qr_reference', '')}"
 
-                    new = models.deposit(acc, amount, note=note)
-                    acc_data = models.get_account(acc)
-                    notify_user(acc_data, "DEPOSIT", amount=amount, balance=new)
+                    new = models.deposit(acc, amount, note=note, notify=True)
+                    notifications.wake()
                     messagebox.showinfo("Success", f"{format_currency(amount)} deposited\nNew Balance: ₹{new}")
                     amt.delete(0, tk.END)
                     self.deposit_upi_verified = False
@@ -3259,13 +3016,7 @@ class BankGUI(tk.Tk):
             acc_id = self.session["account_id"] if self.session["role"] == "USER" else to_int(aid.get())
             acc = models.get_account(acc_id) if acc_id else None
 
-            month = datetime.date.today().strftime("%Y-%m")
-            txs = models.get_transactions(acc_id, limit=200)
-
-            monthly_count = sum(
-                1 for t in txs
-                if t["type"] == "Withdraw" and t["created_at"].startswith(month)
-            )
+            monthly_count = models.get_usage(acc_id, "Withdraw", "month")["count"] if acc_id else 0
 
             fee = 0
             if monthly_count >= FREE_ATM_WITHDRAWALS:
@@ -3289,26 +3040,14 @@ class BankGUI(tk.Tk):
 
         # ================= CONFIRM =================
         def confirm_withdraw(acc_id, amt_val):
-            month = datetime.date.today().strftime("%Y-%m")
-            txs = models.get_transactions(acc_id, limit=200)
-
-            monthly_count = sum(
-                1 for t in txs
-                if t["type"] == "Withdraw" and t["created_at"].startswith(month)
-            )
+            usage = models.get_usage_summary(acc_id)
+            monthly_count = usage["month"].get("Withdraw", {}).get("count", 0)
 
             fee = ATM_CHARGE_AFTER_FREE if monthly_count >= FREE_ATM_WITHDRAWALS else 0
 
             total = amt_val + fee
             # ----- DAILY LIMIT CHECK -----
-            today = datetime.date.today().isoformat()
-            txs = models.get_transactions(acc_id, limit=100)
-
-            today_withdrawn = sum(
-                t["amount"]
-                for t in txs
-                if t["type"] == "Withdraw" and t["created_at"].startswith(today)
-            )
+            today_withdrawn = usage["day"].get("Withdraw", {}).get("amount", 0)
 
             if today_withdrawn + amt_val > DAILY_ATM_LIMIT:
                 return messagebox.showerror(
@@ -3329,9 +3068,8 @@ class BankGUI(tk.Tk):
                 return messagebox.showerror("Error", "Insufficient balance")
             try:
                 note = f"ATM Withdrawal – {atm_type.get()} – {location.get()}"
-                new_bal = models.withdraw(acc_id, total, note=note)
-                acc_data = models.get_account(acc_id)
-                notify_user(acc_data, "WITHDRAW", amount=amt_val, balance=new_bal)
+                new_bal = models.withdraw(acc_id, amt_val, note=note, notify=True, fee=fee)
+                notifications.wake()
                 self.show_withdraw_receipt(acc_id, amt_val, fee, new_bal)
                 amt_var.set("")
                 update_summary()
@@ -3505,14 +3243,7 @@ class BankGUI(tk.Tk):
             if t <= 0 or a <= 0:
                 return messagebox.showerror("Error", "Enter valid details")
             # ----- DAILY TRANSFER LIMIT CHECK -----
-            today = datetime.date.today().isoformat()
-            txs = models.get_transactions(f, limit=200)
-
-            today_transferred = sum(
-                t["amount"]
-                for t in txs
-                if t["type"] == "Transfer-Out" and t["created_at"].startswith(today)
-            )
+            today_transferred = models.get_usage(f, "Transfer-Out", "day")["amount"]
 
             if today_transferred + a > DAILY_TRANSFER_LIMIT:
                 return messagebox.showerror(
@@ -3523,9 +3254,8 @@ class BankGUI(tk.Tk):
 
             def do_transfer():
                 try:
-                    new_from_balance, _ = models.transfer(f, t, a)
-                    acc_data = models.get_account(f)
-                    notify_user(acc_data, "TRANSFER", amount=a, balance=new_from_balance)
+                    new_from_balance, _ = models.transfer(f, t, a, notify=True)
+                    notifications.wake()
                     self.show_transfer_receipt(f, t, a, new_from_balance)
                     amt_var.set("")
                     to_acc.delete(0, tk.END)
@@ -1,4 +1,5 @@
 PRAGMA foreign_keys = ON;
+-- Base schema. Later changes (indexes, new tables) live in db.MIGRATIONS.
 
 CREATE TABLE IF NOT EXISTS accounts (
     account_id INTEGER PRIMARY KEY AUTOINCREMENT,
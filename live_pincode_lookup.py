@@ -1,42 +1,260 @@
-import requests
+"""
+live_pincode_lookup.py - PIN code -> tehsil/district/state resolver
 
-def lookup_pin(pin):
-    url = f"https://api.postalpincode.in/pincode/{pin}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-        "Accept": "application/json"
+Lookups go through three tiers: an in-memory LRU, an on-disk SQLite table
+(pincodes.db) and, only on a miss, api.postalpincode.in. Results are written
+back to both caches; "no such PIN code" answers are cached too (for
+NEGATIVE_TTL seconds) so typos do not hit the network again. Network errors
+are never cached.
+
+The disk table can be bulk-loaded from an India Post directory CSV, after
+which lookups work fully offline:
+
+    python live_pincode_lookup.py preload all_india_pincode.csv
+
+GUI code should use lookup_pin_async() so the Tk thread never waits on HTTP.
+"""
+import csv
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+PINCODE_DB = Path(os.environ.get("BANK_PINCODE_DB", Path(__file__).parent / "pincodes.db"))
+API_URL = "https://api.postalpincode.in/pincode/{pin}"
+MEMORY_CACHE_SIZE = 4096
+NEGATIVE_TTL = 24 * 3600
+HTTP_TIMEOUT = 10
+
+# CSV header aliases used by the India Post / data.gov.in directory dumps
+CSV_COLUMNS = {
+    "pin": ("pincode", "pin", "pin code"),
+    "tehsil": ("block", "taluk", "tehsil", "sub-district", "subdistname", "officename"),
+    "district": ("district", "districtname", "district name"),
+    "state": ("statename", "state", "state name"),
+}
+
+
+def fetch_remote(pin, session):
+    """
+    Ask api.postalpincode.in. Returns the address dict, or None when the API
+    says the PIN code does not exist. Raises on network/HTTP errors.
+    """
+    resp = session.get(API_URL.format(pin=pin), timeout=HTTP_TIMEOUT)
+    resp.raise_for_status()
+    data = resp.json()
+    if not (isinstance(data, list) and data and data[0].get("Status") == "Success"):
+        return None
+    po = (data[0].get("PostOffice") or [None])[0]
+    if not po:
+        return None
+    return {
+        # Prefer the Block name as tehsil; fall back to the post office name
+        "tehsil": po.get("Block") or po.get("Name", ""),
+        "district": po.get("District", ""),
+        "state": po.get("State", ""),
     }
 
-    try:
-        print("Requesting:", url)  # DEBUG
-        resp = requests.get(url, headers=headers, timeout=10)
 
-        print("Status:", resp.status_code)  # DEBUG
-        print("Raw response:", resp.text[:200], "...")  # DEBUG
+class PincodeResolver:
+    """Three-tier (memory -> disk -> network) PIN code lookup."""
+
+    def __init__(self, db_file=PINCODE_DB, cache_size=MEMORY_CACHE_SIZE,
+                 negative_ttl=NEGATIVE_TTL, fetch=fetch_remote, workers=2):
+        self.db_file = Path(db_file)
+        self.cache_size = cache_size
+        self.negative_ttl = negative_ttl
+        self.fetch = fetch
+        self._lru = OrderedDict()          # pin -> (result or None, expires_at or None)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._session = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pincode")
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "remote_lookups": 0, "remote_errors": 0}
+
+    # ----- disk tier -----
+    def _conn(self):
+        if self._db is None:
+            conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA mmap_size = 67108864")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pincodes (
+                    pin TEXT PRIMARY KEY,
+                    tehsil TEXT,
+                    district TEXT,
+                    state TEXT,
+                    found INTEGER NOT NULL,      -- 0 = cached "no such PIN code"
+                    fetched_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    def _disk_get(self, pin):
+        with self._db_lock:
+            row = self._conn().execute(
+                "SELECT tehsil, district, state, found, fetched_at FROM pincodes WHERE pin=?", (pin,)
+            ).fetchone()
+        if row is None:
+            return False, None, None
+        tehsil, district, state, found, fetched_at = row
+        if found:
+            return True, {"tehsil": tehsil, "district": district, "state": state}, None
+        expires = fetched_at + self.negative_ttl
+        if expires <= time.time():
+            return False, None, None
+        return True, None, expires
 
-        if resp.status_code != 200:
+    def _disk_put(self, pin, result):
+        values = (pin, result["tehsil"], result["district"], result["state"], 1, time.time()) if result \
+            else (pin, None, None, None, 0, time.time())
+        with self._db_lock:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO pincodes VALUES (?,?,?,?,?,?)", values)
+            conn.commit()
+
+    # ----- memory tier -----
+    def _memory_get(self, pin):
+        with self._lock:
+            entry = self._lru.get(pin)
+            if entry is None:
+                return False, None
+            result, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._lru[pin]
+                return False, None
+            self._lru.move_to_end(pin)
+            self.stats["memory_hits"] += 1
+            return True, result
+
+    def _memory_put(self, pin, result, expires=None):
+        with self._lock:
+            self._lru[pin] = (result, expires)
+            self._lru.move_to_end(pin)
+            while len(self._lru) > self.cache_size:
+                self._lru.popitem(last=False)
+
+    # ----- public API -----
+    def lookup(self, pin):
+        """Blocking lookup. Returns {"tehsil", "district", "state"} or None."""
+        pin = str(pin).strip()
+        if len(pin) != 6 or not pin.isdigit():
             return None
+        hit, result = self._memory_get(pin)
+        if hit:
+            return result
+        hit, result, expires = self._disk_get(pin)
+        if hit:
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            self._memory_put(pin, result, expires)
+            return result
+        try:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+                self._session.headers.update({
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+                    "Accept": "application/json",
+                })
+            with self._lock:
+                self.stats["remote_lookups"] += 1
+            result = self.fetch(pin, self._session)
+        except Exception:
+            with self._lock:
+                self.stats["remote_errors"] += 1
+            return None
+        self._disk_put(pin, result)
+        self._memory_put(pin, result, None if result else time.time() + self.negative_ttl)
+        return result
 
-        data = resp.json()
+    def lookup_async(self, pin):
+        """
+        Non-blocking lookup returning a concurrent.futures.Future.
+        Memory hits come back as an already-completed future.
+        """
+        hit, result = self._memory_get(str(pin).strip())
+        if hit:
+            future = Future()
+            future.set_result(result)
+            return future
+        return self._executor.submit(self.lookup, pin)
 
-        if isinstance(data, list) and len(data) > 0:
-            if data[0]["Status"] == "Success":
-                po_list = data[0]["PostOffice"]
-                # Prefer the Block name as City
-                block = po_list[0].get("Block", "")
+    def preload_csv(self, path, batch_size=5000):
+        """Bulk-load an India Post directory CSV into the disk cache. Returns rows loaded."""
+        loaded, batch, seen = 0, [], set()
+        now = time.time()
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            headers = {h.strip().lower(): h for h in (reader.fieldnames or [])}
+            cols = {}
+            for key, aliases in CSV_COLUMNS.items():
+                cols[key] = next((headers[a] for a in aliases if a in headers), None)
+            if not cols["pin"] or not cols["district"] or not cols["state"]:
+                raise ValueError(f"CSV needs pincode, district and state columns, got {reader.fieldnames}")
+            with self._db_lock:
+                conn = self._conn()
+                for row in reader:
+                    pin = (row.get(cols["pin"]) or "").strip()
+                    if len(pin) != 6 or not pin.isdigit() or pin in seen:
+                        continue      # first post office listed for a PIN wins
+                    seen.add(pin)
+                    tehsil = (row.get(cols["tehsil"]) or "").strip() if cols["tehsil"] else ""
+                    batch.append((pin, tehsil, row[cols["district"]].strip(), row[cols["state"]].strip(), 1, now))
+                    if len(batch) >= batch_size:
+                        conn.executemany("INSERT OR REPLACE INTO pincodes VALUES (?,?,?,?,?,?)", batch)
+                        loaded += len(batch)
+                        batch = []
+                if batch:
+                    conn.executemany("INSERT OR REPLACE INTO pincodes VALUES (?,?,?,?,?,?)", batch)
+                    loaded += len(batch)
+                conn.commit()
+        with self._lock:
+            self._lru.clear()
+        return loaded
 
-                # If Block missing, fallback to Name
-                if not block:
-                    block = po_list[0].get("Name", "")
+    def close(self):
+        self._executor.shutdown(wait=False)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
 
-                return {
-                    "tehsil": po_list[0]["Block"],      # ← Tehsil
-                    "district": po_list[0]["District"],
-                    "state": po_list[0]["State"]
-                }
 
-        return None
+_resolver = None
+_resolver_lock = threading.Lock()
 
-    except Exception as e:
-        print("ERROR:", e)  # DEBUG
-        return None
+def get_resolver():
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = PincodeResolver()
+    return _resolver
+
+def lookup_pin(pin):
+    """Blocking lookup (kept for existing callers); served from cache when possible."""
+    return get_resolver().lookup(pin)
+
+def lookup_pin_async(pin):
+    """Future resolving to the lookup_pin() result."""
+    return get_resolver().lookup_async(pin)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) == 3 and sys.argv[1] == "preload":
+        count = get_resolver().preload_csv(sys.argv[2])
+        print(f"Loaded {count} PIN codes into {PINCODE_DB}")
+    elif len(sys.argv) == 2:
+        print(lookup_pin(sys.argv[1]))
+    else:
+        print("usage: python live_pincode_lookup.py preload <csv> | <pincode>")
+        sys.exit(2)
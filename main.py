@@ -1,9 +1,11 @@
 # main.py - GUI entry point
 from gui import LoginGUI
+from db import run_migrations
 import models
 
 if __name__ == "__main__":
-    # ensure admin exists
+    # bring the schema up to date, then ensure admin exists
+    run_migrations()
     models.ensure_admin_account()
     LoginGUI().mainloop()
 
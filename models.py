@@ -1,21 +1,76 @@
 # models.py - account and transaction operations
 from db import get_conn
-from utils import hash_pin
+from utils import hash_pin, needs_rehash, verify_pin
+import notifications
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import datetime
+import os
 import hashlib
+import json
+import time
+
+# ---------- Money ----------
+class Money(int):
+    """
+    An amount in paise (1 rupee = 100 paise). Balances and ledger amounts are
+    stored and summed as integers; convert only at the edges:
+    Money.parse("1,250.50") -> Money(125050), Money(125050).rupees -> 1250.5
+    """
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, value):
+        """Rupees (str/int/float/Decimal) -> Money. Money passes through unchanged."""
+        if isinstance(value, Money):
+            return value
+        try:
+            rupees = Decimal(str(value).replace(",", "").strip())
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {value!r}")
+        if not rupees.is_finite():
+            raise ValueError(f"Invalid amount: {value!r}")
+        return cls((rupees * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+    @property
+    def rupees(self):
+        return int(self) / 100
+
+    def __str__(self):
+        sign = "-" if self < 0 else ""
+        return f"{sign}{abs(int(self)) // 100}.{abs(int(self)) % 100:02d}"
+
+    def __repr__(self):
+        return f"Money({int(self)})"
+
+MONEY_FIELDS = ("balance", "initial_deposit", "amount", "balance_after")
+
+def money_row(row):
+    """dict(row) with paise columns converted to rupees for callers."""
+    d = dict(row)
+    for field in MONEY_FIELDS:
+        if d.get(field) is not None:
+            d[field] = Money(d[field]).rupees
+    return d
 
 # ---------- DEFAULT BANK ADMIN ----------
 ADMIN_ID = "admin"
-ADMIN_PASSWORD_HASH = hashlib.sha256("admin123".encode()).hexdigest()
+ADMIN_EMAIL = "admin@bank.local"
 
 def verify_admin(admin_id, password):
+    """
+    Desktop admin login: ADMIN_ID plus the PIN of the bank admin account (the
+    same credential as the web admin), checked and upgraded via check_pin().
+    """
     if admin_id != ADMIN_ID:
         return False
-    hashed = hashlib.sha256(password.encode()).hexdigest()
-    return hashed == ADMIN_PASSWORD_HASH
+    acc = get_account_by_email(ADMIN_EMAIL)
+    if not acc or acc.get("role") != "ADMIN":
+        return False
+    return check_pin(acc, password)
 
 def ensure_admin_account():
     from utils import hash_pin
-    with get_conn(True) as conn:
+    with get_conn(True, write=True) as conn:
         cur = conn.cursor()
         cur.execute("SELECT account_id FROM accounts WHERE role='ADMIN'")
         if cur.fetchone():
@@ -27,9 +82,9 @@ def ensure_admin_account():
             ) VALUES (?, ?, ?, ?, ?, ?)
         """, (
             "BANK_ADMIN",
-            "admin@bank.local",
+            ADMIN_EMAIL,
             "0000000000",
-            0.0,
+            0,
             hash_pin("123456"),
             "ADMIN"
         ))
@@ -57,6 +112,7 @@ def create_account(
 ):
     from utils import hash_pin
     pin_h = hash_pin(pin)
+    initial_deposit = Money.parse(initial_deposit or 0)
 
     with get_conn(True) as conn:
         cur = conn.cursor()
@@ -82,19 +138,17 @@ def create_account(
 
         # ✅ account_id is GUARANTEED here
         account_id = cur.lastrowid
+        bump_stat(cur, 'total_users', 1, account_id)
         # Initial transaction
         if initial_deposit > 0:
-            cur.execute("""
-                INSERT INTO transactions
-                (account_id, type, amount, balance_after, note)
-                VALUES (?,?,?,?,?)
-            """, (
+            add_transaction(
+                cur,
                 account_id,
                 "Deposit",
                 initial_deposit,
                 initial_deposit,
                 "Initial deposit"
-            ))
+            )
         conn.commit()
         return account_id
 
@@ -106,152 +160,949 @@ def get_account(account_id):
             (account_id,)
         )
         row = cur.fetchone()
-        return dict(row) if row else None
+        return money_row(row) if row else None
 
 def get_account_by_email(email):
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute('SELECT * FROM accounts WHERE email=?', (email,))
         row = cur.fetchone()
-        return dict(row) if row else None
+        return money_row(row) if row else None
 
 def update_balance(account_id, new_balance, cur):
     cur.execute('UPDATE accounts SET balance=? WHERE account_id=?', (new_balance, account_id))
 
+# ---------- Bank float ----------
+# The bank's cash position is spread over FUND_SHARDS rows picked by account,
+# so concurrent deposits/withdrawals do not all rewrite the same row.
+# Readers sum the shards; compact_bank_funds() folds them back into shard 0.
+FUND_SHARDS = 16
+
+def fund_shard(account_id):
+    return account_id % FUND_SHARDS
+
+def adjust_bank_funds(cur, account_id, delta):
+    cur.execute("""
+        INSERT INTO system_funds_shards (shard, balance) VALUES (?, ?)
+        ON CONFLICT(shard) DO UPDATE SET balance = balance + excluded.balance
+    """, (fund_shard(account_id), delta))
+
+def get_bank_balance():
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(SUM(balance), 0) AS balance FROM system_funds_shards")
+        return Money(cur.fetchone()["balance"]).rupees
+
+def compact_bank_funds():
+    """Fold every shard into shard 0. Returns the (unchanged) total."""
+    with get_conn(True, write=True) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(SUM(balance), 0) AS balance FROM system_funds_shards")
+        total = cur.fetchone()["balance"]
+        cur.execute("DELETE FROM system_funds_shards")
+        cur.execute("INSERT INTO system_funds_shards (shard, balance) VALUES (0, ?)", (total,))
+        conn.commit()
+        return Money(total).rupees
+
+# ---------- Dashboard aggregates ----------
+# Running totals for /api/admin/stats, kept in bank_stats by the same
+# transactions that change them (sharded by account like the bank float).
+# rebuild_bank_stats() recomputes them from scratch for recovery.
+TX_STATS = {
+    'Deposit': 'total_deposits',
+    'Withdraw': 'total_withdrawals',
+    'Transfer-Out': 'total_transfers',
+}
+MONEY_STATS = ('total_deposits', 'total_withdrawals', 'total_transfers')
+
+STAT_UPSERT_SQL = """
+    INSERT INTO bank_stats (stat, shard, value) VALUES (?, ?, ?)
+    ON CONFLICT(stat, shard) DO UPDATE SET value = value + excluded.value
+"""
+
+def bump_stat(cur, stat, delta, account_id):
+    cur.execute(STAT_UPSERT_SQL, (stat, fund_shard(account_id), delta))
+
+def _read_bank_stats(cur):
+    cur.execute("SELECT stat, SUM(value) AS value FROM bank_stats GROUP BY stat")
+    totals = {r['stat']: r['value'] for r in cur.fetchall()}
+    stats = {'total_users': totals.get('total_users', 0)}
+    for stat in MONEY_STATS:
+        stats[stat] = Money(totals.get(stat, 0)).rupees
+    return stats
+
+def get_bank_stats():
+    """{'total_users', 'total_deposits', 'total_withdrawals', 'total_transfers'} (amounts in rupees)."""
+    with get_conn() as conn:
+        return _read_bank_stats(conn.cursor())
+
+def get_admin_snapshot():
+    """
+    Every admin dashboard figure (bank balance plus get_bank_stats()), read
+    inside one transaction so they all reflect the same commit.
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        snapshot = _read_bank_stats(cur)
+        cur.execute("SELECT COALESCE(SUM(balance), 0) AS balance FROM system_funds_shards")
+        snapshot['bank_balance'] = Money(cur.fetchone()['balance']).rupees
+        conn.rollback()
+    return snapshot
+
+def rebuild_bank_stats():
+    """Recompute bank_stats from accounts and transactions. Returns get_bank_stats()."""
+    with get_conn(True, write=True) as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM bank_stats")
+        cur.execute("""
+            INSERT INTO bank_stats (stat, shard, value)
+            SELECT 'total_users', 0, COUNT(*) FROM accounts WHERE role='USER'
+        """)
+        cur.execute("""
+            SELECT type, SUM(amount) AS total FROM all_transactions GROUP BY type
+        """)
+        for r in cur.fetchall():
+            if r['type'] in TX_STATS:
+                cur.execute(STAT_UPSERT_SQL, (TX_STATS[r['type']], 0, r['total']))
+        conn.commit()
+    return get_bank_stats()
+
+# ---------- Usage counters ----------
+# Running per-day and per-month totals for each transaction type, kept in the
+# same transaction as the ledger row so limit checks are a key lookup.
+USAGE_PERIODS = {
+    'day': "date('now', 'localtime')",
+    'month': "strftime('%Y-%m', 'now', 'localtime')",
+}
+
+USAGE_UPSERT_SQL = f"""
+    INSERT INTO usage_counters (account_id, period, kind, count, amount)
+    SELECT ?, p.period, ?, 1, ?
+    FROM (SELECT {USAGE_PERIODS['day']} AS period
+          UNION ALL SELECT {USAGE_PERIODS['month']}) AS p
+    WHERE true
+    ON CONFLICT(account_id, period, kind) DO UPDATE SET
+        count = count + excluded.count,
+        amount = amount + excluded.amount
+"""
+
+def bump_usage(cur, account_id, kind, amount):
+    cur.execute(USAGE_UPSERT_SQL, (account_id, kind, amount))
+
+def get_usage(account_id, kind, period='day'):
+    """
+    Count and total amount of `kind` transactions (e.g. 'Withdraw',
+    'Transfer-Out') for the account today (period='day') or this month.
+    """
+    if period not in USAGE_PERIODS:
+        raise ValueError(f'Unknown usage period: {period}')
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT count, amount FROM usage_counters
+            WHERE account_id=? AND period={USAGE_PERIODS[period]} AND kind=?
+        """, (account_id, kind))
+        row = cur.fetchone()
+        if not row:
+            return {'count': 0, 'amount': 0}
+        return {'count': row['count'], 'amount': Money(row['amount']).rupees}
+
+def get_usage_summary(account_id):
+    """
+    All of today's and this month's counters for an account in one query:
+    {'day': {kind: {'count', 'amount'}}, 'month': {...}}
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT period, kind, count, amount FROM usage_counters
+            WHERE account_id=? AND period IN ({USAGE_PERIODS['day']}, {USAGE_PERIODS['month']})
+        """, (account_id,))
+        summary = {'day': {}, 'month': {}}
+        for r in cur.fetchall():
+            bucket = 'month' if len(r['period']) == 7 else 'day'
+            summary[bucket][r['kind']] = {'count': r['count'], 'amount': Money(r['amount']).rupees}
+        return summary
+
 # ---------- Transactions ----------
+TX_INSERT_SQL = 'INSERT INTO transactions (account_id,type,amount,balance_after,note) VALUES (?,?,?,?,?)'
+
 def add_transaction(cur, account_id, type_, amount, balance_after, note=None):
+    cur.execute(TX_INSERT_SQL, (account_id, type_, amount, balance_after, note))
+    bump_usage(cur, account_id, type_, amount)
+    if type_ in TX_STATS:
+        bump_stat(cur, TX_STATS[type_], amount, account_id)
+
+def _queue_alert(cur, account_id, row, event, amount, balance, fee=0):
+    """Queue a customer alert in the current transaction (see notifications.enqueue_in)."""
+    acc = {'account_id': account_id, 'name': row['name'], 'email': row['email'], 'phone': row['phone']}
+    notifications.enqueue_in(cur, acc, event, amount=Money(amount).rupees,
+                             balance=Money(balance).rupees, fee=Money(fee).rupees)
+
+# Each money movement is split into a core that works on an open cursor
+# (_deposit, _withdraw, _transfer: validated Money amount in, rupees out,
+# raises ValueError) and a public wrapper that owns the transaction. The
+# group-commit writer (group_commit.py) runs many cores in one transaction.
+def _deposit(cur, account_id, amount, note=None, notify=False):
+    # Fetch user
+    cur.execute(
+        "SELECT balance, is_locked, name, email, phone FROM accounts WHERE account_id=? AND role='USER'",
+        (account_id,)
+    )
+
+    row = cur.fetchone()
+    if not row:
+        raise ValueError('Account not found')
+    if row["is_locked"]:
+        raise ValueError("Account is locked by bank admin")
+
+
+    # Update bank funds
+    adjust_bank_funds(cur, account_id, amount)
+
+    # Update user balance
+    new_balance = row['balance'] + amount
+    update_balance(account_id, new_balance, cur)
+
+    # Log transaction
+    add_transaction(
+        cur,
+        account_id,
+        'Deposit',
+        amount,
+        new_balance,
+        note or 'Deposit credited from bank'
+    )
+    if notify:
+        _queue_alert(cur, account_id, row, 'DEPOSIT', amount, new_balance)
+    return Money(new_balance).rupees
+
+def _withdraw(cur, account_id, amount, note=None, notify=False, fee=0):
+    # fee (e.g. the ATM charge) is debited with the amount, in the same ledger row
+    total = amount + fee
+    cur.execute(
+        "SELECT balance, is_locked, name, email, phone FROM accounts WHERE account_id=? AND role='USER'",
+        (account_id,)
+    )
+    row = cur.fetchone()
+    if not row:
+        raise ValueError('Account not found')
+    if row["is_locked"]:
+        raise ValueError("Account is locked by bank admin")
+
+
+    if row['balance'] < total:
+        raise ValueError('Insufficient funds')
+
+    # Reduce bank funds
+    adjust_bank_funds(cur, account_id, -total)
+
+    new_balance = row['balance'] - total
+    update_balance(account_id, new_balance, cur)
+
+    add_transaction(
+        cur,
+        account_id,
+        'Withdraw',
+        total,
+        new_balance,
+        note or 'Withdrawal debited to bank'
+    )
+    if notify:
+        _queue_alert(cur, account_id, row, 'WITHDRAW', amount, new_balance, fee)
+    return Money(new_balance).rupees
+
+SAME_ACCOUNT_ERROR = 'Cannot transfer to the same account'
+
+def _transfer(cur, from_acct, to_acct, amount, notify=False):
+    # Both legs would read the same starting balance and the credit would win
+    if from_acct == to_acct:
+        raise ValueError(SAME_ACCOUNT_ERROR)
+    cur.execute(
+        "SELECT balance, is_locked, name, email, phone FROM accounts WHERE account_id=? AND role='USER'",
+        (from_acct,)
+    )
+    r1 = cur.fetchone()
     cur.execute(
-        'INSERT INTO transactions (account_id,type,amount,balance_after,note) VALUES (?,?,?,?,?)',
-        (account_id, type_, amount, balance_after, note)
+        "SELECT balance, is_locked FROM accounts WHERE account_id=? AND role='USER'",
+        (to_acct,)
     )
+    r2 = cur.fetchone()
+    if not r1 or not r2:
+        raise ValueError('One or both accounts not found')
+    if r1["is_locked"]:
+        raise ValueError("Source account is locked by bank admin")
+    if r2["is_locked"]:
+        raise ValueError("Destination account is locked by bank admin")
+    if r1['balance'] < amount:
+        raise ValueError('Insufficient funds in source account')
+
+    new_from = r1['balance'] - amount
+    new_to = r2['balance'] + amount
+    cur.execute('UPDATE accounts SET balance=? WHERE account_id=?', (new_from, from_acct))
+    cur.execute('UPDATE accounts SET balance=? WHERE account_id=?', (new_to, to_acct))
+    add_transaction(cur, from_acct, 'Transfer-Out', amount, new_from, f'Transfer to {to_acct}')
+    add_transaction(cur, to_acct, 'Transfer-In', amount, new_to, f'Transfer from {from_acct}')
+    if notify:
+        _queue_alert(cur, from_acct, r1, 'TRANSFER', amount, new_from)
+    return Money(new_from).rupees, Money(new_to).rupees
 
-def deposit(account_id, amount, note=None):
+def positive_amount(amount):
+    """Money.parse() that also rejects zero and negative amounts."""
+    amount = Money.parse(amount)
     if amount <= 0:
         raise ValueError('Amount must be positive')
+    return amount
 
-    with get_conn(True) as conn:
-        cur = conn.cursor()
+def deposit(account_id, amount, note=None, notify=False):
+    """
+    Credit an account. With notify=True the customer alert is written to the
+    notification outbox in the same transaction as the ledger entry.
+    """
+    amount = positive_amount(amount)
+    with get_conn(True, write=True) as conn:
+        return _deposit(conn.cursor(), account_id, amount, note, notify)
 
-        # Fetch user
-        cur.execute(
-            "SELECT balance, is_locked FROM accounts WHERE account_id=? AND role='USER'",
-            (account_id,)
-        )
-        
-        row = cur.fetchone()
-        if not row:
-            raise ValueError('Account not found')
-        if row["is_locked"]:
-            raise ValueError("Account is locked by bank admin")
-
-
-        # Update bank funds
-        cur.execute("UPDATE system_funds SET balance = balance + ?", (amount,))
-
-        # Update user balance
-        new_balance = row['balance'] + amount
-        update_balance(account_id, new_balance, cur)
-
-        # Log transaction
-        add_transaction(
-            cur,
-            account_id,
-            'Deposit',
-            amount,
-            new_balance,
-            note or 'Deposit credited from bank'
-        )
+def withdraw(account_id, amount, note=None, notify=False, fee=0):
+    """
+    Debit amount plus fee (one ledger row). The alert, if any, reports the
+    amount and the fee separately.
+    """
+    amount = positive_amount(amount)
+    fee = Money.parse(fee)
+    if fee < 0:
+        raise ValueError('Fee cannot be negative')
+    with get_conn(True, write=True) as conn:
+        return _withdraw(conn.cursor(), account_id, amount, note, notify, fee)
 
-        conn.commit()
-        return new_balance
+def transfer(from_acct, to_acct, amount, notify=False):
+    amount = positive_amount(amount)
+    with get_conn(True, write=True) as conn:
+        return _transfer(conn.cursor(), from_acct, to_acct, amount, notify)
+
+# ---------- Batch posting ----------
+BATCH_CHUNK_SIZE = 500
+
+BATCH_TYPES = ('deposit', 'withdraw', 'transfer')
 
-def withdraw(account_id, amount, note=None):
+def _parse_batch_op(op):
+    """Normalise one batch item; raises ValueError with a per-item message."""
+    if not isinstance(op, dict):
+        raise ValueError('Operation must be an object')
+    kind = str(op.get('type') or '').lower()
+    if kind not in BATCH_TYPES:
+        raise ValueError(f"Unknown operation type: {op.get('type')!r}")
+    try:
+        amount = Money.parse(op.get('amount'))
+    except ValueError:
+        raise ValueError('Amount must be a number')
     if amount <= 0:
         raise ValueError('Amount must be positive')
+    try:
+        if kind == 'transfer':
+            ids = (int(op['from_id']), int(op['to_id']))
+        else:
+            ids = (int(op['account_id']),)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Valid account id(s) required')
+    notify = op.get('notify')
+    if notify is True:
+        notify = {'deposit': 'DEPOSIT', 'withdraw': 'WITHDRAW', 'transfer': 'TRANSFER'}[kind]
+    return kind, ids, amount, op.get('note'), notify or None
 
-    with get_conn(True) as conn:
-        cur = conn.cursor()
+def _post_chunk(cur, chunk):
+    """
+    Validate and apply one chunk inside the caller's transaction.
+    Balances are loaded once and tracked in memory, so later items in the
+    chunk see the effect of earlier ones.
+    """
+    parsed = []
+    account_ids = set()
+    for op in chunk:
+        try:
+            item = _parse_batch_op(op)
+            account_ids.update(item[1])
+            parsed.append(item)
+        except ValueError as e:
+            parsed.append(e)
 
+    accounts = {}
+    if account_ids:
+        marks = ','.join('?' * len(account_ids))
         cur.execute(
-            "SELECT balance, is_locked FROM accounts WHERE account_id=? AND role='USER'",
-            (account_id,)
+            f"SELECT account_id, balance, is_locked, name, email, phone FROM accounts "
+            f"WHERE role='USER' AND account_id IN ({marks})",
+            tuple(account_ids)
         )
-        row = cur.fetchone()
-        if not row:
-            raise ValueError('Account not found')
-        if row["is_locked"]:
-            raise ValueError("Account is locked by bank admin")
-
+        accounts = {r['account_id']: dict(r) for r in cur.fetchall()}
 
-        if row['balance'] < amount:
-            raise ValueError('Insufficient funds')
+    results, ledger, touched, funds, alerts = [], [], set(), {}, []
 
-        # Reduce bank funds
-        cur.execute("UPDATE system_funds SET balance = balance - ?", (amount,))
+    def post(account_id, type_, amount, note):
+        acc = accounts[account_id]
+        acc['balance'] += amount if type_ in ('Deposit', 'Transfer-In') else -amount
+        touched.add(account_id)
+        ledger.append((account_id, type_, amount, acc['balance'], note))
+        return acc['balance']
 
-        new_balance = row['balance'] - amount
-        update_balance(account_id, new_balance, cur)
+    for item in parsed:
+        if isinstance(item, ValueError):
+            results.append({'ok': False, 'error': str(item)})
+            continue
+        kind, ids, amount, note, notify = item
+        missing = [i for i in ids if i not in accounts]
+        if missing:
+            results.append({'ok': False, 'error': 'Account not found'})
+            continue
+        if any(accounts[i]['is_locked'] for i in ids):
+            results.append({'ok': False, 'error': 'Account is locked by bank admin'})
+            continue
+        if kind == 'deposit':
+            bal = post(ids[0], 'Deposit', amount, note or 'Deposit credited from bank')
+            funds[fund_shard(ids[0])] = funds.get(fund_shard(ids[0]), 0) + amount
+            if notify:
+                alerts.append((ids[0], notify, amount, bal))
+            results.append({'ok': True, 'balance': Money(bal).rupees})
+        elif kind == 'withdraw':
+            if accounts[ids[0]]['balance'] < amount:
+                results.append({'ok': False, 'error': 'Insufficient funds'})
+                continue
+            bal = post(ids[0], 'Withdraw', amount, note or 'Withdrawal debited to bank')
+            funds[fund_shard(ids[0])] = funds.get(fund_shard(ids[0]), 0) - amount
+            if notify:
+                alerts.append((ids[0], notify, amount, bal))
+            results.append({'ok': True, 'balance': Money(bal).rupees})
+        else:
+            src, dst = ids
+            if src == dst:
+                results.append({'ok': False, 'error': SAME_ACCOUNT_ERROR})
+                continue
+            if accounts[src]['balance'] < amount:
+                results.append({'ok': False, 'error': 'Insufficient funds in source account'})
+                continue
+            new_from = post(src, 'Transfer-Out', amount, f'Transfer to {dst}')
+            new_to = post(dst, 'Transfer-In', amount, f'Transfer from {src}')
+            if notify:
+                alerts.append((src, notify, amount, new_from))
+            results.append({
+                'ok': True,
+                'from_balance': Money(new_from).rupees,
+                'to_balance': Money(new_to).rupees
+            })
 
-        add_transaction(
-            cur,
-            account_id,
-            'Withdraw',
-            amount,
-            new_balance,
-            note or 'Withdrawal debited to bank'
+    if ledger:
+        cur.executemany(TX_INSERT_SQL, ledger)
+        cur.executemany(USAGE_UPSERT_SQL, [(a, t, amt) for a, t, amt, _, _ in ledger])
+        stats = {}
+        for a, t, amt, _, _ in ledger:
+            if t in TX_STATS:
+                key = (TX_STATS[t], fund_shard(a))
+                stats[key] = stats.get(key, 0) + amt
+        cur.executemany(STAT_UPSERT_SQL, [(stat, shard, v) for (stat, shard), v in stats.items()])
+        cur.executemany(
+            'UPDATE accounts SET balance=? WHERE account_id=?',
+            [(accounts[a]['balance'], a) for a in touched]
         )
+    if funds:
+        cur.executemany("""
+            INSERT INTO system_funds_shards (shard, balance) VALUES (?, ?)
+            ON CONFLICT(shard) DO UPDATE SET balance = balance + excluded.balance
+        """, list(funds.items()))
+    for account_id, event, amount, balance in alerts:
+        _queue_alert(cur, account_id, accounts[account_id], event, amount, balance)
+    return results
 
-        conn.commit()
-        return new_balance
+def post_batch(operations, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Apply many deposits, withdrawals and transfers with one commit per chunk.
+    Each operation is a dict such as
+        {"type": "deposit", "account_id": 7, "amount": 500, "note": "Salary"}
+        {"type": "transfer", "from_id": 7, "to_id": 9, "amount": 120}
+    Add "notify": true to queue the customer alert with the ledger entry, or
+    name a notifications template (e.g. "MONTHLY_CHARGES") to use that text.
+    Returns one result per operation, in input order:
+        {"index": i, "ok": True, "balance": ...}  (transfers: from_balance/to_balance)
+        {"index": i, "ok": False, "error": "..."}
+    A failing item is skipped and reported; the rest of its chunk still commits.
+    """
+    if chunk_size <= 0:
+        raise ValueError('chunk_size must be positive')
+    operations = list(operations)
+    results = []
+    for start in range(0, len(operations), chunk_size):
+        chunk = operations[start:start + chunk_size]
+        with get_conn(False, write=True) as conn:
+            chunk_results = _post_chunk(conn.cursor(), chunk)
+            conn.commit()
+        for offset, res in enumerate(chunk_results):
+            results.append({'index': start + offset, **res})
+    return results
 
-def transfer(from_acct, to_acct, amount):
-    if amount <= 0:
-        raise ValueError('Amount must be positive')
-    with get_conn(False) as conn:
+def get_transactions(account_id, limit=100, before_tx_id=None, after_tx_id=None):
+    """
+    Newest-first history for an account, across the hot and archived tiers.
+    Pass before_tx_id (the last tx_id of the previous page) to page back in
+    time, or after_tx_id (the first tx_id seen) to fetch newer rows. Both seek
+    on the (account_id, created_at, tx_id) index of each tier, so deep pages
+    cost the same as the first page.
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if before_tx_id is not None:
+            cur.execute("""
+                SELECT * FROM all_transactions
+                WHERE account_id=?
+                  AND (created_at, tx_id) < (SELECT created_at, tx_id FROM all_transactions WHERE tx_id=?)
+                ORDER BY created_at DESC, tx_id DESC
+                LIMIT ?
+            """, (account_id, before_tx_id, limit))
+            rows = cur.fetchall()
+        elif after_tx_id is not None:
+            cur.execute("""
+                SELECT * FROM all_transactions
+                WHERE account_id=?
+                  AND (created_at, tx_id) > (SELECT created_at, tx_id FROM all_transactions WHERE tx_id=?)
+                ORDER BY created_at ASC, tx_id ASC
+                LIMIT ?
+            """, (account_id, after_tx_id, limit))
+            rows = cur.fetchall()[::-1]
+        else:
+            cur.execute("""
+                SELECT * FROM all_transactions
+                WHERE account_id=?
+                ORDER BY created_at DESC, tx_id DESC
+                LIMIT ?
+            """, (account_id, limit))
+            rows = cur.fetchall()
+        return [money_row(r) for r in rows]
+
+# ---------- Admin ledger ----------
+LEDGER_FETCH_SIZE = 500
+
+def iter_ledger(account_id=None, type_=None, date_from=None, date_to=None,
+                min_amount=None, max_amount=None, before_id=None, limit=None):
+    """
+    Yield the bank-wide ledger (both tiers) newest first (by tx_id), one dict per row,
+    reading the cursor in LEDGER_FETCH_SIZE batches so memory stays flat.
+    Filters are optional; dates are 'YYYY-MM-DD' (date_to is inclusive) and
+    amounts are in rupees. Pass the last id seen as before_id for the next page.
+    """
+    where = ["a.role='USER'"]
+    params = []
+    if account_id is not None:
+        where.append("t.account_id = ?")
+        params.append(int(account_id))
+    if type_:
+        where.append("t.type = ?")
+        params.append(type_)
+    if date_from:
+        where.append("t.created_at >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("t.created_at < date(?, '+1 day')")
+        params.append(date_to)
+    if min_amount is not None:
+        where.append("t.amount >= ?")
+        params.append(Money.parse(min_amount))
+    if max_amount is not None:
+        where.append("t.amount <= ?")
+        params.append(Money.parse(max_amount))
+    if before_id is not None:
+        where.append("t.tx_id < ?")
+        params.append(int(before_id))
+    sql = f"""
+        SELECT
+            t.tx_id AS id,
+            t.account_id,
+            a.name,
+            t.type,
+            t.amount,
+            t.balance_after,
+            t.note,
+            t.created_at
+        FROM all_transactions t
+        JOIN accounts a ON t.account_id = a.account_id
+        WHERE {' AND '.join(where)}
+        ORDER BY t.tx_id DESC
+    """
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(LEDGER_FETCH_SIZE)
+            if not rows:
+                break
+            for r in rows:
+                yield money_row(r)
+
+# ---------- History tiering ----------
+# Months older than HOT_MONTHS are moved from banking.db to the attached
+# archive database (db.ARCHIVE_SCHEMA), keeping the hot file, its indexes
+# and backups small. Reads go through the all_transactions view, so callers
+# never see the difference.
+# SQLite cannot commit two attached WAL databases atomically, so each step of
+# a move writes to one database only: copy (archive), delete what the archive
+# now holds (main), record the period (archive). A crash between steps leaves
+# rows in both tiers; the view counts those once (from main), and re-running
+# the period finishes the move.
+HOT_MONTHS = int(os.environ.get('BANK_HOT_MONTHS') or 3)
+
+def _period_bounds(period):
+    start = datetime.datetime.strptime(period, '%Y-%m')
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+def archivable_periods(hot_months=HOT_MONTHS):
+    """'YYYY-MM' periods still in the hot tier that are older than hot_months."""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT DISTINCT strftime('%Y-%m', created_at) AS period
+            FROM main.transactions
+            WHERE created_at < date('now', 'start of month', ?)
+            ORDER BY period
+        """, (f'-{int(hot_months)} months',))
+        return [r['period'] for r in cur.fetchall()]
+
+def archive_period(period):
+    """Move one closed month of history to the archive tier. Returns rows moved."""
+    start, end = _period_bounds(period)
+    if end > datetime.date.today().replace(day=1).isoformat():
+        raise ValueError(f'{period} is not a closed period')
+    with get_conn(True, write=True) as conn:
+        conn.execute("""
+            INSERT OR IGNORE INTO archive.transactions
+                (tx_id, account_id, type, amount, balance_after, note, created_at)
+            SELECT tx_id, account_id, type, amount, balance_after, note, created_at
+            FROM main.transactions
+            WHERE created_at >= ? AND created_at < ?
+        """, (start, end))
+    # Only rows the archive has committed leave the hot tier
+    with get_conn(True, write=True) as conn:
+        cur = conn.execute("""
+            DELETE FROM main.transactions
+            WHERE created_at >= ? AND created_at < ?
+              AND tx_id IN (SELECT tx_id FROM archive.transactions WHERE created_at >= ? AND created_at < ?)
+        """, (start, end, start, end))
+        moved = cur.rowcount
+    with get_conn(True, write=True) as conn:
+        conn.execute("""
+            INSERT INTO archive.archived_periods (period, row_count)
+            SELECT ?, COUNT(*) FROM archive.transactions WHERE created_at >= ? AND created_at < ?
+            ON CONFLICT(period) DO UPDATE SET
+                row_count = excluded.row_count,
+                archived_at = datetime('now')
+        """, (period, start, end))
+    return moved
+
+def archive_old_history(hot_months=HOT_MONTHS):
+    """Archive every period older than hot_months. Returns {period: rows moved}."""
+    return {period: archive_period(period) for period in archivable_periods(hot_months)}
+
+# ---------- Statements ----------
+# balance_snapshots holds each account's closing balance and totals per
+# month. A statement starts from the nearest snapshot at or before its start
+# date and reads only the ledger rows after it, so its cost depends on the
+# range asked for, not on how old the account is.
+CREDIT_TYPES = ('Deposit', 'Transfer-In')
+DEBIT_TYPES = ('Withdraw', 'Transfer-Out')
+
+SNAPSHOT_SQL = """
+    INSERT OR REPLACE INTO balance_snapshots
+        (account_id, period, closing_balance, last_tx_id, credits, debits, tx_count)
+    SELECT
+        a.account_id,
+        :period,
+        COALESCE(last.balance_after, 0),
+        last.tx_id,
+        COALESCE(SUM(CASE WHEN t.type IN ('Deposit', 'Transfer-In') THEN t.amount END), 0),
+        COALESCE(SUM(CASE WHEN t.type IN ('Withdraw', 'Transfer-Out') THEN t.amount END), 0),
+        COUNT(t.tx_id)
+    FROM accounts a
+    LEFT JOIN all_transactions t
+        ON t.account_id = a.account_id AND t.created_at >= :start AND t.created_at < :end
+    LEFT JOIN all_transactions last ON last.tx_id = (
+        SELECT l.tx_id FROM all_transactions l
+        WHERE l.account_id = a.account_id AND l.created_at < :end
+        ORDER BY l.created_at DESC, l.tx_id DESC LIMIT 1
+    )
+    WHERE a.role = 'USER' AND a.created_at < :end
+    GROUP BY a.account_id
+"""
+
+def snapshot_period(period):
+    """Record every account's closing balance and totals for a closed month. Returns accounts snapshotted."""
+    start, end = _period_bounds(period)
+    if end > datetime.date.today().replace(day=1).isoformat():
+        raise ValueError(f'{period} is not a closed period')
+    with get_conn(True, write=True) as conn:
+        cur = conn.cursor()
+        cur.execute(SNAPSHOT_SQL, {'period': period, 'start': start, 'end': end})
+        return cur.rowcount
+
+def snapshot_closed_periods():
+    """Snapshot every closed month after the latest snapshot. Returns {period: accounts}."""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT MAX(period) AS period FROM balance_snapshots")
+        latest = cur.fetchone()['period']
+        if latest:
+            first = _period_bounds(latest)[1][:7]
+        else:
+            cur.execute("SELECT strftime('%Y-%m', MIN(created_at)) AS period FROM accounts WHERE role='USER'")
+            first = cur.fetchone()['period']
+    done = {}
+    this_month = datetime.date.today().strftime('%Y-%m')
+    period = first
+    while period and period < this_month:
+        done[period] = snapshot_period(period)
+        period = _period_bounds(period)[1][:7]
+    return done
+
+def _opening_balance(cur, account_id, start):
+    """Balance at the start of `start` (a 'YYYY-MM-DD' date), via the nearest snapshot."""
+    cur.execute("""
+        SELECT period, closing_balance FROM balance_snapshots
+        WHERE account_id=? AND period < ?
+        ORDER BY period DESC LIMIT 1
+    """, (account_id, start[:7]))
+    snap = cur.fetchone()
+    since, balance = (_period_bounds(snap['period'])[1], snap['closing_balance']) if snap else ('', 0)
+    # Rows between the snapshot and the start date (less than a month of them)
+    cur.execute("""
+        SELECT balance_after FROM all_transactions
+        WHERE account_id=? AND created_at >= ? AND created_at < ?
+        ORDER BY created_at DESC, tx_id DESC LIMIT 1
+    """, (account_id, since, start))
+    row = cur.fetchone()
+    return row['balance_after'] if row else balance
+
+def balance_as_of(account_id, date):
+    """Account balance (rupees) at the start of `date` ('YYYY-MM-DD')."""
+    with get_conn() as conn:
+        return Money(_opening_balance(conn.cursor(), account_id, date)).rupees
+
+STATEMENT_ROWS_SQL = """
+    SELECT * FROM all_transactions
+    WHERE account_id=? AND created_at >= ? AND created_at < date(?, '+1 day')
+    ORDER BY created_at, tx_id
+"""
+
+def _statement_range(start, end):
+    datetime.date.fromisoformat(start)
+    datetime.date.fromisoformat(end)
+    if end < start:
+        raise ValueError('Statement end date is before its start date')
+
+def get_statement(account_id, start, end):
+    """
+    Statement for start..end ('YYYY-MM-DD', both inclusive): opening and
+    closing balance, credit/debit totals and the ledger rows oldest first
+    (amounts in rupees).
+    """
+    _statement_range(start, end)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")        # one snapshot of the data for both reads
+        opening = _opening_balance(cur, account_id, start)
+        cur.execute(STATEMENT_ROWS_SQL, (account_id, start, end))
+        rows = cur.fetchall()
+        conn.rollback()
+    credits = sum(r['amount'] for r in rows if r['type'] in CREDIT_TYPES)
+    debits = sum(r['amount'] for r in rows if r['type'] in DEBIT_TYPES)
+    return {
+        'account_id': account_id,
+        'start': start,
+        'end': end,
+        'opening_balance': Money(opening).rupees,
+        'closing_balance': Money(rows[-1]['balance_after'] if rows else opening).rupees,
+        'total_credits': Money(credits).rupees,
+        'total_debits': Money(debits).rupees,
+        'transactions': [money_row(r) for r in rows],
+    }
+
+def statement_accounts(end):
+    """Ids of the accounts opened on or before `end` ('YYYY-MM-DD'), in id order."""
+    with get_conn() as conn:
         cur = conn.cursor()
+        cur.execute(
+            "SELECT account_id FROM accounts WHERE role='USER' AND created_at < date(?, '+1 day') ORDER BY account_id",
+            (end,)
+        )
+        return [r['account_id'] for r in cur.fetchall()]
+
+def iter_statement(account_id, start, end):
+    """
+    Streaming get_statement() for long ranges: yields the opening balance
+    (rupees) first, then the ledger rows oldest first, read from the cursor
+    in LEDGER_FETCH_SIZE batches inside one read transaction.
+    Totals and the closing balance are left to the caller.
+    """
+    _statement_range(start, end)
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
         try:
-            conn.execute('BEGIN')
-            cur.execute(
-                "SELECT balance, is_locked FROM accounts WHERE account_id=? AND role='USER'",
-                (from_acct,)
-            )
-            r1 = cur.fetchone()
-            if r1["is_locked"]:
-                raise ValueError("Source account is locked by bank admin")
-            cur.execute(
-                "SELECT balance, is_locked FROM accounts WHERE account_id=? AND role='USER'",
-                (to_acct,)
+            yield Money(_opening_balance(cur, account_id, start)).rupees
+            cur.execute(STATEMENT_ROWS_SQL, (account_id, start, end))
+            while True:
+                rows = cur.fetchmany(LEDGER_FETCH_SIZE)
+                if not rows:
+                    break
+                for r in rows:
+                    yield money_row(r)
+        finally:
+            conn.rollback()
+
+# ---------- Month-end charges ----------
+# Maintenance + SMS fees are taken once per account and month by a batch job
+# (run from cron on the 1st, or by the server, see app.start_background_jobs)
+# rather than at login. Each chunk posts its withdrawals and records
+# monthly_charges markers in one transaction, so a crashed run is simply
+# run again: accounts already charged for the month are skipped.
+MONTHLY_MAINTENANCE_CHARGE = 30
+MONTHLY_SMS_CHARGE = 25
+CHARGE_NOTE = 'Monthly Maintenance + SMS Charges'
+
+def apply_monthly_charges(period=None, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Charge every eligible account the monthly fees for period ('YYYY-MM',
+    default this month). Accounts that are locked or cannot cover the fees
+    are left uncharged and picked up by a later run in the same month.
+    Returns {"period", "charged", "failed", "seconds", "per_second"}.
+    """
+    period = period or datetime.date.today().strftime('%Y-%m')
+    _period_bounds(period)
+    if chunk_size <= 0:
+        raise ValueError('chunk_size must be positive')
+    fee = Money.parse(MONTHLY_MAINTENANCE_CHARGE + MONTHLY_SMS_CHARGE)
+    charged = failed = 0
+    last_id = 0
+    began = time.perf_counter()
+    while True:
+        with get_conn(False, write=True) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT a.account_id FROM accounts a
+                WHERE a.role='USER' AND a.account_id > ? AND a.is_locked=0 AND a.balance >= ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM monthly_charges m
+                      WHERE m.account_id = a.account_id AND m.period = ?
+                  )
+                ORDER BY a.account_id
+                LIMIT ?
+            """, (last_id, fee, period, chunk_size))
+            ids = [r['account_id'] for r in cur.fetchall()]
+            if not ids:
+                break
+            results = _post_chunk(cur, [
+                {'type': 'withdraw', 'account_id': i, 'amount': fee,
+                 'note': CHARGE_NOTE, 'notify': 'MONTHLY_CHARGES'}
+                for i in ids
+            ])
+            done = [i for i, res in zip(ids, results) if res['ok']]
+            cur.executemany(
+                'INSERT INTO monthly_charges (account_id, period, amount) VALUES (?, ?, ?)',
+                [(i, period, fee) for i in done]
             )
-            r2 = cur.fetchone()
-            if r2["is_locked"]:
-                raise ValueError("Destination account is locked by bank admin")
-            if not r1 or not r2:
-                raise ValueError('One or both accounts not found')
-            if r1['balance'] < amount:
-                raise ValueError('Insufficient funds in source account')
-
-            new_from = r1['balance'] - amount
-            new_to = r2['balance'] + amount
-            cur.execute('UPDATE accounts SET balance=? WHERE account_id=?', (new_from, from_acct))
-            cur.execute('UPDATE accounts SET balance=? WHERE account_id=?', (new_to, to_acct))
-            add_transaction(cur, from_acct, 'Transfer-Out', amount, new_from, f'Transfer to {to_acct}')
-            add_transaction(cur, to_acct, 'Transfer-In', amount, new_to, f'Transfer from {from_acct}')
             conn.commit()
-            return new_from, new_to
-        except Exception:
-            conn.rollback()
-            raise
+        charged += len(done)
+        failed += len(ids) - len(done)
+        last_id = ids[-1]
+    seconds = time.perf_counter() - began
+    return {
+        'period': period,
+        'charged': charged,
+        'failed': failed,
+        'seconds': round(seconds, 3),
+        'per_second': round(charged / seconds, 1) if seconds else 0,
+    }
+
+# ---------- Idempotency keys ----------
+# A client may send an Idempotency-Key with a deposit, withdrawal or
+# transfer and retry it freely. The first request runs the operation and
+# stores its result under the key in the same transaction (run_once), so
+# the result exists exactly when the money has moved. Later requests with
+# the key get the stored result back without posting again, and a failed
+# operation stores nothing, so it can be retried. Keys belong to the account
+# the operation starts from (deposit/withdraw account, transfer source), so
+# clients never collide, and expire after IDEMPOTENCY_TTL seconds.
+IDEMPOTENCY_TTL = int(os.environ.get("BANK_IDEMPOTENCY_TTL") or 24 * 3600)
+IDEMPOTENCY_KEY_MAX = 255
+EVICT_BATCH_SIZE = 5000
+
+class IdempotencyConflict(ValueError):
+    """The key was already used for a different operation or parameters."""
+
+def request_fingerprint(kind, *args):
+    """Hash of an operation and its parameters (amount last, in rupees)."""
+    *ids, amount = args
+    payload = json.dumps([kind, *(int(i) for i in ids), str(Money.parse(amount))])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _stored_result(cur, account_id, key, request_hash):
+    cur.execute(
+        "SELECT request_hash, response FROM idempotency_keys WHERE account_id=? AND key=? AND expires_at > ?",
+        (account_id, key, int(time.time()))
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    if row['request_hash'] != request_hash:
+        raise IdempotencyConflict('Idempotency-Key was already used for a different request')
+    return json.loads(row['response'])
 
-def get_transactions(account_id, limit=100):
+def get_idempotent_result(account_id, key, request_hash):
+    """The stored result for the account's key, or None if it has not been used (or has expired)."""
     with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute('SELECT * FROM transactions WHERE account_id=? ORDER BY created_at DESC LIMIT ?', (account_id, limit))
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        return _stored_result(conn.cursor(), account_id, key, request_hash)
+
+def run_once(cur, account_id, key, request_hash, core, *args):
+    """
+    core(cur, *args) (e.g. _deposit) at most once per (account_id, key), in
+    the caller's transaction. Returns (result, replayed); a replayed result
+    comes back from JSON, so tuples are lists.
+    """
+    stored = _stored_result(cur, account_id, key, request_hash)
+    if stored is not None:
+        return stored, True
+    result = core(cur, *args)
+    cur.execute("""
+        INSERT OR REPLACE INTO idempotency_keys (account_id, key, request_hash, response, expires_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, (account_id, key, request_hash, json.dumps(result), int(time.time()) + IDEMPOTENCY_TTL))
+    return result, False
+
+def evict_idempotency_keys(batch_size=EVICT_BATCH_SIZE):
+    """Delete expired keys, batch_size rows per transaction. Returns rows deleted."""
+    deleted = 0
+    while True:
+        with get_conn(True, write=True) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                DELETE FROM idempotency_keys WHERE (account_id, key) IN (
+                    SELECT account_id, key FROM idempotency_keys WHERE expires_at <= ? LIMIT ?
+                )
+            """, (int(time.time()), batch_size))
+            deleted += cur.rowcount
+        if cur.rowcount < batch_size:
+            return deleted
 
 def delete_account(account_id):
-    with get_conn(True) as conn:
+    with get_conn(True, write=True) as conn:
         cur = conn.cursor()
+        cur.execute("SELECT role FROM accounts WHERE account_id=?", (account_id,))
+        row = cur.fetchone()
+        if not row:
+            return
+        # Ledger history outlives the account (foreign keys are not enforced,
+        # see db.CONNECTION_PRAGMAS), so the transaction totals stay as they are
+        if row['role'] == 'USER':
+            bump_stat(cur, 'total_users', -1, account_id)
         cur.execute('DELETE FROM accounts WHERE account_id=?', (account_id,))
         conn.commit()
 
@@ -269,6 +1120,24 @@ def update_pin(account_id, new_pin):
         )
         conn.commit()
 
+def check_pin(acc, pin):
+    """
+    Verify a PIN against an account row (as returned by get_account*).
+    After a successful check, a legacy or outdated hash is replaced with one
+    in the current format.
+    """
+    if not acc or not verify_pin(pin, acc["pin_hash"]):
+        return False
+    if needs_rehash(acc["pin_hash"]):
+        pin_h = hash_pin(pin)       # hash before taking the write lock
+        with get_conn(True, write=True) as conn:
+            conn.execute(
+                "UPDATE accounts SET pin_hash=? WHERE account_id=? AND pin_hash=?",
+                (pin_h, acc["account_id"], acc["pin_hash"])
+            )
+        acc["pin_hash"] = pin_h
+    return True
+
 def register_failed_attempt(account_id):
     with get_conn(True) as conn:
         cur = conn.cursor()
@@ -312,3 +1181,25 @@ def unlock_account(account_id):
         conn.commit()
 
 
+if __name__ == "__main__":
+    # Maintenance commands:
+    #   python models.py rebuild-stats | archive [hot_months] | snapshot | charges [YYYY-MM]
+    import sys
+
+    if sys.argv[1:] == ["rebuild-stats"]:
+        print(rebuild_bank_stats())
+    elif sys.argv[1:2] == ["archive"] and len(sys.argv) <= 3:
+        moved = archive_old_history(int(sys.argv[2]) if len(sys.argv) == 3 else HOT_MONTHS)
+        for period, rows in moved.items():
+            print(f"{period}: {rows} rows archived")
+        print(f"{len(moved)} period(s) archived")
+    elif sys.argv[1:] == ["snapshot"]:
+        for period, accounts in snapshot_closed_periods().items():
+            print(f"{period}: {accounts} account balances recorded")
+    elif sys.argv[1:2] == ["charges"] and len(sys.argv) <= 3:
+        run = apply_monthly_charges(sys.argv[2] if len(sys.argv) == 3 else None)
+        print(f"{run['period']}: {run['charged']} accounts charged ({run['failed']} failed) "
+              f"in {run['seconds']}s ({run['per_second']}/s)")
+    else:
+        print("usage: python models.py rebuild-stats | archive [hot_months] | snapshot | charges [YYYY-MM]")
+        sys.exit(2)
@@ -0,0 +1,533 @@
+# notifications.py - email/SMS alerts delivered from a persistent outbox
+"""
+Customer alerts are written to the notification_outbox table and delivered
+by a small pool of background workers, so the caller (Tk main thread, Flask
+handler) never waits on SMTP or the SMS gateway. Money movements can queue
+their alerts inside their own transaction (enqueue_in), so an alert exists
+exactly when the ledger entry does.
+
+Workers flush the outbox in batches: SMS rows with the same text become one
+gateway call with a comma-separated numbers list, and a batch of emails is
+sent over one SMTP session. Failed sends are retried with exponential
+backoff, and anything left pending after a restart is picked up again.
+Set BANK_NOTIFY_TRANSPORT=local (or call configure(transports=...)) to record
+messages in memory instead of sending them. Credentials come only from the
+environment: a channel without them fails its sends (see last_error in the
+outbox) instead of using anyone's account.
+"""
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from db import get_conn
+
+log = logging.getLogger("bank.notify")
+
+# ---------- Settings ----------
+SMTP_SERVER = os.environ.get("BANK_SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("BANK_SMTP_PORT", "587"))
+EMAIL_ID = os.environ.get("BANK_SMTP_USER", "")
+EMAIL_PASSWORD = os.environ.get("BANK_SMTP_PASSWORD", "")
+
+SMS_URL = "https://www.fast2sms.com/dev/bulkV2"
+SMS_API_KEY = os.environ.get("BANK_SMS_API_KEY", "")
+
+WORKERS = int(os.environ.get("BANK_NOTIFY_WORKERS", "2"))
+FLUSH_BATCH = int(os.environ.get("BANK_NOTIFY_BATCH", "200"))  # rows claimed per flush
+SMS_NUMBERS_PER_CALL = 100
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 2
+RETRY_MAX_SECONDS = 300
+POLL_SECONDS = 5
+# A claimed row not finished within this many seconds is considered abandoned
+# (its process died) and may be claimed again; keep it well above send timeouts
+CLAIM_LEASE_SECONDS = float(os.environ.get("BANK_NOTIFY_LEASE", "300"))
+
+# ---------- Message templates ----------
+def render(acc, event, **kwargs):
+    """Return (subject, text) for an event, or None if the event is unknown."""
+    messages = {
+        "ACCOUNT_CREATED": lambda: (
+            "Account Created",
+            f"Dear {acc['name']}, your Bank A/c {acc['account_id']} has been successfully opened. "
+            f"Available Balance: ₹{acc['balance']}. Thank you for banking with us."
+        ),
+        "DEPOSIT": lambda: (
+            "Deposit Alert",
+            f"₹{kwargs['amount']} credited to A/c {acc['account_id']}. "
+            f"Avl Bal: ₹{kwargs['balance']}. If not you, contact bank immediately."
+        ),
+        "WITHDRAW": lambda: (
+            "Withdrawal Alert",
+            f"₹{kwargs['amount']} debited from A/c {acc['account_id']}. "
+            + (f"ATM fee: ₹{kwargs['fee']}. " if kwargs.get('fee') else "")
+            + f"Avl Bal: ₹{kwargs['balance']}. Txn Time: {datetime.datetime.now().strftime('%d-%m-%Y %I:%M %p')}"
+        ),
+        "TRANSFER": lambda: (
+            "Transfer Alert",
+            f"₹{kwargs['amount']} transferred from A/c {acc['account_id']}. "
+            f"Avl Bal: ₹{kwargs['balance']}."
+        ),
+        # Same text for every account, so bulk runs coalesce into few SMS calls
+        "MONTHLY_CHARGES": lambda: (
+            "Monthly Charges",
+            f"₹{kwargs['amount']} monthly maintenance + SMS charges debited from your account. "
+            f"Thank you for banking with us."
+        ),
+        "PIN_CHANGED": lambda: (
+            "Security Alert",
+            f"Your ATM/Debit PIN for A/c {acc['account_id']} was changed successfully. "
+            f"If not you, contact bank immediately."
+        ),
+        "ACCOUNT_DELETED": lambda: (
+            "Account Closed",
+            f"Your Bank A/c {acc['account_id']} has been permanently closed. "
+            f"Thank you for banking with us."
+        ),
+        "ACCOUNT_LOCKED": lambda: (
+            "Security Alert",
+            f"Your Bank A/c {acc['account_id']} has been temporarily locked due to multiple wrong PIN attempts. "
+            f"Please contact bank support."
+        ),
+    }
+    if event not in messages:
+        return None
+    return messages[event]()
+
+def normalize_phone(phone):
+    """10-digit Indian mobile number, or None if it cannot be used for SMS."""
+    if not phone:
+        return None
+    phone = str(phone).strip()
+    if phone.startswith("+91"):
+        phone = phone[3:]
+    if not phone.isdigit() or len(phone) != 10:
+        return None
+    return phone
+
+# ---------- Transports ----------
+class Transport:
+    """
+    Base transport. send() delivers one message; send_batch() and send_group()
+    fall back to it, and subclasses override them to batch provider calls.
+    """
+
+    channel = None
+    configured = True
+
+    def send(self, recipient, subject, body):
+        raise NotImplementedError
+
+    def send_batch(self, items):
+        """Send distinct messages; returns one error string (or None) per item."""
+        errors = []
+        for item in items:
+            try:
+                self.send(item["recipient"], item["subject"], item["body"])
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e) or type(e).__name__)
+        return errors
+
+    def send_group(self, recipients, subject, body):
+        """Send the same text to many recipients (raises on failure)."""
+        for recipient in recipients:
+            self.send(recipient, subject, body)
+
+    def close(self):
+        pass
+
+
+class SmtpTransport(Transport):
+    """Sends email over one long-lived, lazily (re)connected SMTP session."""
+
+    channel = "email"
+
+    def __init__(self, server=SMTP_SERVER, port=SMTP_PORT, user=EMAIL_ID, password=EMAIL_PASSWORD):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.configured = bool(user and password)
+        self._smtp = None
+        self._lock = threading.Lock()
+
+    def _session(self):
+        import smtplib
+        if not self.configured:
+            raise RuntimeError("Email is not configured: set BANK_SMTP_USER and BANK_SMTP_PASSWORD")
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.server, self.port, timeout=30)
+            smtp.starttls()
+            smtp.login(self.user, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _message(self, recipient, subject, body):
+        from email.mime.text import MIMEText
+        msg = MIMEText(body, "plain", "utf-8")
+        msg["From"] = self.user
+        msg["To"] = recipient
+        msg["Subject"] = subject or ""
+        return msg
+
+    def _send_locked(self, recipient, subject, body):
+        import smtplib
+        try:
+            self._session().send_message(self._message(recipient, subject, body))
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped the idle session: reconnect once and retry
+            self._smtp = None
+            self._session().send_message(self._message(recipient, subject, body))
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError):
+            raise        # message-level failure, the session is still usable
+        except Exception:
+            self.close()
+            raise
+
+    def send(self, recipient, subject, body):
+        with self._lock:
+            self._send_locked(recipient, subject, body)
+
+    def send_batch(self, items):
+        # Hold the session for the whole batch: one connect/STARTTLS/login at most
+        errors = []
+        with self._lock:
+            for item in items:
+                try:
+                    self._send_locked(item["recipient"], item["subject"], item["body"])
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(str(e) or type(e).__name__)
+        return errors
+
+    def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except Exception:
+                pass
+
+
+class Fast2SmsTransport(Transport):
+    """Sends SMS through the Fast2SMS HTTP API over a shared requests.Session."""
+
+    channel = "sms"
+
+    def __init__(self, url=SMS_URL, api_key=SMS_API_KEY, timeout=5):
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self.configured = bool(api_key)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "authorization": api_key,
+            "Content-Type": "application/json",
+        })
+
+    def send(self, recipient, subject, body):
+        self.send_group([recipient], subject, body)
+
+    def send_group(self, recipients, subject, body):
+        if not self.configured:
+            raise RuntimeError("SMS is not configured: set BANK_SMS_API_KEY")
+        payload = {
+            "route": "q",
+            "message": body,
+            "language": "english",
+            "numbers": ",".join(recipients),
+        }
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class LocalTransport(Transport):
+    """Keeps messages in memory instead of sending them (tests, offline demos)."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.sent = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send(self, recipient, subject, body):
+        self.send_group([recipient], subject, body)
+
+    def send_batch(self, items):
+        with self._lock:
+            self.calls += 1
+            for item in items:
+                self.sent.append(dict(item))
+        return [None] * len(items)
+
+    def send_group(self, recipients, subject, body):
+        with self._lock:
+            self.calls += 1
+            for recipient in recipients:
+                self.sent.append({"recipient": recipient, "subject": subject, "body": body})
+
+
+def default_transports():
+    if os.environ.get("BANK_NOTIFY_TRANSPORT", "").lower() == "local":
+        return {"email": LocalTransport("email"), "sms": LocalTransport("sms")}
+    transports = {"email": SmtpTransport(), "sms": Fast2SmsTransport()}
+    for channel, transport in transports.items():
+        if not transport.configured:
+            log.warning("%s alerts are not configured; they will fail until credentials are set", channel)
+    return transports
+
+# ---------- Outbox ----------
+OUTBOX_INSERT_SQL = "INSERT INTO notification_outbox (channel, recipient, subject, body) VALUES (?,?,?,?)"
+
+def outbox_rows(acc, event, **kwargs):
+    """(channel, recipient, subject, body) rows for one customer event."""
+    rendered = render(acc, event, **kwargs)
+    if rendered is None:
+        return []
+    subject, text = rendered
+    rows = []
+    if acc.get("email"):
+        rows.append(("email", acc["email"], subject, text))
+    # SMS only for real customer accounts with a usable number
+    phone = normalize_phone(acc.get("phone"))
+    if phone and acc.get("account_id"):
+        rows.append(("sms", phone, subject, text))
+    return rows
+
+def enqueue_in(cur, acc, event, **kwargs):
+    """
+    Queue the alerts for an event using the caller's cursor, i.e. inside the
+    caller's transaction. Nothing is sent until that transaction commits.
+    """
+    rows = outbox_rows(acc, event, **kwargs)
+    if rows:
+        cur.executemany(OUTBOX_INSERT_SQL, rows)
+    return len(rows)
+
+def enqueue(acc, event, **kwargs):
+    """Write the alerts for an event to the outbox. Returns the number queued."""
+    with get_conn(True) as conn:
+        queued = enqueue_in(conn.cursor(), acc, event, **kwargs)
+        conn.commit()
+    return queued
+
+def backoff_seconds(attempts):
+    return min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+
+# ---------- Dispatcher ----------
+class Dispatcher:
+    """Background worker pool that drains notification_outbox in batches."""
+
+    def __init__(self, transports=None, workers=WORKERS, batch_size=FLUSH_BATCH):
+        self.transports = transports or default_transports()
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self._threads = []
+        self._wake = threading.Condition()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.flushes = deque(maxlen=50)   # recent per-flush stats, newest last
+
+    def start(self):
+        # Rows a dead process was sending are reclaimed by _claim once their
+        # lease runs out; other processes may be sending right now
+        self._stopping = False
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"notify-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=5):
+        with self._wake:
+            self._stopping = True
+            self._wake.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        for transport in self.transports.values():
+            transport.close()
+
+    def wake(self):
+        with self._wake:
+            self._wake.notify()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "recent_flushes": list(self.flushes),
+            }
+
+    def _claim(self, channel):
+        """Lease a batch of due rows (and rows whose previous lease expired)."""
+        now = time.time()
+        with get_conn(True, write=True) as conn:
+            rows = conn.execute("""
+                UPDATE notification_outbox
+                SET status='sending', attempts = attempts + 1, claimed_at = ?
+                WHERE id IN (
+                    SELECT id FROM notification_outbox
+                    WHERE channel=? AND (
+                        (status='pending' AND next_attempt_at <= ?)
+                        OR (status='sending' AND (claimed_at IS NULL OR claimed_at <= ?))
+                    )
+                    ORDER BY id LIMIT ?
+                )
+                RETURNING id, channel, recipient, subject, body, attempts, claimed_at
+            """, (now, channel, now, now - CLAIM_LEASE_SECONDS, self.batch_size)).fetchall()
+            conn.commit()
+            return [dict(r) for r in rows]
+
+    def _deliver(self, transport, items):
+        """Send claimed items; returns (errors aligned with items, provider calls)."""
+        if transport is None:
+            return ["No transport for this channel"] * len(items), 0
+        if transport.channel != "sms":
+            return transport.send_batch(items), 1
+        # Same text to many phones -> one gateway call per SMS_NUMBERS_PER_CALL numbers
+        errors = [None] * len(items)
+        groups = {}
+        for i, item in enumerate(items):
+            groups.setdefault((item["subject"], item["body"]), []).append(i)
+        calls = 0
+        for (subject, body), idxs in groups.items():
+            for start in range(0, len(idxs), SMS_NUMBERS_PER_CALL):
+                part = idxs[start:start + SMS_NUMBERS_PER_CALL]
+                calls += 1
+                try:
+                    transport.send_group([items[i]["recipient"] for i in part], subject, body)
+                except Exception as e:
+                    for i in part:
+                        errors[i] = str(e) or type(e).__name__
+        return errors, calls
+
+    def _finish(self, items, errors):
+        now = time.time()
+        sent, retry, failed = [], [], []
+        for item, error in zip(items, errors):
+            # Only rows still under our claim: after a lost lease they belong to someone else
+            lease = (item["id"], item["claimed_at"])
+            if error is None:
+                sent.append(lease)
+            elif item["attempts"] >= MAX_ATTEMPTS:
+                failed.append((error, *lease))
+            else:
+                retry.append((now + backoff_seconds(item["attempts"]), error, *lease))
+        mine = "WHERE id=? AND status='sending' AND claimed_at=?"
+        with get_conn(True) as conn:
+            conn.executemany(
+                f"UPDATE notification_outbox SET status='sent', sent_at=datetime('now'), last_error=NULL {mine}",
+                sent
+            )
+            conn.executemany(
+                f"UPDATE notification_outbox SET status='failed', last_error=? {mine}",
+                failed
+            )
+            conn.executemany(
+                f"UPDATE notification_outbox SET status='pending', next_attempt_at=?, last_error=? {mine}",
+                retry
+            )
+            conn.commit()
+        return len(sent), len(retry), len(failed)
+
+    def flush(self, channel):
+        """Claim and deliver one batch for a channel. Returns the flush stats or None."""
+        items = self._claim(channel)
+        if not items:
+            return None
+        started = time.perf_counter()
+        errors, calls = self._deliver(self.transports.get(channel), items)
+        for item, error in zip(items, errors):
+            if error is not None:
+                log.warning("%s delivery failed: %s", channel, error,
+                            extra={"fields": {"outbox_id": item["id"]}})
+        sent, retried, failed = self._finish(items, errors)
+        elapsed = time.perf_counter() - started
+        stats = {
+            "channel": channel,
+            "messages": len(items),
+            "provider_calls": calls,
+            "sent": sent,
+            "retried": retried,
+            "failed": failed,
+            "seconds": round(elapsed, 4),
+            "messages_per_second": round(len(items) / elapsed, 1) if elapsed > 0 else None,
+        }
+        with self._lock:
+            self.sent += sent
+            self.retried += retried
+            self.failed += failed
+            self.flushes.append(stats)
+        return stats
+
+    def flush_all(self):
+        """Flush every channel once; returns the stats of the flushes that ran."""
+        return [s for s in (self.flush(ch) for ch in self.transports) if s]
+
+    def _idle_seconds(self):
+        """Sleep until the next scheduled retry, but never longer than POLL_SECONDS."""
+        try:
+            with get_conn() as conn:
+                due = conn.execute(
+                    "SELECT MIN(next_attempt_at) FROM notification_outbox WHERE status='pending'"
+                ).fetchone()[0]
+        except Exception:
+            due = None
+        if due is None:
+            return POLL_SECONDS
+        return min(POLL_SECONDS, max(0.05, due - time.time()))
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                busy = bool(self.flush_all())
+            except Exception:
+                log.exception("Outbox flush failed")
+                busy = False
+            if not busy:
+                with self._wake:
+                    if not self._stopping:
+                        self._wake.wait(self._idle_seconds())
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def configure(transports=None, workers=WORKERS, batch_size=FLUSH_BATCH):
+    """Replace the running dispatcher (e.g. with LocalTransport instances)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+        _dispatcher = Dispatcher(transports, workers, batch_size).start()
+        return _dispatcher
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = Dispatcher().start()
+    return _dispatcher
+
+def wake():
+    """Tell the workers new rows are waiting (starts them on first use)."""
+    get_dispatcher().wake()
+
+def notify(acc, event, **kwargs):
+    """Queue alerts for an event and return immediately."""
+    if enqueue(acc, event, **kwargs):
+        wake()
@@ -0,0 +1,221 @@
+# serve.py - production entry point for the Flask API
+"""
+Runs app.py on every core:
+
+    python serve.py
+
+With gunicorn installed the app is handed to it (threaded workers, app
+preloaded in the master so every worker shares the same token key).
+Otherwise a built-in preforking server is used: the master binds the port,
+forks BANK_WORKERS children that each serve it with a fixed pool of
+BANK_THREADS request threads, and replaces any child that dies. Where fork()
+is unavailable (Windows) a single process serves with one such pool.
+
+The master starts no threads. Background jobs (app.start_background_jobs)
+run in exactly one worker: the one holding the lock file next to the
+database. When it exits, the worker that replaces it takes the jobs over.
+
+Settings (environment):
+    BANK_HOST, BANK_PORT       listen address (127.0.0.1:5000)
+    BANK_WORKERS               worker processes (CPU count)
+    BANK_THREADS               threads per worker (8)
+    BANK_SERVER                auto | gunicorn | builtin (auto)
+    BANK_LOG_LEVEL, BANK_LOG_FORMAT, BANK_LOG_SAMPLE   see utils.configure_logging
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+import app as bank_app
+import db
+from utils import configure_logging
+
+log = logging.getLogger("bank.serve")
+
+HOST = os.environ.get("BANK_HOST", "127.0.0.1")
+PORT = int(os.environ.get("BANK_PORT", "5000"))
+WORKERS = int(os.environ.get("BANK_WORKERS") or os.cpu_count() or 1)
+THREADS = int(os.environ.get("BANK_THREADS", "8"))
+SERVER = os.environ.get("BANK_SERVER", "auto")
+RESPAWN_DELAY = 1.0     # seconds between restarts of a crashing worker
+KEEPALIVE = 5           # seconds an idle keep-alive connection may hold a thread
+
+_jobs_lock = None       # fd of the held lock file, in the worker running the jobs
+
+
+def claim_background_jobs():
+    """
+    Start the background jobs in this worker unless another one runs them.
+    Workers race for an exclusive lock on a file next to the database; the
+    winner keeps it (and the jobs) until it exits. Returns True if it won.
+    """
+    global _jobs_lock
+    import fcntl
+    fd = os.open(f"{db.DB_FILE}.jobs.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _jobs_lock = fd
+    log.info("Running background jobs in worker %d", os.getpid())
+    bank_app.start_background_jobs()
+    return True
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    timeout = KEEPALIVE
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    Werkzeug server that hands connections to a fixed pool of request
+    threads. While all of them are busy, accept() waits, so further
+    connections queue in the listen backlog instead of spawning threads.
+    """
+    multithread = True
+
+    def __init__(self, host, port, app, threads=THREADS):
+        super().__init__(host, port, app, handler=PooledRequestHandler)
+        self.threads = max(1, threads)
+        self._slots = threading.BoundedSemaphore(self.threads)
+        self._executor = None   # started on the first request, i.e. after fork
+
+    def process_request(self, request, client_address):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="http")
+        self._slots.acquire()
+        self._executor.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class BankApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{HOST}:{PORT}")
+            self.cfg.set("workers", WORKERS)
+            self.cfg.set("threads", THREADS)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("accesslog", None)     # app.py logs requests itself
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            return bank_app.app
+
+    def post_fork(server, worker):
+        configure_logging()
+        claim_background_jobs()
+
+    BankApplication().run()
+
+
+def _serve_child(server):
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging()
+    claim_background_jobs()
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def run_prefork():
+    server = PooledWSGIServer(HOST, PORT, bank_app.app)
+    if not hasattr(os, "fork") or WORKERS <= 1:
+        log.info("Serving on http://%s:%d (single process)", HOST, PORT)
+        bank_app.start_background_jobs()
+        server.serve_forever()
+        return
+
+    children = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _serve_child(server)
+        children[pid] = time.monotonic()
+
+    for _ in range(WORKERS):
+        spawn()
+    log.info("Serving on http://%s:%d with %d workers", HOST, PORT, WORKERS)
+
+    class Stop(Exception):
+        pass
+
+    def stop(signum, frame):
+        raise Stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        while True:
+            pid, status = os.waitpid(-1, 0)
+            if pid not in children:
+                continue
+            started = children.pop(pid)
+            log.warning("Worker %d exited (code %d), restarting", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < RESPAWN_DELAY:
+                time.sleep(RESPAWN_DELAY)
+            spawn()
+    except (Stop, ChildProcessError):
+        pass
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in list(children):
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    server.server_close()
+    log.info("Server stopped")
+
+
+def main():
+    configure_logging()
+    bank_app.prepare()
+    if bank_app.DEBUG:
+        bank_app.print_startup_info()
+
+    use_gunicorn = SERVER == "gunicorn"
+    if SERVER == "auto" and sys.platform != "win32":
+        try:
+            import gunicorn  # noqa: F401
+            use_gunicorn = True
+        except ImportError:
+            pass
+    if use_gunicorn:
+        run_gunicorn()
+    else:
+        run_prefork()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# statements.py - paginated PDF account statements (optional: needs reportlab)
+"""
+Renders account statements straight from the ledger:
+
+    python statements.py <account_id> [start end]     one statement
+    python statements.py batch [--snapshot] [YYYY-MM] [out_dir]
+                                                      every account, one month
+
+Rows are streamed from models.iter_statement() (a cursor read in batches)
+and drawn page by page, so a statement never holds the account's history in
+memory, however long it is. Only the finished, compressed pages are kept by
+ReportLab until the file is saved.
+
+The GUI calls render_async(), which renders on a background thread and
+returns a Future. Batch mode renders accounts in parallel worker processes
+(BANK_STATEMENT_WORKERS, default one per CPU) into BANK_STATEMENT_DIR.
+Rendering only reads the database; `batch --snapshot` first records missing
+balance snapshots (models.snapshot_closed_periods()) so opening balances are
+one seek each.
+"""
+import datetime
+import functools
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import db
+import models
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+except ImportError:  # optional dependency
+    canvas = None
+
+log = logging.getLogger("bank.statements")
+
+OUT_DIR = Path(os.environ.get("BANK_STATEMENT_DIR") or db.DB_FILE.parent / "statements")
+BATCH_WORKERS = int(os.environ.get("BANK_STATEMENT_WORKERS") or os.cpu_count() or 1)
+BATCH_CHUNK = 16        # accounts handed to a worker process at a time
+
+MARGIN = 40
+ROW_HEIGHT = 14
+BANNER = (0.12, 0.23, 0.54)
+# Table columns: (title, x, align); amounts are right-aligned on their x
+COLUMNS = (
+    ("Date", MARGIN, "left"),
+    ("Type", 140, "left"),
+    ("Note", 215, "left"),
+    ("Debit", 410, "right"),
+    ("Credit", 482, "right"),
+    ("Balance", 555, "right"),
+)
+NOTE_WIDTH = 185
+
+
+def rupees(value):
+    # Helvetica has no rupee sign
+    return f"Rs. {value:,.2f}"
+
+
+def _fit(text, width, font, size):
+    """Truncate text with an ellipsis so it fits width points."""
+    full = stringWidth(text, font, size)
+    if full <= width:
+        return text
+    text = text[:int(len(text) * width / full) + 1]     # close to the cut, then trim
+    while text and stringWidth(text + "...", font, size) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+class StatementPDF:
+    """A ReportLab canvas that is filled top to bottom, breaking pages as needed."""
+
+    def __init__(self, path, account, start, end):
+        self.c = canvas.Canvas(str(path), pagesize=A4, pageCompression=1)
+        self.width, self.height = A4
+        self.account = account
+        self.title = f"Account {account['account_id']}  |  {start} to {end}"
+        self.page = 0
+        self.y = 0
+        self._new_page(first=True)
+
+    def _new_page(self, first=False):
+        c = self.c
+        if not first:
+            self._footer()
+            c.showPage()
+        self.page += 1
+        if first:
+            c.setFillColorRGB(*BANNER)
+            c.rect(0, self.height - 80, self.width, 80, fill=1, stroke=0)
+            c.setFillColorRGB(1, 1, 1)
+            c.setFont("Helvetica-Bold", 22)
+            c.drawString(MARGIN + 10, self.height - 50, "BANK ACCOUNT STATEMENT")
+            c.setFont("Helvetica", 10)
+            c.drawString(MARGIN + 10, self.height - 70, f"Generated on: {datetime.date.today()}")
+            self.y = self.height - 110
+        else:
+            c.setFillColorRGB(0.3, 0.3, 0.3)
+            c.setFont("Helvetica", 9)
+            c.drawString(MARGIN, self.height - 30, self.title)
+            self.y = self.height - 55
+        c.setFillColorRGB(0, 0, 0)
+
+    def _footer(self):
+        self.c.setFont("Helvetica", 8)
+        self.c.setFillColorRGB(0.4, 0.4, 0.4)
+        self.c.drawRightString(self.width - MARGIN, 25, f"Page {self.page}")
+        self.c.setFillColorRGB(0, 0, 0)
+
+    def ensure(self, space, table=False):
+        """Start a new page unless `space` points are left above the footer."""
+        if self.y - space < 50:
+            self._new_page()
+            if table:
+                self.table_header()
+
+    def heading(self, text):
+        self.ensure(40)
+        self.y -= 10
+        self.c.setFont("Helvetica-Bold", 13)
+        self.c.drawString(MARGIN, self.y, text)
+        self.y -= 20
+
+    def fields(self, pairs):
+        self.c.setFont("Helvetica", 10)
+        for label, value in pairs:
+            self.ensure(16)
+            self.c.setFont("Helvetica-Bold", 10)
+            self.c.drawString(MARGIN, self.y, f"{label}:")
+            self.c.setFont("Helvetica", 10)
+            self.c.drawString(MARGIN + 110, self.y, _fit(str(value or "-"), 380, "Helvetica", 10))
+            self.y -= 16
+
+    def image(self, path, caption):
+        self.ensure(210)
+        try:
+            self.c.drawImage(ImageReader(path), MARGIN, self.y - 180, width=200, height=180,
+                             preserveAspectRatio=True)
+            self.c.setFont("Helvetica", 10)
+            self.c.drawString(MARGIN, self.y - 195, caption)
+        except Exception:
+            self.c.setFont("Helvetica", 10)
+            self.c.drawString(MARGIN, self.y - 10, f"{caption}: (Unable to load image file)")
+        self.y -= 210
+
+    def table_header(self):
+        c = self.c
+        c.setFillColorRGB(0.93, 0.95, 0.98)
+        c.rect(MARGIN - 4, self.y - 4, self.width - 2 * MARGIN + 8, ROW_HEIGHT + 2, fill=1, stroke=0)
+        c.setFillColorRGB(0, 0, 0)
+        c.setFont("Helvetica-Bold", 9)
+        for title, x, align in COLUMNS:
+            (c.drawRightString if align == "right" else c.drawString)(x, self.y, title)
+        self.y -= ROW_HEIGHT + 4
+
+    def row(self, cells):
+        self.ensure(ROW_HEIGHT, table=True)
+        self.c.setFont("Helvetica", 9)
+        for (title, x, align), text in zip(COLUMNS, cells):
+            (self.c.drawRightString if align == "right" else self.c.drawString)(x, self.y, text)
+        self.y -= ROW_HEIGHT
+
+    def save(self):
+        self._footer()
+        self.c.save()
+
+
+def account_fields(acc):
+    address = ", ".join(
+        part for part in (acc.get("addr_line1"), acc.get("village"), acc.get("tehsil"),
+                          acc.get("district"), acc.get("state"), acc.get("postal_code"))
+        if part
+    )
+    return [
+        ("Account ID", acc["account_id"]),
+        ("Full Name", acc.get("name")),
+        ("Email", acc.get("email")),
+        ("Phone Number", acc.get("phone")),
+        ("DOB", acc.get("dob")),
+        ("Gender", acc.get("gender")),
+        ("Address", address),
+        ("Account Type", acc.get("account_type")),
+        ("Opened On", (acc.get("created_at") or "")[:10]),
+    ]
+
+
+def render_statement(account_id, start=None, end=None, path=None, kyc=False):
+    """
+    Write the statement for start..end ('YYYY-MM-DD', inclusive; default: the
+    whole history up to today) to path. kyc=True adds the ID document and photo.
+    Returns the path written.
+    """
+    if canvas is None:
+        raise RuntimeError("ReportLab is not installed: pip install reportlab")
+    acc = models.get_account(account_id)
+    if not acc:
+        raise ValueError(f"Account {account_id} not found")
+    start = start or acc["created_at"][:10]
+    end = end or datetime.date.today().isoformat()
+    path = Path(path or OUT_DIR / f"statement_{account_id}_{start}_{end}.pdf")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = models.iter_statement(account_id, start, end)
+    try:
+        opening = next(rows)
+
+        pdf = StatementPDF(path, acc, start, end)
+        pdf.heading("Account Details")
+        pdf.fields(account_fields(acc))
+        if kyc:
+            docs = [(acc.get("id_document_path"), "ID Document"), (acc.get("photo_path"), "Passport Photo")]
+            docs = [(p, caption) for p, caption in docs if p and os.path.exists(p)]
+            if docs:
+                pdf.heading("Attached KYC Documents")
+                for p, caption in docs:
+                    pdf.image(p, caption)
+
+        pdf.heading(f"Transactions {start} to {end}")
+        pdf.fields([("Opening Balance", rupees(opening))])
+        pdf.y -= 6
+        pdf.ensure(ROW_HEIGHT * 3)
+        pdf.table_header()
+
+        credits = debits = 0     # paise, converted once for the summary
+        closing = opening
+        count = 0
+        for t in rows:
+            credit = t["type"] in models.CREDIT_TYPES
+            if credit:
+                credits += models.Money.parse(t["amount"])
+            else:
+                debits += models.Money.parse(t["amount"])
+            closing = t["balance_after"]
+            count += 1
+            pdf.row((
+                t["created_at"][:16],
+                t["type"],
+                _fit(t.get("note") or "", NOTE_WIDTH, "Helvetica", 9),
+                "" if credit else f"{t['amount']:,.2f}",
+                f"{t['amount']:,.2f}" if credit else "",
+                f"{t['balance_after']:,.2f}",
+            ))
+        if not count:
+            pdf.row(("", "", "No transactions in this period", "", "", ""))
+
+        pdf.heading("Summary")
+        pdf.fields([
+            ("Opening Balance", rupees(opening)),
+            ("Total Credits", rupees(models.Money(credits).rupees)),
+            ("Total Debits", rupees(models.Money(debits).rupees)),
+            ("Closing Balance", rupees(closing)),
+            ("Transactions", count),
+        ])
+        pdf.save()
+    finally:
+        rows.close()    # ends the read transaction even if drawing failed
+    return path
+
+
+# ---------- Background rendering (GUI) ----------
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="statements")
+
+def render_async(account_id, start=None, end=None, path=None, kyc=False):
+    """render_statement() on a background thread. Returns a Future of the path."""
+    return _executor.submit(render_statement, account_id, start, end, path, kyc)
+
+
+# ---------- Month-end batch ----------
+def last_closed_period():
+    return (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)).strftime("%Y-%m")
+
+
+def _init_worker(db_file):
+    db.DB_FILE = Path(db_file)
+
+
+def _render_one(start, end, out_dir, account_id):
+    try:
+        render_statement(account_id, start, end, Path(out_dir) / f"statement_{account_id}_{start[:7]}.pdf")
+        return account_id, None
+    except Exception as e:
+        return account_id, str(e)
+
+
+def render_all(period=None, out_dir=OUT_DIR, workers=BATCH_WORKERS):
+    """
+    Render every account's statement for a month (default: the last closed
+    one) into out_dir, in `workers` processes. Returns a summary dict.
+    Read-only: opening balances use whatever snapshots exist (see --snapshot).
+    """
+    period = period or last_closed_period()
+    start, next_start = models._period_bounds(period)
+    end = (datetime.date.fromisoformat(next_start) - datetime.timedelta(days=1)).isoformat()
+    account_ids = models.statement_accounts(end)
+
+    began = time.perf_counter()
+    render = functools.partial(_render_one, start, end, str(out_dir))
+    if workers <= 1 or len(account_ids) <= 1:
+        results = map(render, account_ids)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(str(db.DB_FILE),))
+        results = pool.map(render, account_ids, chunksize=BATCH_CHUNK)
+    failed = 0
+    try:
+        for account_id, error in results:
+            if error:
+                failed += 1
+                log.error("Statement for account %s failed: %s", account_id, error)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    seconds = time.perf_counter() - began
+    return {
+        "period": period,
+        "accounts": len(account_ids),
+        "failed": failed,
+        "seconds": round(seconds, 2),
+        "per_second": round(len(account_ids) / seconds, 1) if seconds else 0,
+        "out_dir": str(out_dir),
+    }
+
+
+if __name__ == "__main__":
+    if canvas is None:
+        sys.exit("statements.py needs reportlab: pip install reportlab")
+    args = sys.argv[1:]
+    snapshot = "--snapshot" in args
+    if snapshot:
+        args.remove("--snapshot")
+    if args and args[0] == "batch" and len(args) <= 3:
+        if snapshot:
+            for period, accounts in models.snapshot_closed_periods().items():
+                print(f"{period}: {accounts} account balances recorded")
+        summary = render_all(args[1] if len(args) > 1 else None,
+                             Path(args[2]) if len(args) > 2 else OUT_DIR)
+        print(f"{summary['period']}: {summary['accounts']} statements "
+              f"({summary['failed']} failed) in {summary['seconds']}s "
+              f"({summary['per_second']}/s) -> {summary['out_dir']}")
+    elif len(args) in (1, 3) and args[0].isdigit():
+        print(render_statement(int(args[0]), *args[1:]))
+    else:
+        print("usage: python statements.py <account_id> [start end] | batch [--snapshot] [YYYY-MM] [out_dir]")
+        sys.exit(2)
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def bank_db(tmp_path, monkeypatch):
+    """A fresh, migrated database (with the admin account) for one test."""
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "banking.db")
+    db.initialize_db(str(ROOT / "init_db.sql"))
+    db.run_migrations()
+    import models
+    models.ensure_admin_account()
+    yield db.DB_FILE
+    db.close_pool()
@@ -0,0 +1,134 @@
+import pytest
+
+import models
+
+pytest.importorskip("flask")
+
+import app as bank_app  # noqa: E402
+
+ADMIN_PIN = "123456"
+
+
+@pytest.fixture
+def client(bank_db):
+    return bank_app.app.test_client()
+
+
+@pytest.mark.parametrize("path, body, error", [
+    ("/api/admin/transactions", {"limit": "x"}, "limit must be a whole number"),
+    ("/api/admin/transactions", {"before_id": "1.5"}, "before_id must be a whole number"),
+    ("/api/admin/transactions", {"limit": 0}, "limit must be at least 1"),
+    ("/api/admin/users", {"limit": "ten"}, "limit must be a whole number"),
+])
+def test_bad_paging_fields_are_rejected_cleanly(client, path, body, error):
+    resp = client.post(path, json={"pin": ADMIN_PIN, **body})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": error}
+
+
+def test_bad_history_limit_is_rejected_cleanly(client):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 10)
+    resp = client.get(f"/api/transactions/{a}?limit=x")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "limit must be a whole number"}
+
+
+@pytest.fixture
+def ledger(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 1000)
+    b = models.create_account("Ravi", "ravi@example.com", "9000000002", "4321", 500)
+    for amount in (10, 20, 30):
+        models.withdraw(a, amount)
+    models.transfer(a, b, 40)
+    return a, b
+
+
+def test_ledger_pages_with_the_before_id_cursor(client, ledger):
+    everything = client.post("/api/admin/transactions", json={"pin": ADMIN_PIN}).get_json()
+    assert len(everything) == 7
+    ids = [r["id"] for r in everything]
+    assert ids == sorted(ids, reverse=True)
+    pages, before = [], None
+    while True:
+        page = client.post("/api/admin/transactions",
+                           json={"pin": ADMIN_PIN, "before_id": before, "limit": 3}).get_json()
+        if not page:
+            break
+        pages.append([r["id"] for r in page])
+        before = page[-1]["id"]
+    assert pages == [ids[:3], ids[3:6], ids[6:]]
+
+
+def test_ledger_filters_and_ndjson(client, ledger):
+    a, _ = ledger
+    rows = client.post("/api/admin/transactions", json={
+        "pin": ADMIN_PIN, "account_id": a, "type": "Withdraw", "min_amount": 15, "max_amount": "30",
+    }).get_json()
+    assert [r["amount"] for r in rows] == [30, 20]
+    resp = client.post("/api/admin/transactions", json={"pin": ADMIN_PIN, "format": "ndjson", "limit": 2})
+    assert resp.mimetype == "application/x-ndjson"
+    assert len(resp.get_data(as_text=True).splitlines()) == 2
+    assert client.post("/api/admin/transactions", json={"pin": "0000"}).status_code == 403
+
+
+def test_snapshot_answers_304_until_the_figures_change(client):
+    headers = {"X-Admin-Pin": ADMIN_PIN}
+    first = client.get("/api/admin/snapshot", headers=headers)
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert first.get_json()["total_users"] == 0
+
+    again = client.get("/api/admin/snapshot", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+
+    models.create_account("Asha", "asha@example.com", "9000000001", "1234", 10)
+    changed = client.get("/api/admin/snapshot", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.get_json()["total_users"] == 1
+
+
+def test_snapshot_needs_the_admin(client):
+    assert client.get("/api/admin/snapshot").status_code == 403
+    assert client.get("/api/admin/snapshot", headers={"X-Admin-Pin": "000000"}).status_code == 403
+
+
+def login(client, pin=ADMIN_PIN):
+    return client.post("/api/admin/login", json={"pin": pin})
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_login_issues_a_token_that_authorizes_admin_calls(client):
+    assert login(client, "000000").status_code == 403
+    body = login(client).get_json()
+    assert body["expires_in"] == bank_app.ADMIN_TOKEN_TTL
+    assert client.post("/api/admin/stats", json={}, headers=bearer(body["token"])).status_code == 200
+    assert client.post("/api/admin/stats", json={}, headers=bearer(body["token"] + "x")).status_code == 403
+
+
+def test_expired_tokens_are_refused(client, monkeypatch):
+    monkeypatch.setattr(bank_app, "ADMIN_TOKEN_TTL", -1)
+    token = login(client).get_json()["token"]
+    assert client.post("/api/admin/stats", json={}, headers=bearer(token)).status_code == 403
+
+
+def test_changing_the_pin_revokes_old_tokens(client):
+    old = login(client).get_json()["token"]
+    resp = client.post("/api/admin/change-pin", json={"old_pin": ADMIN_PIN, "new_pin": "654321"})
+    assert resp.status_code == 200
+    assert client.post("/api/admin/stats", json={}, headers=bearer(old)).status_code == 403
+    assert client.post("/api/admin/stats", json={}, headers=bearer(resp.get_json()["token"])).status_code == 200
+    assert login(client, ADMIN_PIN).status_code == 403
+    assert login(client, "654321").status_code == 200
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"old_pin": "000000", "new_pin": "654321"}, 403),
+    ({"old_pin": ADMIN_PIN, "new_pin": "12"}, 400),
+    ({"old_pin": ADMIN_PIN}, 400),
+])
+def test_bad_pin_changes_leave_the_pin_alone(client, body, status):
+    assert client.post("/api/admin/change-pin", json=body).status_code == status
+    assert login(client).status_code == 200
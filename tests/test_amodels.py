@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+
+import amodels
+import db
+import models
+
+
+@pytest.fixture
+def account(bank_db):
+    return models.create_account("Asha", "asha@example.com", "9000000001", "1234", 100)
+
+
+def test_reads_run_off_the_event_loop(account):
+    async def main():
+        loop_thread = threading.current_thread().name
+        reader = await amodels.read(lambda: threading.current_thread().name)
+        acc = await amodels.get_account(account)
+        return loop_thread, reader, acc
+
+    loop_thread, reader, acc = asyncio.run(main())
+    assert reader.startswith("amodels-reader") and reader != loop_thread
+    assert acc["balance"] == 100
+
+
+def test_concurrent_movements_are_all_applied(account):
+    async def main():
+        other = await amodels.write(models.create_account, "Ravi", "ravi@example.com",
+                                    "9000000002", "4321", 0)
+        await asyncio.gather(*[amodels.deposit(account, "0.10") for _ in range(50)],
+                             *[amodels.transfer(account, other, 1) for _ in range(10)])
+        return await amodels.get_account(account), await amodels.get_account(other)
+
+    a, b = asyncio.run(main())
+    assert a["balance"] == 95 and b["balance"] == 10
+    assert len(asyncio.run(amodels.get_transactions(account, limit=100))) == 61
+
+
+def test_failed_movements_raise_in_the_caller(account):
+    with pytest.raises(ValueError):
+        asyncio.run(amodels.withdraw(account, 1000))
+    with pytest.raises(ValueError):
+        asyncio.run(amodels.deposit(account, -5))
+    assert models.get_account(account)["balance"] == 100
+
+
+def test_check_pin_upgrades_legacy_hashes(account):
+    with db.get_conn(True) as conn:
+        conn.execute("UPDATE accounts SET pin_hash=? WHERE account_id=?",
+                     (hashlib.sha256(b"1234").hexdigest(), account))
+    acc = models.get_account(account)
+    assert not asyncio.run(amodels.check_pin(acc, "0000"))
+    assert not asyncio.run(amodels.check_pin(None, "1234"))
+    assert asyncio.run(amodels.check_pin(acc, "1234"))
+    assert models.get_account(account)["pin_hash"].startswith("scrypt$")
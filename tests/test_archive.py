@@ -0,0 +1,51 @@
+import db
+import models
+
+
+def backdate_history(months):
+    with db.get_conn(True) as conn:
+        conn.execute(f"UPDATE transactions SET created_at = datetime(created_at, '-{months} months')")
+        conn.execute(f"UPDATE accounts SET created_at = datetime(created_at, '-{months} months')")
+
+
+def archived_period(account_id):
+    return models.get_transactions(account_id)[0]["created_at"][:7]
+
+
+def test_archive_moves_history_and_reads_span_both_tiers(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 1000)
+    models.deposit(a, 50)
+    backdate_history(6)
+    models.deposit(a, 25)
+    before = models.get_transactions(a)
+
+    moved = models.archive_old_history()
+    assert sum(moved.values()) == 2
+    with db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM main.transactions").fetchone()[0] == 1
+        assert conn.execute("SELECT SUM(row_count) FROM archive.archived_periods").fetchone()[0] == 2
+    assert models.get_transactions(a) == before
+
+
+def test_interrupted_move_is_not_double_counted_and_resumes(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 1000)
+    models.deposit(a, 50)
+    backdate_history(6)
+    period = archived_period(a)
+    start, end = models._period_bounds(period)
+    # Crash after the copy committed, before the hot rows were deleted
+    with db.get_conn(True, write=True) as conn:
+        conn.execute("""
+            INSERT INTO archive.transactions
+            SELECT tx_id, account_id, type, amount, balance_after, note, created_at
+            FROM main.transactions WHERE created_at >= ? AND created_at < ?
+        """, (start, end))
+
+    assert len(models.get_transactions(a)) == 2
+    statement = models.get_statement(a, start, models.datetime.date.today().isoformat())
+    assert statement["total_credits"] == 1050
+    assert models.rebuild_bank_stats()["total_deposits"] == 1050
+
+    assert models.archive_old_history() == {period: 2}
+    assert len(models.get_transactions(a)) == 2
+    assert models.get_account(a)["balance"] == 1050
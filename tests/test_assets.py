@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import app as bank_app  # noqa: E402
+import assets  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    manifest = assets.build(out_dir=tmp_path / "dist")
+    monkeypatch.setattr(bank_app, "ASSETS", assets.load_manifest(tmp_path / "dist"))
+    return bank_app.app.test_client(), manifest
+
+
+def test_fingerprinted_asset_is_served_immutable(client):
+    http, manifest = client
+    hashed = manifest["styles.css"]["file"]
+    assert hashed != "styles.css"
+    resp = http.get("/" + hashed)
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == bank_app.IMMUTABLE
+    assert resp.headers["ETag"]
+
+
+def test_pages_reference_hashed_assets_and_revalidate(client):
+    http, manifest = client
+    resp = http.get("/index.html")
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "no-cache"
+    assert manifest["styles.css"]["file"] in resp.get_data(as_text=True)
+    again = http.get("/index.html", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_plain_name_still_served(client):
+    http, _ = client
+    resp = http.get("/styles.css")
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "no-cache"
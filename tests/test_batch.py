@@ -0,0 +1,73 @@
+import pytest
+
+import group_commit
+import models
+
+
+@pytest.fixture
+def accounts(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 104)
+    b = models.create_account("Ravi", "ravi@example.com", "9000000002", "4321", 0)
+    return a, b
+
+
+def test_self_transfer_is_refused_on_every_path(accounts):
+    a, _ = accounts
+    with pytest.raises(ValueError, match="same account"):
+        models.transfer(a, a, 10)
+    with pytest.raises(ValueError, match="same account"):
+        group_commit.transfer(a, a, 10).result()
+    [res] = models.post_batch([{"type": "transfer", "from_id": a, "to_id": a, "amount": 10}])
+    assert res == {"index": 0, "ok": False, "error": models.SAME_ACCOUNT_ERROR}
+    assert models.get_account(a)["balance"] == 104
+    assert [t["type"] for t in models.get_transactions(a)] == ["Deposit"]
+
+
+def test_later_items_see_earlier_ones_and_failures_are_isolated(accounts):
+    a, b = accounts
+    results = models.post_batch([
+        {"type": "deposit", "account_id": b, "amount": 50, "note": "Salary"},
+        {"type": "withdraw", "account_id": b, "amount": 60},          # 50 is all it has
+        {"type": "transfer", "from_id": b, "to_id": a, "amount": 20},
+        {"type": "refund", "account_id": a, "amount": 1},
+        {"type": "deposit", "account_id": 999, "amount": 1},
+        {"type": "deposit", "account_id": a, "amount": "-3"},
+        None,
+    ], chunk_size=3)
+    assert [r["index"] for r in results] == list(range(7))
+    assert [r["ok"] for r in results] == [True, False, True, False, False, False, False]
+    assert results[1]["error"] == "Insufficient funds"
+    assert results[2] == {"index": 2, "ok": True, "from_balance": 30, "to_balance": 124}
+    assert models.get_account(b)["balance"] == 30
+    assert models.get_account(a)["balance"] == 124
+    assert models.get_transactions(b)[-1]["note"] == "Salary"
+
+
+def test_batch_keeps_counters_stats_and_float_in_step(accounts):
+    a, b = accounts
+    float_before = models.get_bank_balance()
+    models.post_batch([
+        {"type": "deposit", "account_id": a, "amount": 10},
+        {"type": "withdraw", "account_id": a, "amount": 4},
+        {"type": "transfer", "from_id": a, "to_id": b, "amount": 5},
+    ])
+    assert models.get_bank_balance() == float_before + 6
+    assert models.get_usage(a, "Withdraw") == {"count": 1, "amount": 4}
+    assert models.get_usage(b, "Transfer-In") == {"count": 1, "amount": 5}
+    stats = models.get_bank_stats()
+    assert models.rebuild_bank_stats() == stats
+
+
+def test_http_batch_reports_each_line(accounts):
+    pytest.importorskip("flask")
+    import app as bank_app
+    a, _ = accounts
+    body = '{"type": "deposit", "account_id": %d, "amount": 5}\nnot json\n' % a
+    client = bank_app.app.test_client()
+    resp = client.post("/api/batch", data=body, headers={"X-Admin-Pin": "123456"})
+    assert resp.headers["X-Batch-Applied"] == "1" and resp.headers["X-Batch-Failed"] == "1"
+    lines = resp.get_data(as_text=True).splitlines()
+    assert '"error": "Invalid JSON"' in lines[1]
+    bad = client.post("/api/batch?chunk_size=x", data=body, headers={"X-Admin-Pin": "123456"})
+    assert bad.status_code == 400 and bad.get_json() == {"error": "chunk_size must be a whole number"}
+    assert client.post("/api/batch", data=body).status_code == 403
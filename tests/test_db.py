@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+import db
+import models
+
+
+def run_threads(count, target, concurrent):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    if concurrent:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        for t in threads:
+            t.start()
+            t.join()
+
+
+def test_thread_per_request_reuses_connections(bank_db):
+    db.close_pool()
+    run_threads(200, lambda: models.get_account_by_email(models.ADMIN_EMAIL), concurrent=False)
+    stats = db.pool_stats()
+    assert stats["connections_created"] == 1
+    assert stats["reused"] == stats["checkouts"] - 1
+    assert stats["open_connections"] == stats["idle"] == 1
+
+
+def test_burst_keeps_at_most_pool_size_idle(bank_db, monkeypatch):
+    db.close_pool()
+    monkeypatch.setattr(db, "POOL_SIZE", 2)
+    start = threading.Barrier(6)
+
+    def hold():
+        with db.get_conn():
+            start.wait()
+
+    run_threads(6, hold, concurrent=True)
+    stats = db.pool_stats()
+    assert stats["connections_created"] == 6
+    assert stats["in_use"] == 0 and stats["idle"] == 2
+
+
+def test_nested_blocks_share_one_checkout(bank_db):
+    with db.get_conn() as outer:
+        with db.get_conn(True, write=True) as inner:
+            assert inner is outer
+            inner.execute("UPDATE accounts SET name='x' WHERE 0")
+        assert not outer.in_transaction
+    assert db.pool_stats()["in_use"] == 0
+
+
+def test_initialize_db_defaults_to_the_full_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "banking.db")
+    try:
+        db.initialize_db()
+        with db.get_conn() as conn:
+            assert db.schema_version(conn) == len(db.MIGRATIONS)
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(accounts)")}
+        assert {"role", "gender"} <= columns
+    finally:
+        db.close_pool()
+
+
+def test_profile_pragmas_are_applied(bank_db, monkeypatch):
+    with db.get_conn() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1      # NORMAL
+    monkeypatch.setattr(db, "DB_PROFILE", db.DB_PROFILE)
+    db.set_profile("durable")
+    with db.get_conn() as conn:
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2      # FULL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 10000
+    with pytest.raises(ValueError):
+        db.set_profile("fast")
+
+
+def test_write_blocks_do_not_lose_concurrent_updates(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 0)
+    run_threads(8, lambda: [models.deposit(a, 1) for _ in range(25)], concurrent=True)
+    assert models.get_account(a)["balance"] == 200
@@ -0,0 +1,52 @@
+import threading
+
+import db
+import models
+
+
+def shard_rows():
+    with db.get_conn() as conn:
+        return dict(conn.execute("SELECT shard, balance FROM system_funds_shards").fetchall())
+
+
+def test_movements_spread_over_shards_and_sum_to_the_float(bank_db):
+    before = models.get_bank_balance()
+    ids = [models.create_account(f"C{i}", f"c{i}@example.com", f"90000000{i:02d}", "1234", 0)
+           for i in range(5)]
+    for i, a in enumerate(ids):
+        models.deposit(a, 100 + i)
+    models.withdraw(ids[0], 40)
+    models.transfer(ids[1], ids[2], 50)             # moves no bank money
+    assert models.get_bank_balance() == before + 510 - 40
+    touched = {models.fund_shard(a) for a in ids}
+    assert touched <= set(shard_rows())
+    assert len(touched) == 5
+
+
+def test_compaction_keeps_the_total_in_one_row(bank_db):
+    ids = [models.create_account(f"C{i}", f"c{i}@example.com", f"90000000{i:02d}", "1234", 0)
+           for i in range(3)]
+    for a in ids:
+        models.deposit(a, "12.34")
+    total = models.get_bank_balance()
+    assert models.compact_bank_funds() == total
+    assert list(shard_rows()) == [0]
+    models.deposit(ids[1], 1)
+    assert models.get_bank_balance() == round(total + 1, 2)
+
+
+def test_concurrent_deposits_keep_the_float_exact(bank_db):
+    ids = [models.create_account(f"C{i}", f"c{i}@example.com", f"90000000{i:02d}", "1234", 0)
+           for i in range(4)]
+    before = models.get_bank_balance()
+
+    def work(a):
+        for _ in range(20):
+            models.deposit(a, 1)
+
+    threads = [threading.Thread(target=work, args=(a,)) for a in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert models.get_bank_balance() == before + 80
@@ -0,0 +1,46 @@
+import pytest
+
+import group_commit
+import models
+
+
+@pytest.fixture
+def accounts(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 100)
+    b = models.create_account("Ravi", "ravi@example.com", "9000000002", "4321", 0)
+    return a, b
+
+
+def amount(value):
+    return models.positive_amount(value)
+
+
+def test_a_failing_operation_does_not_undo_its_batch(accounts):
+    a, b = accounts
+    writer = group_commit.GroupCommitWriter(max_batch=10, max_latency_ms=500)
+    futures = [
+        writer.submit(models._deposit, a, amount(20), None, False),
+        writer.submit(models._withdraw, b, amount(5), None, False),      # b has nothing yet
+        writer.submit(models._transfer, a, b, amount(50), False),        # sees the deposit
+        writer.submit(models._withdraw, b, amount(10), None, False),     # sees the transfer
+    ]
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=10)
+    for f in (futures[0], futures[2], futures[3]):
+        f.result(timeout=10)
+
+    assert writer.stats()["batches"] == 1
+    assert writer.stats()["failed"] == 1
+    assert models.get_account(a)["balance"] == 70
+    assert models.get_account(b)["balance"] == 40
+    assert [t["type"] for t in models.get_transactions(b)] == ["Withdraw", "Transfer-In"]
+
+
+def test_module_functions_resolve_like_models(accounts):
+    a, b = accounts
+    assert group_commit.deposit(a, 5).result(timeout=10) == models.get_account(a)["balance"]
+    with pytest.raises(ValueError):
+        group_commit.withdraw(a, "abc").result(timeout=10)
+    with pytest.raises(ValueError):
+        group_commit.transfer(b, a, 1).result(timeout=10)
+    assert models.get_account(b)["balance"] == 0
@@ -0,0 +1,46 @@
+import db
+import models
+
+
+def ledger_rows(conn, account_id, created_at, count):
+    for i in range(count):
+        conn.execute(
+            "INSERT INTO transactions (account_id, type, amount, balance_after, note, created_at) "
+            "VALUES (?, 'Deposit', 100, ?, '', ?)",
+            (account_id, 100 * (i + 1), created_at)
+        )
+
+
+def test_keyset_pages_cover_history_once_even_with_equal_timestamps(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 0)
+    with db.get_conn(True) as conn:
+        ledger_rows(conn, a, "2024-01-01 10:00:00", 7)      # all in the same second
+        ledger_rows(conn, a, "2024-01-02 10:00:00", 6)
+    everything = [t["tx_id"] for t in models.get_transactions(a, limit=100)]
+    pages, before = [], None
+    while True:
+        page = models.get_transactions(a, limit=5, before_tx_id=before)
+        if not page:
+            break
+        pages.append([t["tx_id"] for t in page])
+        before = page[-1]["tx_id"]
+    assert [len(p) for p in pages] == [5, 5, 3]
+    assert sum(pages, []) == everything
+    newer = models.get_transactions(a, limit=3, after_tx_id=pages[1][0])
+    assert [t["tx_id"] for t in newer] == pages[0][-3:]
+
+
+def test_history_query_seeks_the_composite_index(bank_db):
+    with db.get_conn() as conn:
+        plan = " ".join(r["detail"] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM transactions WHERE account_id=? "
+            "ORDER BY created_at DESC, tx_id DESC LIMIT 20", (1,)))
+        indexes = {r["name"] for r in conn.execute("PRAGMA index_list(transactions)")}
+    assert "idx_tx_account_created" in plan and "TEMP B-TREE" not in plan
+    assert "idx_tx_account" not in indexes
+
+
+def test_migrations_are_recorded_and_not_rerun(bank_db):
+    assert db.run_migrations() == len(db.MIGRATIONS)
+    with db.get_conn() as conn:
+        assert db.schema_version(conn) == len(db.MIGRATIONS)
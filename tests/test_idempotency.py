@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+import db
+import group_commit
+import models
+
+
+@pytest.fixture
+def accounts(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 1000)
+    b = models.create_account("Ravi", "ravi@example.com", "9000000002", "4321", 1000)
+    return a, b
+
+
+def deposit_once(account_id, amount, key):
+    fp = models.request_fingerprint("deposit", account_id, amount)
+    return group_commit.deposit(account_id, amount, idempotency=(key, fp)).result()
+
+
+def test_replay_returns_stored_result_and_moves_money_once(accounts):
+    a, _ = accounts
+    results = [deposit_once(a, 100, "k1") for _ in range(5)]
+    assert results[0] == (1100, False)
+    assert all(r == (1100, True) for r in results[1:])
+    assert models.get_account(a)["balance"] == 1100
+
+
+def test_concurrent_retries_post_once(accounts):
+    a, b = accounts
+    fp = models.request_fingerprint("transfer", a, b, 50)
+    out = []
+    threads = [
+        threading.Thread(target=lambda: out.append(
+            group_commit.transfer(a, b, 50, idempotency=("t1", fp)).result()))
+        for _ in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(not replayed for _, replayed in out) == 1
+    assert models.get_account(a)["balance"] == 950
+    assert models.get_account(b)["balance"] == 1050
+
+
+def test_key_reused_with_other_parameters_conflicts(accounts):
+    a, _ = accounts
+    deposit_once(a, 100, "k1")
+    with pytest.raises(models.IdempotencyConflict):
+        deposit_once(a, 101, "k1")
+    assert models.get_account(a)["balance"] == 1100
+
+
+def test_keys_are_scoped_to_the_account(accounts):
+    a, b = accounts
+    deposit_once(a, 100, "k1")
+    assert deposit_once(b, 7, "k1") == (1007, False)
+
+
+def test_failed_operation_is_not_stored(accounts):
+    a, _ = accounts
+    fp = models.request_fingerprint("withdraw", a, 5000)
+    with pytest.raises(ValueError):
+        group_commit.withdraw(a, 5000, idempotency=("w1", fp)).result()
+    assert models.get_idempotent_result(a, "w1", fp) is None
+
+
+def test_expired_keys_run_again_and_are_evicted(accounts):
+    a, _ = accounts
+    deposit_once(a, 100, "k1")
+    with db.get_conn(True) as conn:
+        conn.execute("UPDATE idempotency_keys SET expires_at = 0")
+    assert models.get_idempotent_result(a, "k1", models.request_fingerprint("deposit", a, 100)) is None
+    assert models.evict_idempotency_keys() == 1
+    assert deposit_once(a, 100, "k1") == (1200, False)
+
+
+# ---------- HTTP (needs flask) ----------
+@pytest.fixture
+def client(accounts):
+    pytest.importorskip("flask")
+    import app as bank_app
+    return bank_app.app.test_client()
+
+
+def test_http_replay_is_marked(client, accounts):
+    a, _ = accounts
+    headers = {"Idempotency-Key": "h1"}
+    first = client.post("/api/withdraw", data={"account_id": a, "amount": 100, "pin": "1234"}, headers=headers)
+    again = client.post("/api/withdraw", data={"account_id": a, "amount": 100, "pin": "1234"}, headers=headers)
+    assert first.status_code == again.status_code == 200
+    assert first.get_json() == again.get_json() == {"balance": 900}
+    assert "Idempotent-Replayed" not in first.headers
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert models.get_account(a)["balance"] == 900
+
+
+def test_http_replay_still_needs_the_pin(client, accounts):
+    a, b = accounts
+    headers = {"Idempotency-Key": "h2"}
+    ok = client.post("/api/transfer", data={"from_id": a, "to_id": b, "amount": 10, "pin": "1234"}, headers=headers)
+    assert ok.status_code == 200
+    wrong = client.post("/api/transfer", data={"from_id": a, "to_id": b, "amount": 10, "pin": "WRONG"}, headers=headers)
+    assert wrong.status_code == 403
+    assert "balance" not in wrong.get_data(as_text=True)
+
+
+def test_http_conflict_is_422(client, accounts):
+    a, _ = accounts
+    headers = {"Idempotency-Key": "h3"}
+    assert client.post("/api/deposit", data={"account_id": a, "amount": 5}, headers=headers).status_code == 200
+    resp = client.post("/api/deposit", data={"account_id": a, "amount": 6}, headers=headers)
+    assert resp.status_code == 422
+    assert models.get_account(a)["balance"] == 1005
@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+import pytest
+
+import db
+import models
+
+
+@pytest.fixture
+def ist(monkeypatch):
+    """Run with a local time zone ahead of UTC (IST, +05:30)."""
+    monkeypatch.setenv("TZ", "Asia/Kolkata")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_rupee_columns_convert_to_paise_without_drift(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "banking.db")
+    raw = sqlite3.connect(db.DB_FILE)
+    raw.executescript(db.INIT_SQL.read_text())
+    raw.execute("INSERT INTO accounts (name, pin_hash, balance, initial_deposit) VALUES ('Asha', 'x', 0.29, 1000.1)")
+    raw.execute("INSERT INTO transactions (account_id, type, amount, balance_after) VALUES (1, 'Deposit', 0.07, 0.29)")
+    raw.commit()
+    raw.close()
+    try:
+        db.run_migrations()
+        with db.get_conn() as conn:
+            acc = conn.execute("SELECT balance, initial_deposit FROM accounts").fetchone()
+            tx = conn.execute("SELECT amount, balance_after FROM transactions").fetchone()
+        assert (acc["balance"], acc["initial_deposit"]) == (29, 100010)
+        assert (tx["amount"], tx["balance_after"]) == (7, 29)
+        assert models.get_account(1)["balance"] == 0.29
+    finally:
+        db.close_pool()
+
+
+def legacy_charge(conn, account_id, created_at):
+    conn.execute(
+        "INSERT INTO transactions (account_id, type, amount, balance_after, note, created_at) "
+        "VALUES (?, 'Withdraw', 5500, 0, ?, ?)",
+        (account_id, models.CHARGE_NOTE, created_at)
+    )
+
+
+def test_charge_backfill_uses_the_local_month(bank_db, ist):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 0)
+    with db.get_conn(True) as conn:
+        legacy_charge(conn, a, "2024-03-31 20:00:00")     # 1 April, 01:30 IST
+        conn.executescript(db.MIGRATIONS[7])
+        periods = [r[0] for r in conn.execute("SELECT period FROM monthly_charges")]
+    assert periods == ["2024-04"]
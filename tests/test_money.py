@@ -0,0 +1,101 @@
+import hashlib
+
+import pytest
+
+import db
+import group_commit
+import models
+
+
+@pytest.mark.parametrize("text, paise", [
+    ("1,250.50", 125050), ("0.29", 29), (0.1, 10), ("2.675", 268), (7, 700), ("-0.05", -5),
+])
+def test_parse_rounds_to_whole_paise(text, paise):
+    assert models.Money.parse(text) == paise
+
+
+@pytest.mark.parametrize("text", ["", "abc", "nan", "inf", None])
+def test_parse_rejects_non_amounts(text):
+    with pytest.raises(ValueError):
+        models.Money.parse(text)
+
+
+def test_money_formats_and_converts():
+    assert str(models.Money(125050)) == "1250.50"
+    assert str(models.Money(-5)) == "-0.05"
+    assert models.Money(29).rupees == 0.29
+    assert models.Money.parse(models.Money(3)) == 3
+    assert models.money_row({"amount": 1010, "balance_after": 5, "note": "x"}) == \
+        {"amount": 10.1, "balance_after": 0.05, "note": "x"}
+
+
+@pytest.fixture
+def accounts(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 1000)
+    b = models.create_account("Ravi", "ravi@example.com", "9000000002", "4321", 0)
+    return a, b
+
+
+def test_deposit_withdraw_transfer(accounts):
+    a, b = accounts
+    assert models.deposit(a, "250.50") == 1250.5
+    assert models.withdraw(a, 50) == 1200.5
+    assert models.transfer(a, b, "0.10") == (1200.4, 0.1)
+    assert models.get_account(a)["balance"] == 1200.4
+    assert [t["type"] for t in models.get_transactions(b)] == ["Transfer-In"]
+
+
+def test_overdraft_and_bad_amounts_move_nothing(accounts):
+    a, b = accounts
+    with pytest.raises(ValueError):
+        models.withdraw(a, 1000.01)
+    with pytest.raises(ValueError):
+        models.transfer(b, a, 1)
+    with pytest.raises(ValueError):
+        models.deposit(a, -5)
+    assert models.get_account(a)["balance"] == 1000
+    assert models.get_account(b)["balance"] == 0
+
+
+def test_group_commit_applies_each_operation_once(accounts):
+    a, b = accounts
+    futures = [group_commit.deposit(a, 1) for _ in range(50)]
+    futures.append(group_commit.withdraw(b, 1))     # fails alone
+    assert sorted(f.result() for f in futures[:50])[-1] == 1050
+    with pytest.raises(ValueError):
+        futures[-1].result()
+    assert models.get_account(a)["balance"] == 1050
+    assert models.get_bank_stats()["total_deposits"] == 1050
+
+
+def test_delete_account_keeps_ledger_history(accounts):
+    a, b = accounts
+    models.deposit(a, 100)
+    models.transfer(a, b, 40)
+    models.delete_account(a)
+    assert models.get_account(a) is None
+    assert [t["type"] for t in models.get_transactions(a)] == ["Transfer-Out", "Deposit", "Deposit"]
+    stats = models.get_bank_stats()
+    assert stats["total_deposits"] == 1100
+    assert stats["total_users"] == 1
+    assert models.rebuild_bank_stats() == stats
+
+
+def test_verify_admin_upgrades_legacy_hash(bank_db):
+    admin = models.get_account_by_email(models.ADMIN_EMAIL)
+    legacy = hashlib.sha256(b"123456").hexdigest()
+    with db.get_conn(True) as conn:
+        conn.execute("UPDATE accounts SET pin_hash=? WHERE account_id=?", (legacy, admin["account_id"]))
+    assert not models.verify_admin("admin", "admin123")
+    assert not models.verify_admin("root", "123456")
+    assert models.verify_admin("admin", "123456")
+    assert models.get_account_by_email(models.ADMIN_EMAIL)["pin_hash"].startswith("scrypt$")
+
+
+def test_sums_of_small_amounts_stay_exact(accounts):
+    a, _ = accounts
+    for _ in range(10):
+        models.deposit(a, "0.10")
+    with db.get_conn() as conn:
+        assert conn.execute("SELECT balance FROM accounts WHERE account_id=?", (a,)).fetchone()[0] == 100100
+    assert models.get_account(a)["balance"] == 1001
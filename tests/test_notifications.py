@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+import db
+import notifications
+from notifications import Dispatcher, LocalTransport
+
+
+def local_dispatcher():
+    # Not started: flush() is driven by the test
+    return Dispatcher(transports={"email": LocalTransport("email"), "sms": LocalTransport("sms")})
+
+
+def queue_email(n):
+    acc = {"account_id": None, "name": "Asha", "email": "asha@example.com", "phone": None}
+    for _ in range(n):
+        notifications.enqueue(acc, "DEPOSIT", amount=10, balance=10)
+
+
+def test_starting_a_dispatcher_leaves_other_claims_alone(bank_db):
+    queue_email(3)
+    first = local_dispatcher()
+    claimed = first._claim("email")
+    assert len(claimed) == 3
+
+    second = local_dispatcher()
+    second.start()
+    second.stop()
+    assert second.flush("email") is None        # still leased by `first`
+    assert second.transports["email"].sent == []
+
+    first._finish(claimed, [None] * len(claimed))
+    with db.get_conn() as conn:
+        statuses = {r[0] for r in conn.execute("SELECT status FROM notification_outbox")}
+    assert statuses == {"sent"}
+
+
+def test_expired_lease_is_reclaimed_once(bank_db, monkeypatch):
+    queue_email(2)
+    dead = local_dispatcher()
+    abandoned = dead._claim("email")
+    monkeypatch.setattr(notifications, "CLAIM_LEASE_SECONDS", 0)
+
+    live = local_dispatcher()
+    stats = live.flush("email")
+    assert stats["sent"] == 2
+    assert len(live.transports["email"].sent) == 2
+
+    # The old claimant finishing late must not touch rows it no longer holds
+    dead._finish(abandoned, ["timeout"] * len(abandoned))
+    with db.get_conn() as conn:
+        rows = conn.execute("SELECT status, attempts, last_error FROM notification_outbox").fetchall()
+    assert [tuple(r) for r in rows] == [("sent", 2, None)] * 2
+
+
+def test_unconfigured_channels_fail_without_sending(bank_db, monkeypatch):
+    pytest.importorskip("requests")
+    monkeypatch.delenv("BANK_NOTIFY_TRANSPORT", raising=False)
+    assert notifications.EMAIL_PASSWORD == "" and notifications.SMS_API_KEY == ""
+    transports = notifications.default_transports()
+    assert not transports["email"].configured and not transports["sms"].configured
+    queue_email(1)
+    dispatcher = Dispatcher(transports=transports)
+    stats = dispatcher.flush("email")
+    assert stats["sent"] == 0 and stats["retried"] == 1
+    with db.get_conn() as conn:
+        error = conn.execute("SELECT last_error FROM notification_outbox").fetchone()[0]
+    assert "BANK_SMTP_PASSWORD" in error
+    with pytest.raises(RuntimeError, match="BANK_SMS_API_KEY"):
+        transports["sms"].send("9000000001", "s", "b")
+
+
+def test_notify_returns_at_once_and_workers_deliver(bank_db):
+    transports = {"email": LocalTransport("email"), "sms": LocalTransport("sms")}
+    notifications.configure(transports=transports, workers=2)
+    try:
+        acc = {"account_id": 7, "name": "Asha", "email": "asha@example.com", "phone": "+919000000001"}
+        notifications.notify(acc, "PIN_CHANGED")
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not (transports["email"].sent and transports["sms"].sent):
+            time.sleep(0.02)
+        assert transports["email"].sent[0]["recipient"] == "asha@example.com"
+        assert transports["sms"].sent[0]["recipient"] == "9000000001"
+    finally:
+        notifications.get_dispatcher().stop()
+        notifications._dispatcher = None
+
+
+def test_withdraw_alert_reports_the_amount_and_fee_separately(bank_db):
+    import models
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 1000)
+    assert models.withdraw(a, 100, notify=True, fee=20) == 880
+    assert models.get_transactions(a)[0]["amount"] == 120
+    with db.get_conn() as conn:
+        body = conn.execute("SELECT body FROM notification_outbox WHERE channel='email'").fetchone()[0]
+    assert body.startswith(f"₹100.0 debited from A/c {a}. ATM fee: ₹20.0. Avl Bal: ₹880.0.")
+    models.withdraw(a, 10, notify=True)
+    with db.get_conn() as conn:
+        body = conn.execute("SELECT body FROM notification_outbox ORDER BY id DESC").fetchone()[0]
+    assert "fee" not in body
+
+
+def test_alert_rolls_back_with_its_transaction(bank_db):
+    import models
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 0)
+    with pytest.raises(ValueError):
+        models.withdraw(a, 5, notify=True)
+    with db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM notification_outbox").fetchone()[0] == 0
+
+
+def test_same_sms_text_is_coalesced_into_few_calls(bank_db, monkeypatch):
+    monkeypatch.setattr(notifications, "SMS_NUMBERS_PER_CALL", 2)
+    for i in range(5):
+        acc = {"account_id": i + 1, "name": "C", "email": None, "phone": f"900000000{i}"}
+        notifications.enqueue(acc, "MONTHLY_CHARGES", amount=55, balance=0)
+    other = {"account_id": 9, "name": "C", "email": None, "phone": "9000000009"}
+    notifications.enqueue(other, "PIN_CHANGED")
+    dispatcher = local_dispatcher()
+    stats = dispatcher.flush("sms")
+    assert stats["messages"] == 6 and stats["sent"] == 6
+    assert stats["provider_calls"] == 4                 # 2 + 2 + 1 charges, 1 PIN alert
+    assert dispatcher.transports["sms"].calls == 4
+
+
+class FlakyTransport(LocalTransport):
+    def send_batch(self, items):
+        return ["gateway down"] * len(items)
+
+
+def test_failures_back_off_then_give_up(bank_db, monkeypatch):
+    queue_email(1)
+    dispatcher = Dispatcher(transports={"email": FlakyTransport("email")})
+    stats = dispatcher.flush("email")
+    assert stats["retried"] == 1
+    assert dispatcher.flush("email") is None            # not due yet
+    for _ in range(notifications.MAX_ATTEMPTS - 1):
+        with db.get_conn(True) as conn:
+            conn.execute("UPDATE notification_outbox SET next_attempt_at = 0")
+        dispatcher.flush("email")
+    with db.get_conn() as conn:
+        row = conn.execute("SELECT status, attempts, last_error FROM notification_outbox").fetchone()
+    assert tuple(row) == ("failed", notifications.MAX_ATTEMPTS, "gateway down")
+    assert dispatcher.stats()["failed"] == 1
@@ -0,0 +1,80 @@
+import pytest
+
+from live_pincode_lookup import PincodeResolver
+
+pytest.importorskip("requests")
+
+ADDRESS = {"tehsil": "Haveli", "district": "Pune", "state": "Maharashtra"}
+
+
+class FakeApi:
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def __call__(self, pin, session):
+        self.calls.append(pin)
+        answer = self.answers.get(pin)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    def make(answers, **kwargs):
+        api = FakeApi(answers)
+        r = PincodeResolver(db_file=tmp_path / "pincodes.db", fetch=api, **kwargs)
+        made.append(r)
+        return r, api
+    made = []
+    yield make
+    for r in made:
+        r.close()
+
+
+def test_lookups_go_memory_then_disk_then_network(resolver, tmp_path):
+    r, api = resolver({"411001": ADDRESS})
+    assert r.lookup("411001") == ADDRESS
+    assert r.lookup(" 411001 ") == ADDRESS
+    assert api.calls == ["411001"]
+    assert r.stats["memory_hits"] == 1
+
+    fresh, api2 = resolver({})                # new process: empty memory, same disk
+    assert fresh.lookup("411001") == ADDRESS
+    assert api2.calls == [] and fresh.stats["disk_hits"] == 1
+
+
+def test_unknown_pins_are_cached_but_errors_are_not(resolver):
+    r, api = resolver({"999999": None, "110001": ConnectionError("offline")})
+    assert r.lookup("999999") is None
+    assert r.lookup("999999") is None
+    assert r.lookup("110001") is None
+    assert r.lookup("110001") is None
+    assert api.calls == ["999999", "110001", "110001"]
+    assert r.stats["remote_errors"] == 2
+    assert r.lookup("12ab56") is None and "12ab56" not in api.calls
+
+
+def test_negative_answers_expire(resolver):
+    r, api = resolver({"999999": None}, negative_ttl=0)
+    r.lookup("999999")
+    r.lookup("999999")
+    assert api.calls == ["999999", "999999"]
+
+
+def test_async_lookup_and_csv_preload(resolver, tmp_path):
+    csv_file = tmp_path / "dir.csv"
+    csv_file.write_text(
+        "Pincode,OfficeName,DistrictName,StateName\n"
+        "560001,Bangalore GPO,Bangalore,Karnataka\n"
+        "560001,Second Office,Bangalore,Karnataka\n"
+        "abc,Bad,Row,Here\n",
+        encoding="utf-8"
+    )
+    r, api = resolver({})
+    assert r.preload_csv(csv_file) == 1
+    assert r.lookup_async("560001").result(timeout=5) == \
+        {"tehsil": "Bangalore GPO", "district": "Bangalore", "state": "Karnataka"}
+    assert r.lookup_async("560001").done()        # memory hit: already complete
+    assert api.calls == []
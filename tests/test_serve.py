@@ -0,0 +1,85 @@
+import os
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import db
+
+pytest.importorskip("flask")
+
+import serve  # noqa: E402
+
+needs_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+
+
+@needs_fork
+def test_background_jobs_run_in_one_worker_at_a_time(bank_db, monkeypatch):
+    started = []
+    monkeypatch.setattr(serve.bank_app, "start_background_jobs", lambda: started.append(1))
+    monkeypatch.setattr(serve, "_jobs_lock", None)
+    assert serve.claim_background_jobs()
+    assert not serve.claim_background_jobs()        # a second worker backs off
+    os.close(serve._jobs_lock)                      # the first worker exits
+    assert serve.claim_background_jobs()            # and its replacement takes over
+    os.close(serve._jobs_lock)
+    assert started == [1, 1]
+
+
+@needs_fork
+def test_forked_child_starts_with_an_empty_pool(bank_db):
+    with db.get_conn() as conn:
+        conn.execute("SELECT 1")
+    assert db.pool_stats()["idle"] == 1
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            stats = db.pool_stats()
+            with db.get_conn() as conn:
+                users = conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+            ok = stats["idle"] == 0 and stats["in_use"] == 0 and users == 1
+            os.write(w, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(w)
+    assert os.read(r, 1) == b"1"
+    os.waitpid(pid, 0)
+    assert db.pool_stats()["idle"] == 1             # the parent's connection is untouched
+
+
+def test_pooled_server_serves_with_a_fixed_number_of_threads(bank_db):
+    server = serve.PooledWSGIServer("127.0.0.1", 0, serve.bank_app.app, threads=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/admin/snapshot"
+
+    def fetch(_):
+        req = urllib.request.Request(url, headers={"X-Admin-Pin": "123456"})
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status
+
+    try:
+        with ThreadPoolExecutor(8) as ex:
+            assert set(ex.map(fetch, range(40))) == {200}
+        http = [t for t in threading.enumerate() if t.name.startswith("http")]
+        assert len(http) == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_monthly_charges_run_unless_turned_off(monkeypatch, caplog):
+    for name in ("BANK_FUND_COMPACT_SECONDS", "BANK_SNAPSHOT_SECONDS", "BANK_MONTHLY_CHARGES_SECONDS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("BANK_IDEMPOTENCY_EVICT_SECONDS", "0")
+    started = []
+    monkeypatch.setattr(serve.bank_app, "start_monthly_charges_job", started.append)
+    serve.bank_app.start_background_jobs()
+    assert started == [3600]
+
+    monkeypatch.setenv("BANK_MONTHLY_CHARGES_SECONDS", "0")
+    serve.bank_app.start_background_jobs()
+    assert started == [3600]
+    assert "Monthly charges are off" in caplog.text
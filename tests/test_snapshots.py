@@ -0,0 +1,60 @@
+import datetime
+
+import pytest
+
+import db
+import models
+
+
+@pytest.fixture
+def history(bank_db):
+    """An account opened in January 2025 with a few months of ledger rows."""
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 100)
+    models.deposit(a, 50)
+    models.withdraw(a, 30)
+    models.deposit(a, 5)
+    dates = ["2025-01-05 09:00:00", "2025-01-20 09:00:00", "2025-02-10 09:00:00", "2025-03-02 09:00:00"]
+    tx_ids = sorted(t["tx_id"] for t in models.get_transactions(a))
+    with db.get_conn(True) as conn:
+        conn.execute("UPDATE accounts SET created_at=? WHERE account_id=?", (dates[0], a))
+        conn.executemany("UPDATE transactions SET created_at=? WHERE tx_id=?", zip(dates, tx_ids))
+    return a
+
+
+def snapshot(account_id, period):
+    with db.get_conn() as conn:
+        return conn.execute(
+            "SELECT closing_balance, credits, debits, tx_count FROM balance_snapshots "
+            "WHERE account_id=? AND period=?", (account_id, period)
+        ).fetchone()
+
+
+def test_closed_months_are_snapshotted_once(history):
+    done = models.snapshot_closed_periods()
+    assert list(done)[:3] == ["2025-01", "2025-02", "2025-03"]
+    assert set(done.values()) == {1}
+    assert tuple(snapshot(history, "2025-01")) == (15000, 15000, 0, 2)
+    assert tuple(snapshot(history, "2025-02")) == (12000, 0, 3000, 1)
+    assert tuple(snapshot(history, "2025-04")) == (12500, 0, 0, 0)
+    assert models.snapshot_closed_periods() == {}
+
+
+def test_the_current_month_cannot_be_snapshotted(bank_db):
+    with pytest.raises(ValueError, match="not a closed period"):
+        models.snapshot_period(datetime.date.today().strftime("%Y-%m"))
+
+
+def test_balance_as_of_agrees_with_and_without_snapshots(history):
+    dates = ["2025-01-01", "2025-01-10", "2025-02-01", "2025-02-15", "2025-03-03", "2025-06-01"]
+    expected = [0, 100, 150, 120, 125, 125]
+    assert [models.balance_as_of(history, d) for d in dates] == expected
+    models.snapshot_closed_periods()
+    assert [models.balance_as_of(history, d) for d in dates] == expected
+
+
+def test_statement_starts_from_the_snapshot(history):
+    models.snapshot_closed_periods()
+    s = models.get_statement(history, "2025-02-01", "2025-03-31")
+    assert (s["opening_balance"], s["closing_balance"]) == (150, 125)
+    assert (s["total_credits"], s["total_debits"]) == (5, 30)
+    assert [t["type"] for t in s["transactions"]] == ["Withdraw", "Deposit"]
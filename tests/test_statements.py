@@ -0,0 +1,40 @@
+import datetime
+
+import pytest
+
+import models
+
+statements = pytest.importorskip("statements")
+pytest.importorskip("reportlab")
+
+
+def test_summary_totals_match_the_ledger(bank_db, tmp_path, monkeypatch):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", "1000.10")
+    for _ in range(7):
+        models.deposit(a, "0.10")
+    models.withdraw(a, "0.70")
+    fields = {}
+    original = statements.StatementPDF.fields
+
+    def capture(pdf, pairs):
+        fields.update(pairs)
+        return original(pdf, pairs)
+
+    monkeypatch.setattr(statements.StatementPDF, "fields", capture)
+    today = datetime.date.today().isoformat()
+    statements.render_statement(a, today, today, tmp_path / "s.pdf")
+    expected = models.get_statement(a, today, today)
+    assert fields["Total Credits"] == statements.rupees(expected["total_credits"]) == "Rs. 1,000.80"
+    assert fields["Total Debits"] == "Rs. 0.70"
+    assert fields["Closing Balance"] == "Rs. 1,000.10"
+    assert (tmp_path / "s.pdf").stat().st_size > 0
+
+
+def test_batch_does_not_write_snapshots(bank_db, tmp_path):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 100)
+    with models.get_conn(True) as conn:
+        conn.execute("UPDATE accounts SET created_at='2000-01-15 10:00:00' WHERE account_id=?", (a,))
+    summary = statements.render_all("2000-02", tmp_path, workers=1)
+    assert summary["accounts"] == 1 and summary["failed"] == 0
+    with models.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM balance_snapshots").fetchone()[0] == 0
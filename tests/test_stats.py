@@ -0,0 +1,43 @@
+import db
+import models
+
+
+def accounts(n):
+    return [models.create_account(f"S{i}", f"s{i}@example.com", f"91000000{i:02d}", "1234", 0)
+            for i in range(n)]
+
+
+def test_running_totals_match_a_rebuild(bank_db):
+    ids = accounts(4)
+    for i, a in enumerate(ids):
+        models.deposit(a, "250.50")
+    models.withdraw(ids[0], 40, fee="2.50")
+    models.transfer(ids[1], ids[2], "75.25")
+    models.post_batch([{"type": "deposit", "account_id": ids[3], "amount": 10},
+                       {"type": "withdraw", "account_id": ids[3], "amount": 10**6}])
+    models.apply_monthly_charges("2026-01")
+    models.delete_account(ids[3])
+
+    stats = models.get_bank_stats()
+    assert stats["total_users"] == 3
+    assert stats["total_deposits"] == 1012
+    assert stats["total_transfers"] == 75.25
+    assert models.rebuild_bank_stats() == stats
+
+
+def test_snapshot_reads_the_stats_and_the_float_together(bank_db):
+    a, = accounts(1)
+    models.deposit(a, 100)
+    snap = models.get_admin_snapshot()
+    assert snap["bank_balance"] == models.get_bank_balance()
+    assert {k: snap[k] for k in models.get_bank_stats()} == models.get_bank_stats()
+
+
+def test_rebuild_collapses_the_shards(bank_db):
+    ids = accounts(3)
+    for a in ids:
+        models.deposit(a, 5)
+    models.rebuild_bank_stats()
+    with db.get_conn() as conn:
+        shards = {r[0] for r in conn.execute("SELECT DISTINCT shard FROM bank_stats")}
+    assert shards == {0}
@@ -0,0 +1,50 @@
+import pytest
+
+import db
+import models
+
+
+@pytest.fixture
+def accounts(bank_db):
+    a = models.create_account("Asha", "asha@example.com", "9000000001", "1234", 1000)
+    b = models.create_account("Ravi", "ravi@example.com", "9000000002", "4321", 0)
+    return a, b
+
+
+def test_counters_follow_every_movement(accounts):
+    a, b = accounts
+    models.withdraw(a, 100)
+    models.withdraw(a, "50.25")
+    models.transfer(a, b, 200)
+    for period in ("day", "month"):
+        assert models.get_usage(a, "Withdraw", period) == {"count": 2, "amount": 150.25}
+        assert models.get_usage(a, "Transfer-Out", period) == {"count": 1, "amount": 200}
+        assert models.get_usage(b, "Transfer-In", period) == {"count": 1, "amount": 200}
+    assert models.get_usage(b, "Withdraw") == {"count": 0, "amount": 0}
+    summary = models.get_usage_summary(a)
+    assert summary["day"]["Deposit"] == summary["month"]["Deposit"] == {"count": 1, "amount": 1000}
+    assert summary["day"]["Withdraw"]["count"] == 2
+
+
+def test_failed_movement_leaves_counters_alone(accounts):
+    a, b = accounts
+    with pytest.raises(ValueError):
+        models.withdraw(b, 1)
+    assert models.get_usage(b, "Withdraw") == {"count": 0, "amount": 0}
+
+
+def test_unknown_period_is_rejected(accounts):
+    with pytest.raises(ValueError):
+        models.get_usage(accounts[0], "Withdraw", "year")
+
+
+def test_counters_match_a_rebuild_from_the_ledger(accounts):
+    a, b = accounts
+    models.withdraw(a, 10)
+    models.transfer(a, b, 5)
+    with db.get_conn(True) as conn:
+        live = conn.execute("SELECT * FROM usage_counters ORDER BY 1, 2, 3").fetchall()
+        conn.execute("DELETE FROM usage_counters")
+        conn.executescript(db.MIGRATIONS[1])        # the backfill of migration 2
+        rebuilt = conn.execute("SELECT * FROM usage_counters ORDER BY 1, 2, 3").fetchall()
+    assert [tuple(r) for r in live] == [tuple(r) for r in rebuilt]
@@ -0,0 +1,45 @@
+import hashlib
+
+import utils
+from utils import hash_pin, needs_rehash, verify_pin
+
+
+def test_hashes_are_salted_scrypt():
+    a, b = hash_pin("1234"), hash_pin("1234")
+    assert a != b and a.startswith("scrypt$")
+    assert verify_pin("1234", a) and verify_pin("1234", b)
+    assert not verify_pin("4321", a)
+    assert not needs_rehash(a)
+
+
+def test_legacy_and_outdated_hashes_verify_but_need_rehash(monkeypatch):
+    legacy = hashlib.sha256(b"1234").hexdigest()
+    assert verify_pin("1234", legacy) and not verify_pin("4321", legacy)
+    assert needs_rehash(legacy)
+
+    monkeypatch.setattr(utils, "SCRYPT_N", 1024)
+    cheap = hash_pin("1234")
+    monkeypatch.undo()
+    assert verify_pin("1234", cheap) and needs_rehash(cheap)
+
+
+def test_garbage_hashes_never_verify():
+    for bad in ("", None, "scrypt$x$y", "not-a-hash"):
+        assert not verify_pin("1234", bad)
+
+
+def test_successes_are_cached_and_failures_are_not(monkeypatch):
+    pin_hash = hash_pin("1234")
+    assert verify_pin("1234", pin_hash)
+    calls = []
+
+    def counted(pin, h):
+        calls.append(pin)
+        return False
+
+    monkeypatch.setattr(utils, "VERIFY_WORKERS", 0)
+    monkeypatch.setattr(utils, "_verify_uncached", counted)
+    assert verify_pin("1234", pin_hash)           # answered from the cache
+    assert not verify_pin("9999", pin_hash)
+    assert not verify_pin("9999", pin_hash)
+    assert calls == ["9999", "9999"]
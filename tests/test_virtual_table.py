@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from virtual_table import VirtualTable  # noqa: E402
+
+ROWS = list(range(1000))
+
+
+@pytest.fixture
+def root():
+    try:
+        r = tk.Tk()
+    except tk.TclError:
+        pytest.skip("needs a display")
+    r.withdraw()
+    yield r
+    r.destroy()
+
+
+def fetch(cursor, limit):
+    start = cursor or 0
+    end = start + limit
+    return ROWS[start:end], (end if end < len(ROWS) else None)
+
+
+def pump(root, done, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not done():
+        assert time.monotonic() < deadline, "page never arrived"
+        root.update()
+        time.sleep(0.01)
+
+
+def shown(table):
+    return [int(table.item_values(i)[0]) for i in table.tree.get_children()]
+
+
+def test_scrolling_keeps_a_contiguous_bounded_window(root):
+    table = VirtualTable(root, ("n",), fetch, lambda r: (r,), page_size=50, window=100)
+    table.tree.configure(yscrollcommand=table.scrollbar.set)   # scroll only when the test says so
+    pump(root, lambda: shown(table) == ROWS[:50])
+
+    for _ in range(4):                                  # near the bottom: next page
+        table._on_scroll("0.5", "1.0")
+        pump(root, lambda: not table._loading)
+    rows = shown(table)
+    assert len(rows) <= 100 and rows[-1] == 249
+    assert rows == list(range(rows[0], rows[0] + len(rows)))
+
+    table._on_scroll("0.0", "0.5")                      # near the top: re-fetch a trimmed page
+    pump(root, lambda: not table._loading)
+    rows = shown(table)
+    assert rows[0] == 100 and rows == list(range(100, 100 + len(rows)))
+
+
+def test_empty_and_failing_sources_call_back(root):
+    events = []
+    VirtualTable(root, ("n",), lambda c, n: ([], None), lambda r: (r,),
+                 on_empty=lambda: events.append("empty"))
+
+    def broken(cursor, limit):
+        raise RuntimeError("server down")
+
+    VirtualTable(root, ("n",), broken, lambda r: (r,), on_error=lambda e: events.append(str(e)))
+    pump(root, lambda: len(events) == 2)
+    assert sorted(events) == ["empty", "server down"]
@@ -1,9 +1,215 @@
 # utils.py - helper functions
+import base64
 import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+
+# Key for signed tokens. Without BANK_SECRET_KEY a random key is made at
+# import: tokens then die with the process (forked workers share it).
+SECRET_KEY = os.environ.get("BANK_SECRET_KEY", "").encode() or secrets.token_bytes(32)
+
+# ---------- PIN hashing ----------
+# Stored format: "scrypt$<n>$<r>$<p>$<salt>$<hash>" (base64url salt/hash).
+# Legacy rows hold a bare 64-hex SHA-256 digest; they still verify and are
+# upgraded by needs_rehash()/models.check_pin() on the next good login.
+SCRYPT_N = int(os.environ.get("BANK_SCRYPT_N") or 2 ** 14)
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+VERIFY_WORKERS = int(os.environ.get("BANK_VERIFY_WORKERS") or min(4, os.cpu_count() or 1))
+VERIFY_CACHE_TTL = float(os.environ.get("BANK_VERIFY_CACHE_TTL") or 60)
+VERIFY_CACHE_SIZE = 1024
+
+def _scrypt(pin: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        pin.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+        maxmem=2 * 128 * n * r + 1024 * 1024, dklen=HASH_BYTES
+    )
 
 def hash_pin(pin: str) -> str:
-    """Return sha256 hex digest of PIN string."""
-    return hashlib.sha256(pin.encode('utf-8')).hexdigest()
+    """Return a salted scrypt hash of the PIN in the versioned format above."""
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(pin, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+def _verify_uncached(pin: str, pin_hash: str) -> bool:
+    if not pin_hash:
+        return False
+    if pin_hash.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, digest = pin_hash.split("$")
+            expected = _unb64(digest)
+            actual = _scrypt(pin, _unb64(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(actual, expected)
+    if len(pin_hash) == 64:
+        legacy = hashlib.sha256(pin.encode('utf-8')).hexdigest()
+        return hmac.compare_digest(legacy, pin_hash.lower())
+    return False
+
+def needs_rehash(pin_hash: str) -> bool:
+    """True if pin_hash is not a scrypt hash with the current parameters."""
+    return not (pin_hash or "").startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+# Successful verifications are remembered for VERIFY_CACHE_TTL seconds, keyed
+# by a keyed digest of (hash, PIN), so repeat checks skip the scrypt cost.
+# Failures are never cached: every wrong guess pays full price.
+_verified = OrderedDict()
+_verified_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+def _cache_key(pin: str, pin_hash: str) -> str:
+    return fingerprint(pin_hash + "\0" + pin)
+
+def _cache_get(key: str) -> bool:
+    with _verified_lock:
+        expires = _verified.get(key)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del _verified[key]
+            return False
+        return True
+
+def _cache_put(key: str):
+    with _verified_lock:
+        _verified[key] = time.monotonic() + VERIFY_CACHE_TTL
+        _verified.move_to_end(key)
+        while len(_verified) > VERIFY_CACHE_SIZE:
+            _verified.popitem(last=False)
+
+def _get_pool():
+    """Process pool that runs scrypt, started on first use (i.e. after any fork)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS)
+    return _pool
+
+def verify_pin_async(pin: str, pin_hash: str) -> Future:
+    """
+    Future resolving to verify_pin(pin, pin_hash). Cache hits and legacy hashes
+    are answered at once; scrypt runs in a pool of at most VERIFY_WORKERS
+    processes, which bounds the CPU and memory logins can take.
+    """
+    key = _cache_key(pin, pin_hash or "")
+    if _cache_get(key):
+        future = Future()
+        future.set_result(True)
+        return future
+    if VERIFY_WORKERS <= 0 or not (pin_hash or "").startswith("scrypt$"):
+        future = Future()
+        future.set_result(_verify_uncached(pin, pin_hash))
+    else:
+        try:
+            future = _get_pool().submit(_verify_uncached, pin, pin_hash)
+        except (BrokenExecutor, RuntimeError):
+            future = Future()
+            future.set_result(_verify_uncached(pin, pin_hash))
+
+    def remember(f):
+        if not f.cancelled() and f.exception() is None and f.result():
+            _cache_put(key)
+
+    future.add_done_callback(remember)
+    return future
 
 def verify_pin(pin: str, pin_hash: str) -> bool:
-    return hash_pin(pin) == pin_hash
+    """Blocking check of a PIN against a stored hash (any supported format)."""
+    try:
+        return verify_pin_async(pin, pin_hash).result()
+    except BrokenExecutor:
+        return _verify_uncached(pin, pin_hash)
+
+# ---------- Signed tokens ----------
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def sign_token(claims: dict, ttl: int, key: bytes = SECRET_KEY) -> str:
+    """Return "<payload>.<signature>" carrying claims plus an "exp" timestamp."""
+    payload = _b64(json.dumps(dict(claims, exp=int(time.time()) + ttl), separators=(",", ":")).encode())
+    sig = hmac.new(key, payload.encode(), hashlib.sha256).digest()
+    return f"{payload}.{_b64(sig)}"
+
+def read_token(token: str, key: bytes = SECRET_KEY):
+    """Claims of a token made by sign_token(), or None if forged, malformed or expired."""
+    try:
+        payload, sig = token.split(".")
+        expected = hmac.new(key, payload.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _unb64(sig)):
+            return None
+        claims = json.loads(_unb64(payload))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(claims, dict) or claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+def fingerprint(value: str, key: bytes = SECRET_KEY) -> str:
+    """Short keyed digest of a secret, safe to embed in a token."""
+    return hmac.new(key, value.encode(), hashlib.sha256).hexdigest()[:16]
+
+# ---------- Logging ----------
+# One line per record on stderr. BANK_LOG_FORMAT=json (default) emits
+# machine-readable lines; extra={"fields": {...}} adds keys to them.
+# BANK_LOG_SAMPLE keeps that fraction of records below WARNING, so busy
+# servers can log requests without being bound by console I/O.
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SampleFilter(logging.Filter):
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+def configure_logging(level=None, fmt=None, sample=None):
+    """(Re)configure the root logger from arguments or BANK_LOG_* settings."""
+    level = level or os.environ.get("BANK_LOG_LEVEL", "INFO")
+    fmt = fmt or os.environ.get("BANK_LOG_FORMAT", "json")
+    sample = float(os.environ.get("BANK_LOG_SAMPLE") or 1.0) if sample is None else sample
+
+    handler = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"))
+    if sample < 1.0:
+        handler.addFilter(SampleFilter(sample))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    # Requests are logged by app.py itself; keep werkzeug's access log quiet
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
@@ -0,0 +1,157 @@
+# virtual_table.py - lazily loaded, windowed ttk.Treeview
+"""
+VirtualTable shows an arbitrarily long, cursor-paginated list in a Treeview
+without materializing it: pages are fetched on demand as the user scrolls,
+the next page is prefetched in a background thread, and only `window` rows
+are kept in the widget. Pages trimmed off the top are re-fetched from their
+cursor when the user scrolls back up.
+
+fetch_page(cursor, limit) runs off the Tk thread and must return
+(rows, next_cursor); next_cursor is None after the last page. The first
+page is requested with cursor=None.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+POLL_MS = 40
+EDGE = 0.15     # fraction of the scroll range that counts as "near the end"
+
+
+class VirtualTable(ttk.Frame):
+    def __init__(self, master, columns, fetch_page, row_values,
+                 page_size=200, window=1000, on_error=None, on_empty=None,
+                 height=14, column_width=120):
+        super().__init__(master)
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.page_size = page_size
+        self.window = max(window, page_size * 2)
+        self.on_error = on_error
+        self.on_empty = on_empty
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height)
+        for c in columns:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, anchor="center", width=column_width)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vtable")
+        self._generation = 0
+        self.bind("<Destroy>", self._on_destroy, add="+")
+        self.reload()
+
+    # ----- public -----
+    def reload(self):
+        """Drop everything and load the first page again."""
+        self._generation += 1
+        self.tree.delete(*self.tree.get_children())
+        self._pages = deque()      # (cursor, item_ids, next_cursor), top to bottom
+        self._dropped = []         # cursors of pages trimmed off the top
+        self._next = None          # prefetch future for the page below the window
+        self._loading = False
+        self._request(None, self._append, first=True)
+
+    def focus(self):
+        return self.tree.focus()
+
+    def item_values(self, item):
+        return self.tree.item(item, "values")
+
+    # ----- fetching -----
+    def _request(self, cursor, apply, first=False):
+        self._loading = True
+        future = self._executor.submit(self.fetch_page, cursor, self.page_size)
+        self._wait(future, cursor, apply, self._generation, first)
+
+    def _wait(self, future, cursor, apply, generation, first=False):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        if not future.done():
+            self.after(POLL_MS, self._wait, future, cursor, apply, generation, first)
+            return
+        self._loading = False
+        try:
+            rows, next_cursor = future.result()
+        except Exception as e:
+            if apply == self._prepend:
+                self._dropped.append(cursor)    # let the user retry by scrolling up
+            if self.on_error:
+                self.on_error(e)
+            return
+        if first and not rows and self.on_empty:
+            self.on_empty()
+        apply(cursor, rows, next_cursor)
+
+    def _prefetch(self):
+        """Start loading the page below the window before the user reaches it."""
+        bottom_next = self._pages[-1][2] if self._pages else None
+        if bottom_next is not None and self._next is None:
+            self._next = (bottom_next, self._executor.submit(self.fetch_page, bottom_next, self.page_size))
+
+    # ----- applying pages -----
+    def _insert(self, rows, index):
+        ids = []
+        for offset, row in enumerate(rows):
+            pos = "end" if index == "end" else index + offset
+            ids.append(self.tree.insert("", pos, values=self.row_values(row)))
+        return ids
+
+    def _append(self, cursor, rows, next_cursor):
+        self._pages.append((cursor, self._insert(rows, "end"), next_cursor))
+        self._trim_top()
+        self._prefetch()
+
+    def _prepend(self, cursor, rows, next_cursor):
+        first, _ = self.tree.yview()
+        total_before = len(self.tree.get_children())
+        ids = self._insert(rows, 0)
+        self._pages.appendleft((cursor, ids, next_cursor))
+        # Keep the same rows on screen after growing the list above them
+        total = len(self.tree.get_children())
+        self.tree.yview_moveto((first * total_before + len(ids)) / total)
+        self._trim_bottom()
+
+    def _trim_top(self):
+        while self._count() > self.window and len(self._pages) > 1:
+            first, _ = self.tree.yview()
+            total_before = len(self.tree.get_children())
+            cursor, ids, _ = self._pages.popleft()
+            self.tree.delete(*ids)
+            self._dropped.append(cursor)
+            total = len(self.tree.get_children())
+            self.tree.yview_moveto(max(0.0, (first * total_before - len(ids)) / total))
+
+    def _trim_bottom(self):
+        while self._count() > self.window and len(self._pages) > 1:
+            _, ids, _ = self._pages.pop()
+            self.tree.delete(*ids)
+            self._next = None      # the prefetched page no longer follows the window
+
+    def _count(self):
+        return sum(len(p[1]) for p in self._pages)
+
+    # ----- scrolling -----
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading or not self._pages:
+            return
+        first, last = float(first), float(last)
+        if last >= 1 - EDGE and self._pages[-1][2] is not None:
+            if self._next is not None and self._next[0] == self._pages[-1][2]:
+                cursor, future = self._next
+                self._next = None
+                self._loading = True
+                self._wait(future, cursor, self._append, self._generation)
+            else:
+                self._request(self._pages[-1][2], self._append)
+        elif first <= EDGE and self._dropped:
+            self._request(self._dropped.pop(), self._prepend)
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._generation += 1
+            self._executor.shutdown(wait=False)